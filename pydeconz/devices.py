@@ -0,0 +1,113 @@
+"""Group resources exposed by the same physical device."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any, Final
+
+from .models import ResourceGroup
+from .models.api import APIItem
+
+MAC_LENGTH: Final = 23
+
+
+def mac_address(unique_id: Any) -> str:
+    """Return MAC address part of unique ID, empty if there is none.
+
+    E.g. "00:17:88:01:00:00:00:07" from "00:17:88:01:00:00:00:07-02-0406".
+    """
+    if not isinstance(unique_id, str):
+        return ""
+    mac = unique_id.split("-", 1)[0]
+    return mac if len(mac) == MAC_LENGTH else ""
+
+
+@dataclass
+class PhysicalDevice:
+    """Lights and sensors sharing a MAC address."""
+
+    mac: str
+    lights: dict[str, APIItem] = field(default_factory=dict)
+    sensors: dict[str, APIItem] = field(default_factory=dict)
+
+    @property
+    def resources(self) -> list[APIItem]:
+        """All lights and sensors of device."""
+        return [*self.lights.values(), *self.sensors.values()]
+
+    def members(self, resource_group: ResourceGroup) -> dict[str, APIItem]:
+        """Resources of device in resource group."""
+        return self.lights if resource_group == ResourceGroup.LIGHT else self.sensors
+
+
+class DeviceRegistry:
+    """Map physical devices to their resources and back.
+
+    Maintained by the light and sensor handlers as resources are added,
+    re-paired with a new unique ID or removed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize registry."""
+        self._devices: dict[str, PhysicalDevice] = {}
+        self._macs: dict[tuple[ResourceGroup, str], str] = {}
+
+    def __contains__(self, mac: str) -> bool:
+        """Whether a device with MAC address is known."""
+        return mac in self._devices
+
+    def __getitem__(self, mac: str) -> PhysicalDevice:
+        """Get device by MAC address."""
+        return self._devices[mac]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over MAC addresses."""
+        return iter(self._devices)
+
+    def __len__(self) -> int:
+        """Return number of devices."""
+        return len(self._devices)
+
+    def get(self, mac: str) -> PhysicalDevice | None:
+        """Get device by MAC address, None if unknown."""
+        return self._devices.get(mac)
+
+    def values(self) -> list[PhysicalDevice]:
+        """Return devices."""
+        return list(self._devices.values())
+
+    def device_of(
+        self, resource_group: ResourceGroup, id: str
+    ) -> PhysicalDevice | None:
+        """Get device exposing resource."""
+        if (mac := self._macs.get((resource_group, id))) is None:
+            return None
+        return self._devices[mac]
+
+    def add(self, resource_group: ResourceGroup, id: str, item: APIItem) -> None:
+        """Register resource with the device of its unique ID."""
+        key = (resource_group, id)
+        mac = mac_address(item.raw.get("uniqueid"))
+
+        if (previous := self._macs.get(key)) is not None:
+            if previous == mac:
+                return
+            self.remove(resource_group, id)
+
+        if not mac:
+            return
+
+        if (device := self._devices.get(mac)) is None:
+            device = self._devices[mac] = PhysicalDevice(mac)
+        device.members(resource_group)[id] = item
+        self._macs[key] = mac
+
+    def remove(self, resource_group: ResourceGroup, id: str) -> None:
+        """Unregister resource, dropping its device if it has no resources left."""
+        if (mac := self._macs.pop((resource_group, id), None)) is None:
+            return
+        device = self._devices[mac]
+        del device.members(resource_group)[id]
+        if not device.lights and not device.sensors:
+            del self._devices[mac]
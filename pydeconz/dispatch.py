@@ -0,0 +1,180 @@
+"""Decode and route websocket events on a worker thread."""
+
+from __future__ import annotations
+
+from asyncio import AbstractEventLoop
+from collections.abc import Callable
+import enum
+from functools import wraps
+import logging
+from queue import Empty, SimpleQueue
+import threading
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Final
+
+import orjson
+
+from .metrics import LatencyStage
+
+if TYPE_CHECKING:
+    from .gateway import DeconzSession
+
+LOGGER = logging.getLogger(__name__)
+
+BATCH_SIZE: Final = 100
+
+
+class DispatchMode(enum.StrEnum):
+    """Where websocket events are decoded and routed.
+
+    Supported modes:
+    - loop, on the event loop
+    - thread, on a worker thread, subscribers are called on the event loop
+      so bursts of events do not block it
+    """
+
+    LOOP = "loop"
+    THREAD = "thread"
+
+
+class ThreadedDispatcher:
+    """Decode and route websocket frames on a worker thread.
+
+    Resources are only modified while holding lock, by the worker thread
+    when routing an event and by the event loop when refreshing state.
+    Frames are taken from the queue in batches of up to BATCH_SIZE,
+    priority events of a batch are routed ahead of bulk traffic.
+    Subscribers not marked inline are called on loop, all calls queued
+    while routing a batch are handed over to the loop at once.
+    """
+
+    def __init__(self, gateway: DeconzSession, loop: AbstractEventLoop) -> None:
+        """Initialize dispatcher."""
+        self.gateway = gateway
+        self.loop = loop
+        self.lock = threading.RLock()
+        self.processed = 0
+
+        self._queue: SimpleQueue[tuple[str | bytes, float] | None] = SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._thread_id: int | None = None
+        self._pending: list[tuple[Callable[..., None], tuple[Any, ...]]] = []
+
+    def start(self) -> None:
+        """Start worker thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="pydeconz-dispatch", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop worker thread after queued frames have been processed."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread = None
+
+    def submit(self, frame: str | bytes, received: float) -> None:
+        """Queue websocket frame received at received for processing."""
+        self._queue.put((frame, received))
+
+    def in_worker(self) -> bool:
+        """Whether the caller runs on the worker thread."""
+        return threading.get_ident() == self._thread_id
+
+    def call_soon(self, callback: Callable[..., None], *args: Any) -> None:
+        """Call callback on the event loop once the current batch is routed."""
+        if threading.get_ident() == self._thread_id:
+            self._pending.append((callback, args))
+            return
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def on_loop(self, callback: Callable[..., None]) -> Callable[..., None]:
+        """Wrap callback to be called on the event loop when called by worker."""
+        pending = self._pending
+
+        @wraps(callback)
+        def call_on_loop(*args: Any) -> None:
+            if threading.get_ident() == self._thread_id:
+                pending.append((callback, args))
+                return
+            callback(*args)
+
+        return call_on_loop
+
+    def _flush(self) -> None:
+        """Hand callbacks queued by the worker over to the event loop."""
+        if not self._pending:
+            return
+        calls = self._pending.copy()
+        self._pending.clear()
+        self.loop.call_soon_threadsafe(self._call, calls)
+
+    @staticmethod
+    def _call(calls: list[tuple[Callable[..., None], tuple[Any, ...]]]) -> None:
+        """Call callbacks handed over by the worker."""
+        for callback, args in calls:
+            try:
+                callback(*args)
+            except Exception:
+                LOGGER.exception("Error calling %s", callback)
+
+    def _run(self) -> None:
+        """Process queued frames in batches until stopped."""
+        self._thread_id = threading.get_ident()
+        queue = self._queue
+
+        while (item := queue.get()) is not None:
+            batch = [item]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    item = queue.get_nowait()
+                except Empty:
+                    break
+                if item is None:
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if item is None:
+                break
+
+        self._thread_id = None
+
+    def _dispatch(self, batch: list[tuple[str | bytes, float]]) -> None:
+        """Decode batch of frames and route them, priority events first."""
+        events = self.gateway.events
+        is_priority = self.gateway.is_priority
+        metrics = self.gateway.event_metrics
+        priority: list[tuple[dict[str, Any], float]] = []
+        bulk: list[tuple[dict[str, Any], float]] = []
+
+        for frame, received in batch:
+            # Membership is only current if no earlier frame is waiting
+            if isinstance(frame, str) and not events.accepts(
+                frame, not priority and not bulk
+            ):
+                continue
+            try:
+                start = perf_counter()
+                data = orjson.loads(frame)
+                if metrics is not None:
+                    resource = data.get("r", "")
+                    metrics.observe(resource, LatencyStage.QUEUE, start - received)
+                    metrics.frame_decoded(resource, start, perf_counter())
+                (priority if is_priority(data) else bulk).append((data, received))
+            except Exception:
+                LOGGER.exception("Error processing websocket frame %s", frame)
+
+        handler = events.handler
+        with self.lock:
+            for data, received in (*priority, *bulk):
+                try:
+                    if metrics is not None:
+                        metrics.received = received
+                    handler(data)
+                except Exception:
+                    LOGGER.exception("Error processing websocket event %s", data)
+        self.processed += len(batch)
+        self._flush()
@@ -0,0 +1,628 @@
+"""In-process deCONZ gateway emulator.
+
+Serves the REST endpoints and websocket used by pydeconz so that tests and
+benchmarks can exercise the real request and websocket paths end-to-end.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import contextlib
+import copy
+import itertools
+import logging
+import random
+import time
+from typing import Any, Final
+
+from aiohttp import WSMsgType, web
+import orjson
+
+from .models import ResourceGroup
+from .models.event import EventType
+
+LOGGER = logging.getLogger(__name__)
+
+EMULATOR_API_KEY: Final = "0123456789"
+
+DEFAULT_EVENT_WEIGHTS: Final = {
+    EventType.CHANGED: 90,
+    EventType.SCENE_CALLED: 6,
+    EventType.ADDED: 2,
+    EventType.DELETED: 2,
+}
+
+ERROR_UNAUTHORIZED: Final = 1
+ERROR_NOT_FOUND: Final = 3
+ERROR_BRIDGE_BUSY: Final = 901
+
+ITEM_GROUPS: Final = (
+    ResourceGroup.ALARM,
+    ResourceGroup.GROUP,
+    ResourceGroup.LIGHT,
+    ResourceGroup.SENSOR,
+)
+
+
+# Sensor type, model ID, cluster, state and config per sensor resource
+SENSOR_TEMPLATES: Final[
+    dict[str, tuple[str, str, str, dict[str, Any], dict[str, Any]]]
+] = {
+    "Presence": (
+        "ZHAPresence",
+        "SML001",
+        "0406",
+        {"presence": False},
+        {"delay": 0, "duration": 60, "sensitivity": 2},
+    ),
+    "Light level": (
+        "ZHALightLevel",
+        "SML001",
+        "0400",
+        {"dark": True, "daylight": False, "lightlevel": 6955, "lux": 5},
+        {"tholddark": 12000, "tholdoffset": 7000},
+    ),
+    "Temperature": ("ZHATemperature", "SML001", "0402", {"temperature": 2100}, {}),
+    "Switch": (
+        "ZHASwitch",
+        "RWL021",
+        "fc00",
+        {"buttonevent": 1002, "eventduration": 0},
+        {"group": "1"},
+    ),
+    "Power": (
+        "ZHAPower",
+        "SP 120",
+        "0b04",
+        {"current": 34, "power": 64, "voltage": 231},
+        {},
+    ),
+    "Consumption": (
+        "ZHAConsumption",
+        "SP 120",
+        "0702",
+        {"consumption": 1000, "power": 64},
+        {},
+    ),
+    "Thermostat": (
+        "ZHAThermostat",
+        "eTRV0100",
+        "0201",
+        {"on": True, "temperature": 2102, "valve": 24},
+        {"heatsetpoint": 2100, "locked": False, "offset": 0},
+    ),
+    "Fire": ("ZHAFire", "lumi.sensor_smoke", "0500", {"fire": False}, {}),
+    "Water": ("ZHAWater", "lumi.sensor_wleak", "0500", {"water": False}, {}),
+}
+
+# Resources exposed per physical device, devices are created round robin
+PHYSICAL_DEVICES: Final = (
+    ("Light",),
+    ("Light",),
+    ("Light",),
+    ("Presence", "Light level", "Temperature"),
+    ("Switch",),
+    ("Light", "Power", "Consumption"),
+    ("Thermostat",),
+    ("Fire",),
+    ("Light",),
+    ("Light",),
+    ("Switch",),
+    ("Water",),
+)
+
+STATE_CHANGES: Final[
+    dict[str, Callable[[random.Random, dict[str, Any]], dict[str, Any]]]
+] = {
+    "ZHAConsumption": lambda rng, state: {"consumption": state["consumption"] + 1},
+    "ZHAFire": lambda rng, state: {"fire": rng.random() < 0.01},
+    "ZHALightLevel": lambda rng, state: {"lightlevel": rng.randint(0, 30000)},
+    "ZHAPower": lambda rng, state: {"power": rng.randint(0, 2000)},
+    "ZHAPresence": lambda rng, state: {"presence": not state["presence"]},
+    "ZHASwitch": lambda rng, state: {
+        "buttonevent": rng.choice((1002, 2002, 3002, 4002))
+    },
+    "ZHATemperature": lambda rng, state: {"temperature": rng.randint(1500, 2800)},
+    "ZHAThermostat": lambda rng, state: {"temperature": rng.randint(1500, 2800)},
+    "ZHAWater": lambda rng, state: {"water": rng.random() < 0.01},
+}
+
+
+def create_resource(
+    kind: str, index: int, rng: random.Random
+) -> tuple[ResourceGroup, dict[str, Any]]:
+    """Create light or sensor resource of physical device with index."""
+    mac = ":".join(f"{byte:02x}" for byte in b"\x00\x17\x88\x01" + index.to_bytes(4))
+    etag = f"{rng.getrandbits(128):032x}"
+
+    if kind == "Light":
+        return ResourceGroup.LIGHT, {
+            "etag": etag,
+            "hascolor": True,
+            "manufacturername": "Philips",
+            "modelid": "LCT015",
+            "name": f"Light {index}",
+            "state": {
+                "alert": "none",
+                "bri": rng.randint(1, 254),
+                "colormode": "ct",
+                "ct": rng.randint(153, 500),
+                "effect": "none",
+                "hue": rng.randint(0, 65535),
+                "on": rng.random() < 0.5,
+                "reachable": True,
+                "sat": rng.randint(0, 254),
+                "xy": [round(rng.random(), 4), round(rng.random(), 4)],
+            },
+            "swversion": "1.50.2_r30933",
+            "type": "Extended color light",
+            "uniqueid": f"{mac}-0b",
+        }
+
+    sensor_type, model_id, cluster, state, config = SENSOR_TEMPLATES[kind]
+    return ResourceGroup.SENSOR, {
+        "config": {"battery": rng.randint(1, 100), "on": True, "reachable": True}
+        | config,
+        "ep": 2,
+        "etag": etag,
+        "lastseen": "2026-01-01T00:00Z",
+        "manufacturername": "Philips",
+        "modelid": model_id,
+        "name": f"{kind} {index}",
+        "state": {"lastupdated": "2026-01-01T00:00:00.000", "lowbattery": False}
+        | state,
+        "swversion": "6.1.1.27575",
+        "type": sensor_type,
+        "uniqueid": f"{mac}-02-{cluster}",
+    }
+
+
+def generate_state(devices: int, seed: int = 0) -> dict[str, Any]:
+    """Generate a synthetic full state document with devices lights and sensors.
+
+    Physical devices may expose several resources sharing a MAC address,
+    e.g. presence, light level and temperature of a motion sensor.
+    One light group with two scenes is created per ten lights.
+    """
+    rng = random.Random(seed)
+    resources: dict[str, dict[str, Any]] = {
+        ResourceGroup.LIGHT: {},
+        ResourceGroup.SENSOR: {},
+    }
+
+    count = 0
+    for index in itertools.count():
+        for kind in PHYSICAL_DEVICES[index % len(PHYSICAL_DEVICES)]:
+            if count == devices:
+                break
+            group, raw = create_resource(kind, index, rng)
+            resources[group][str(len(resources[group]) + 1)] = raw
+            count += 1
+        if count == devices:
+            break
+
+    light_ids = list(resources[ResourceGroup.LIGHT])
+    groups = {
+        str(group_id): {
+            "action": {"bri": 127, "ct": 300, "on": False},
+            "devicemembership": [],
+            "etag": f"{rng.getrandbits(128):032x}",
+            "hidden": False,
+            "id": str(group_id),
+            "lights": light_ids[offset : offset + 10],
+            "lightsequence": [],
+            "multideviceids": [],
+            "name": f"Group {group_id}",
+            "scenes": [
+                {"id": "1", "lightcount": 10, "name": "Bright", "transitiontime": 10},
+                {"id": "2", "lightcount": 10, "name": "Dimmed", "transitiontime": 10},
+            ],
+            "state": {"all_on": False, "any_on": False},
+            "type": "LightGroup",
+        }
+        for group_id, offset in enumerate(range(0, len(light_ids), 10), start=1)
+    }
+
+    return {
+        ResourceGroup.ALARM: {
+            "1": {
+                "config": {"armmode": "disarmed", "configured": True},
+                "devices": {},
+                "name": "default",
+                "state": {"armstate": "disarmed", "seconds_remaining": 0},
+            }
+        },
+        ResourceGroup.CONFIG: {
+            "apiversion": "1.16.0",
+            "bridgeid": "00212EFFFF012345",
+            "devicename": "ConBee II",
+            "mac": "00:21:2e:01:23:45",
+            "modelid": "deCONZ",
+            "name": "deCONZ emulator",
+            "swversion": "2.26.3",
+            "websocketnotifyall": True,
+            "websocketport": 443,
+        },
+        ResourceGroup.GROUP: groups,
+        ResourceGroup.LIGHT: resources[ResourceGroup.LIGHT],
+        ResourceGroup.SENSOR: resources[ResourceGroup.SENSOR],
+    }
+
+
+def _error(
+    error_type: int, address: str, description: str, status: int
+) -> web.Response:
+    """Error response as returned by deCONZ."""
+    return web.json_response(
+        [
+            {
+                "error": {
+                    "type": error_type,
+                    "address": address,
+                    "description": description,
+                }
+            }
+        ],
+        status=status,
+    )
+
+
+class DeconzEmulator:
+    """Emulate a deCONZ gateway.
+
+    REST API is served on /api and the websocket on /, on the same port.
+    Requests can be delayed by latency seconds and fail with bridge busy,
+    either randomly based on busy_probability or by inject_busy.
+    """
+
+    def __init__(
+        self,
+        state: dict[str, Any] | None = None,
+        api_key: str = EMULATOR_API_KEY,
+        latency: float = 0.0,
+        busy_probability: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Set up emulator, state defaults to a small synthetic installation."""
+        self.state = state if state is not None else generate_state(10, seed)
+        for group in ITEM_GROUPS:
+            self.state.setdefault(group, {})
+        self.state.setdefault(ResourceGroup.CONFIG, {})
+
+        self.api_key = api_key
+        self.latency = latency
+        self.busy_probability = busy_probability
+
+        self.host = ""
+        self.port = 0
+        self.requests = 0
+        self.events_sent = 0
+
+        self._busy_count = 0
+        self._rng = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self._traffic_task: asyncio.Task[None] | None = None
+        self._websockets: set[web.WebSocketResponse] = set()
+
+        self._handlers: dict[
+            str,
+            Callable[[list[str], str, dict[str, Any]], Awaitable[web.Response]],
+        ] = {
+            "DELETE": self._delete,
+            "GET": self._get,
+            "POST": self._post,
+            "PUT": self._put,
+        }
+
+        self.app = web.Application()
+        self.app.router.add_get("/", self._websocket)
+        self.app.router.add_post("/api", self._create_api_key)
+        self.app.router.add_route("*", "/api/{api_key}", self._api)
+        self.app.router.add_route("*", "/api/{api_key}/{path:.*}", self._api)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Start serving, port 0 selects a free port."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+
+        self.host = host
+        self.port = self._runner.addresses[0][1]
+        self.state[ResourceGroup.CONFIG]["websocketport"] = self.port
+
+    async def stop(self) -> None:
+        """Stop traffic, close websockets and stop serving."""
+        await self.stop_traffic()
+        for ws in list(self._websockets):
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def inject_busy(self, count: int = 1) -> None:
+        """Respond with bridge busy to the next count requests."""
+        self._busy_count += count
+
+    async def send_event(self, event: dict[str, Any]) -> None:
+        """Send event to all connected websocket clients."""
+        for ws in list(self._websockets):
+            if not ws.closed:
+                await ws.send_str(orjson.dumps(event).decode())
+        self.events_sent += 1
+
+    def create_event(self, event_type: EventType = EventType.CHANGED) -> dict[str, Any]:
+        """Create a realistic event of event_type and apply it to state."""
+        if event_type == EventType.SCENE_CALLED and self.state[ResourceGroup.GROUP]:
+            gid = self._rng.choice(list(self.state[ResourceGroup.GROUP]))
+            scenes = self.state[ResourceGroup.GROUP][gid]["scenes"] or [{"id": "1"}]
+            return {
+                "e": EventType.SCENE_CALLED,
+                "gid": gid,
+                "r": ResourceGroup.SCENE,
+                "scid": self._rng.choice(scenes)["id"],
+                "t": "event",
+            }
+
+        if event_type == EventType.ADDED:
+            sensors = self.state[ResourceGroup.SENSOR]
+            id = str(max((int(id) for id in sensors), default=0) + 1)
+            _, raw = create_resource("Switch", 1000000 + int(id), self._rng)
+            sensors[id] = raw
+            return {
+                "e": EventType.ADDED,
+                "id": id,
+                "r": ResourceGroup.SENSOR,
+                "sensor": raw | {"id": id},
+                "t": "event",
+                "uniqueid": raw["uniqueid"],
+            }
+
+        if event_type == EventType.DELETED and self.state[ResourceGroup.SENSOR]:
+            id = self._rng.choice(list(self.state[ResourceGroup.SENSOR]))
+            raw = self.state[ResourceGroup.SENSOR].pop(id)
+            return {
+                "e": EventType.DELETED,
+                "id": id,
+                "r": ResourceGroup.SENSOR,
+                "t": "event",
+                "uniqueid": raw["uniqueid"],
+            }
+
+        return self._changed_event()
+
+    def start_traffic(
+        self,
+        rate: float,
+        event_weights: dict[EventType, int] | None = None,
+        count: int | None = None,
+    ) -> None:
+        """Send rate events per second, stop after count events if provided."""
+        self._traffic_task = asyncio.create_task(
+            self._traffic(rate, event_weights or DEFAULT_EVENT_WEIGHTS, count)
+        )
+
+    async def stop_traffic(self) -> None:
+        """Stop sending generated events."""
+        if self._traffic_task is None:
+            return
+        self._traffic_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._traffic_task
+        self._traffic_task = None
+
+    async def wait_traffic(self) -> None:
+        """Wait for a traffic run with a count to finish."""
+        if self._traffic_task is not None:
+            await self._traffic_task
+
+    async def _traffic(
+        self, rate: float, event_weights: dict[EventType, int], count: int | None
+    ) -> None:
+        """Send events paced at rate events per second."""
+        event_types = list(event_weights)
+        weights = list(event_weights.values())
+        start = time.monotonic()
+        sent = 0
+
+        while count is None or sent < count:
+            due = int((time.monotonic() - start) * rate) - sent
+            if count is not None:
+                due = min(due, count - sent)
+            for event_type in self._rng.choices(event_types, weights, k=due):
+                await self.send_event(self.create_event(event_type))
+            sent += due
+            await asyncio.sleep(min(1 / rate, 0.01))
+
+    def _changed_event(self) -> dict[str, Any]:
+        """Create a changed event for a random light, sensor or group."""
+        group = self._rng.choices(
+            (ResourceGroup.LIGHT, ResourceGroup.SENSOR, ResourceGroup.GROUP),
+            (4, 5, 1),
+        )[0]
+        if not (items := self.state[group]):
+            group, items = ResourceGroup.SENSOR, self.state[ResourceGroup.SENSOR]
+        id = self._rng.choice(list(items))
+        raw = items[id]
+        event: dict[str, Any] = {
+            "e": EventType.CHANGED,
+            "id": id,
+            "r": group,
+            "t": "event",
+        }
+
+        if group == ResourceGroup.GROUP:
+            on = self._rng.random() < 0.5
+            changes: dict[str, Any] = {"all_on": on, "any_on": on}
+            raw["state"].update(changes)
+            return event | {"state": changes}
+
+        event["uniqueid"] = raw["uniqueid"]
+
+        if self._rng.random() < 0.2:
+            return event | {"attr": {"id": id, "lastseen": "2026-01-01T00:00Z"}}
+
+        if group == ResourceGroup.LIGHT:
+            changes = {"bri": self._rng.randint(1, 254), "on": True}
+        else:
+            changes = STATE_CHANGES[raw["type"]](self._rng, raw["state"])
+            changes["lastupdated"] = "2026-01-01T00:00:00.000"
+        raw["state"].update(changes)
+        return event | {"state": changes}
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Accept websocket client and keep it until it disconnects."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._websockets.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._websockets.discard(ws)
+        return ws
+
+    async def _create_api_key(self, request: web.Request) -> web.Response:
+        """Create API key, always returns the emulator key."""
+        return web.json_response([{"success": {"username": self.api_key}}])
+
+    async def _api(self, request: web.Request) -> web.Response:
+        """Entry point of all authenticated API requests."""
+        self.requests += 1
+        address = f"/{request.match_info.get('path', '')}"
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if request.match_info["api_key"] != self.api_key:
+            return _error(ERROR_UNAUTHORIZED, address, "unauthorized user", 403)
+
+        if self._busy_count or (
+            self.busy_probability and self._rng.random() < self.busy_probability
+        ):
+            self._busy_count = max(0, self._busy_count - 1)
+            return _error(ERROR_BRIDGE_BUSY, address, "Bridge busy", 503)
+
+        if (handler := self._handlers.get(request.method)) is None:
+            return _error(ERROR_NOT_FOUND, address, "method not available", 405)
+
+        segments = [segment for segment in address.split("/") if segment]
+        data = await request.json() if request.can_read_body else {}
+        return await handler(segments, address, data)
+
+    def _resolve(self, segments: list[str]) -> Any:
+        """Walk state along path segments, return None if not found."""
+        target: Any = self.state
+        for segment in segments:
+            if isinstance(target, list):
+                target = next((i for i in target if i.get("id") == segment), None)
+            elif isinstance(target, dict):
+                target = target.get(segment)
+            if target is None:
+                return None
+        return target
+
+    async def _get(
+        self, segments: list[str], address: str, data: dict[str, Any]
+    ) -> web.Response:
+        """Return state or part of state."""
+        if (target := self._resolve(segments)) is None:
+            return _error(ERROR_NOT_FOUND, address, "resource not available", 404)
+        return web.json_response(target)
+
+    async def _put(
+        self, segments: list[str], address: str, data: dict[str, Any]
+    ) -> web.Response:
+        """Modify state and signal the change over the websocket."""
+        if segments[-1] in ("recall", "store") and len(segments) == 5:
+            if self._resolve(segments[:-1]) is None:
+                return _error(ERROR_NOT_FOUND, address, "resource not available", 404)
+            if segments[-1] == "recall":
+                await self.send_event(
+                    {
+                        "e": EventType.SCENE_CALLED,
+                        "gid": segments[1],
+                        "r": ResourceGroup.SCENE,
+                        "scid": segments[3],
+                        "t": "event",
+                    }
+                )
+            return web.json_response([{"success": {address: data}}])
+
+        if not isinstance(target := self._resolve(segments), dict):
+            return _error(ERROR_NOT_FOUND, address, "resource not available", 404)
+        target.update(copy.deepcopy(data))
+
+        if len(segments) >= 2 and segments[0] in ITEM_GROUPS:
+            await self._signal_put(segments, data)
+
+        return web.json_response(
+            [{"success": {f"{address}/{key}": value}} for key, value in data.items()]
+        )
+
+    async def _signal_put(self, segments: list[str], data: dict[str, Any]) -> None:
+        """Signal modified item over websocket like deCONZ does."""
+        group, id, *rest = segments
+        raw = self.state[group][id]
+        event: dict[str, Any] = {
+            "e": EventType.CHANGED,
+            "id": id,
+            "r": group,
+            "t": "event",
+        }
+        if "uniqueid" in raw:
+            event["uniqueid"] = raw["uniqueid"]
+
+        if rest == ["action"]:
+            if "on" in data:
+                raw["state"].update({"all_on": data["on"], "any_on": data["on"]})
+                await self.send_event(event | {"state": raw["state"]})
+            return
+
+        if rest and rest[0] in ("config", "state"):
+            await self.send_event(event | {rest[0]: data})
+        elif not rest and "name" in data:
+            await self.send_event(event | {"name": data["name"]})
+
+    async def _post(
+        self, segments: list[str], address: str, data: dict[str, Any]
+    ) -> web.Response:
+        """Create scene or resource."""
+        if (target := self._resolve(segments)) is None:
+            return _error(ERROR_NOT_FOUND, address, "resource not available", 404)
+
+        if isinstance(target, list):
+            id = str(max((int(i["id"]) for i in target), default=0) + 1)
+            target.append({"id": id, "lightcount": 0, "transitiontime": 0} | data)
+        else:
+            id = str(max((int(i) for i in target if i.isdigit()), default=0) + 1)
+            target[id] = data
+
+        return web.json_response([{"success": {"id": id}}])
+
+    async def _delete(
+        self, segments: list[str], address: str, data: dict[str, Any]
+    ) -> web.Response:
+        """Delete resource and signal it over websocket."""
+        *parent_segments, id = segments
+        parent = self._resolve(parent_segments)
+        raw: Any = None
+        if isinstance(parent, dict):
+            raw = parent.pop(id, None)
+        elif isinstance(parent, list):
+            # Scenes are a list of items with an ID
+            for index, item in enumerate(parent):
+                if item.get("id") == id:
+                    raw = parent.pop(index)
+                    break
+        if raw is None:
+            return _error(ERROR_NOT_FOUND, address, "resource not available", 404)
+
+        if len(segments) == 2 and segments[0] in ITEM_GROUPS:
+            event = {"e": EventType.DELETED, "id": id, "r": segments[0], "t": "event"}
+            if isinstance(raw, dict) and "uniqueid" in raw:
+                event["uniqueid"] = raw["uniqueid"]
+            await self.send_event(event)
+
+        return web.json_response([{"success": address}])
@@ -1,27 +1,103 @@
 """Python library to connect deCONZ and Home Assistant to work together."""
 
-from asyncio import CancelledError, Task, create_task, sleep
-from collections.abc import Callable
+from asyncio import (
+    FIRST_EXCEPTION,
+    AbstractEventLoop,
+    CancelledError,
+    Future,
+    Semaphore,
+    Task,
+    create_task,
+    gather,
+    get_running_loop,
+    run_coroutine_threadsafe,
+    sleep,
+    wait,
+)
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractContextManager, nullcontext
+from contextvars import ContextVar
+import enum
+from inspect import iscoroutinefunction
 import logging
 from pprint import pformat
-from typing import Any
+from time import perf_counter
+from typing import Any, Final
 
 import aiohttp
+import orjson
 
 from .config import Config
-from .errors import BridgeBusy, RequestError, ResponseError, raise_error
+from .devices import DeviceRegistry
+from .dispatch import DispatchMode, ThreadedDispatcher
+from .errors import (
+    BridgeBusy,
+    RequestError,
+    ResourceNotFound,
+    ResponseError,
+    raise_error,
+)
 from .interfaces.alarm_systems import AlarmSystems
-from .interfaces.api_handlers import CallbackType, UnsubscribeType
+from .interfaces.api_handlers import (
+    CallbackType,
+    UnsubscribeType,
+    freeze_changed_keys,
+    restore_changed_keys,
+)
 from .interfaces.events import EventHandler
 from .interfaces.groups import GroupHandler
 from .interfaces.lights import LightResourceManager
+from .interfaces.predicates import Predicate
 from .interfaces.scenes import Scenes
 from .interfaces.sensors import SensorResourceManager
+from .interfaces.subscriptions import (
+    MAX_QUEUED,
+    AsyncCallbackType,
+    resource_id_key,
+    wrap_async,
+)
+from .json_stream import JSONStreamParser
+from .metrics import (
+    CallbackWatchdog,
+    EventMetrics,
+    RequestMetrics,
+    RequestSpan,
+    endpoint_template,
+)
 from .models import ResourceGroup
+from .models.api import APIItem
+from .recorder import WSRecorder
+from .snapshot import Snapshot, SnapshotBuilder
 from .websocket import Signal, State, WSClient
+from .writes import (
+    COMMAND_SECTIONS,
+    COMMANDS,
+    MODIFIERS,
+    changed_values,
+    write_target,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+RequestHookType = Callable[[RequestSpan], None]
+
+CONFIRM_TIMEOUT: Final = 5.0
+JSON_EXECUTOR_THRESHOLD: Final = 65536
+MAX_CONCURRENT_REQUESTS: Final = 8
+
+# Timeout and confirmations by path of writes made within DeconzSession.confirmed
+_confirmations: ContextVar[tuple[float, dict[str, Future[float]]] | None] = ContextVar(
+    "confirmations", default=None
+)
+
+
+class RefreshMode(enum.StrEnum):
+    """How to retrieve the full state of deCONZ."""
+
+    PARALLEL = "parallel"
+    SINGLE = "single"
+    STREAM = "stream"
+
 
 class DeconzSession:
     """deCONZ representation that handles lights, groups, scenes and sensors."""
@@ -33,18 +109,62 @@ class DeconzSession:
         port: int,
         api_key: str | None = None,
         connection_status: Callable[[bool], None] | None = None,
+        json_executor_threshold: int = JSON_EXECUTOR_THRESHOLD,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+        collect_metrics: bool = False,
+        dispatch_mode: DispatchMode = DispatchMode.LOOP,
+        callback_loop: AbstractEventLoop | None = None,
+        suppress_unchanged_writes: bool = False,
     ) -> None:
-        """Session setup."""
+        """Session setup.
+
+        Responses larger than json_executor_threshold bytes are decoded
+        in an executor to not block the event loop.
+        At most max_concurrent_requests requests are in flight at a time
+        during a parallel refresh.
+        Event latency and request metrics are only collected
+        when collect_metrics is True.
+        With dispatch_mode thread websocket events are decoded and routed
+        on a worker thread and subscribers are called on callback_loop,
+        defaulting to the running loop.
+        With suppress_unchanged_writes values a resource already has are
+        stripped from writes, which are skipped if nothing remains.
+        """
         self.session = session
         self.host = host
         self.port = port
         self.api_key = api_key
+        self.json_executor_threshold = json_executor_threshold
+        self.suppress_unchanged_writes = suppress_unchanged_writes
 
+        self.max_concurrent_requests = max_concurrent_requests
         self._sleep_tasks: dict[str, Task[None]] = {}
 
         self.connection_status_callback = connection_status
+        self.event_metrics = EventMetrics() if collect_metrics else None
+        self.request_metrics = RequestMetrics() if collect_metrics else None
+        self.callback_watchdog = CallbackWatchdog()
+
+        self._loop: AbstractEventLoop | None
+        try:
+            self._loop = get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+        self.dispatcher: ThreadedDispatcher | None = None
+        self.write_lock: AbstractContextManager[Any] = nullcontext()
+        if dispatch_mode == DispatchMode.THREAD:
+            loop = callback_loop or self._loop
+            if loop is None:
+                raise RuntimeError("Threaded dispatch requires an event loop")
+            self.dispatcher = ThreadedDispatcher(self, loop)
+            self.write_lock = self.dispatcher.lock
+        self._request_hooks: list[
+            tuple[RequestHookType | None, RequestHookType | None]
+        ] = []
 
         self.config = Config({}, self.request)
+        self.devices = DeviceRegistry()
         self.events = EventHandler(self)
         self.websocket: WSClient | None = None
 
@@ -54,6 +174,8 @@ class DeconzSession:
         self.scenes = Scenes(self)
         self.sensors = SensorResourceManager(self)
 
+        self._snapshots = SnapshotBuilder(self)
+
     async def get_api_key(
         self,
         api_key: str | None = None,
@@ -81,8 +203,15 @@ class DeconzSession:
 
         return response[0]["success"]["username"]
 
-    def start(self, websocketport: int | None = None) -> None:
-        """Connect websocket to deCONZ."""
+    def start(
+        self,
+        websocketport: int | None = None,
+        recorder: WSRecorder | None = None,
+    ) -> None:
+        """Connect websocket to deCONZ.
+
+        Received websocket frames are appended to recorder if provided.
+        """
         if self.config.websocket_port is not None:
             websocketport = self.config.websocket_port
 
@@ -91,38 +220,205 @@ class DeconzSession:
             return
 
         self.websocket = WSClient(
-            self.session, self.host, websocketport, self.session_handler
+            self.session,
+            self.host,
+            websocketport,
+            self.session_handler,
+            recorder,
+            metrics=self.event_metrics,
+            frame_handler=self.dispatcher.submit if self.dispatcher else None,
+            priority=self.is_priority,
+            frame_filter=self.events.accepts,
         )
+        if self.dispatcher:
+            self.dispatcher.start()
         self.websocket.start()
 
     def close(self) -> None:
         """Close websession and websocket to deCONZ."""
         if self.websocket:
             self.websocket.stop()
+        if self.dispatcher:
+            self.dispatcher.stop()
+
+    async def refresh_state(self, mode: RefreshMode = RefreshMode.SINGLE) -> None:
+        """Read deCONZ parameters.
+
+        Supported modes:
+        - parallel, request each resource group concurrently
+        - single, decode the whole document before processing it
+        - stream, process each resource as soon as it has been received
+        """
+        if mode == RefreshMode.PARALLEL:
+            await self._refresh_state_parallel()
+            return
+
+        if mode == RefreshMode.STREAM:
+            await self._refresh_state_stream()
+            return
 
-    async def refresh_state(self) -> None:
-        """Read deCONZ parameters."""
         data = await self.request("get", "")
 
-        self.config.raw.update(data[ResourceGroup.CONFIG])
+        self._update_config(data[ResourceGroup.CONFIG])
 
         self.alarm_systems.process_raw(data.get(ResourceGroup.ALARM, {}))
         self.groups.process_raw(data[ResourceGroup.GROUP])
         self.lights.process_raw(data[ResourceGroup.LIGHT])
         self.sensors.process_raw(data[ResourceGroup.SENSOR])
 
-    def subscribe(self, callback: CallbackType) -> UnsubscribeType:
-        """Subscribe to status changes for all resources."""
+    async def _refresh_state_parallel(self) -> None:
+        """Request each resource group concurrently and process it when received.
+
+        Fall back to a single request if a resource group is not supported,
+        e.g. alarm systems on older firmware.
+        """
+        handlers: dict[str, Callable[[dict[str, Any]], None]] = {
+            ResourceGroup.CONFIG: self._update_config,
+            ResourceGroup.ALARM: self.alarm_systems.process_raw,
+            ResourceGroup.GROUP: self.groups.process_raw,
+            ResourceGroup.LIGHT: self.lights.process_raw,
+            ResourceGroup.SENSOR: self.sensors.process_raw,
+        }
+
+        limiter = Semaphore(self.max_concurrent_requests)
+
+        async def refresh(path: str, handler: Callable[[dict[str, Any]], None]) -> None:
+            async with limiter:
+                raw = await self.request("get", f"/{path}")
+            handler(raw)
+
+        tasks = [create_task(refresh(*item)) for item in handlers.items()]
+        try:
+            done, _ = await wait(tasks, return_when=FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
+
+        # Errors in request order, done is unordered
+        errors = [err for task in tasks if task in done and (err := task.exception())]
+        if not errors:
+            return
+
+        if not isinstance(error := errors[0], ResourceNotFound):
+            raise error
+
+        LOGGER.debug("Parallel refresh not supported (%s), using one request", error)
+        await self.refresh_state(RefreshMode.SINGLE)
+
+    async def _refresh_state_stream(self) -> None:
+        """Parse full state incrementally and process each resource when parsed."""
+        handlers: dict[str, Callable[[str, Any], None]] = {
+            ResourceGroup.ALARM: self.alarm_systems.process_item,
+            ResourceGroup.CONFIG: self.config.raw.__setitem__,
+            ResourceGroup.GROUP: self.groups.process_item,
+            ResourceGroup.LIGHT: self.lights.process_item,
+            ResourceGroup.SENSOR: self.sensors.process_item,
+        }
+        parser = JSONStreamParser(set(handlers))
+        url = f"http://{self.host}:{self.port}/api/{self.api_key}"
+        LOGGER.debug('Streaming "get" from "%s"', url)
+
+        try:
+            async with self.session.request("get", url) as res:
+                if res.content_type != "application/json":
+                    raise ResponseError(
+                        f"Invalid content type: {res.content_type} ({res})"
+                    )
+
+                async for chunk in res.content.iter_any():
+                    with self.write_lock:
+                        for group, id, raw in parser.feed(chunk):
+                            handlers[group](id, raw)
+
+        except aiohttp.client_exceptions.ClientError as err:
+            raise RequestError(
+                f"Error requesting data from {self.host}: {err}"
+            ) from None
+
+        _raise_on_error(parser.close())
+
+    def _update_config(self, raw: dict[str, Any]) -> None:
+        """Update configuration."""
+        with self.write_lock:
+            self.config.raw.update(raw)
+
+    def snapshot(self) -> Snapshot:
+        """Return consistent read-only view of all resources.
+
+        Safe to call from other threads, the snapshot is built
+        on the event loop in between processing events.
+        Only resources changed since the previous snapshot are copied.
+        """
+        if self.dispatcher is not None:
+            with self.write_lock:
+                return self._snapshots.build()
+
+        if self._loop is None or _running_loop() is self._loop:
+            return self._snapshots.build()
+
+        async def build() -> Snapshot:
+            return self._snapshots.build()
+
+        return run_coroutine_threadsafe(build(), self._loop).result()
+
+    def subscribe(
+        self,
+        callback: CallbackType | AsyncCallbackType,
+        concurrency: int = 1,
+        inline: bool = False,
+        predicate: Predicate | None = None,
+        max_queued: int = MAX_QUEUED,
+    ) -> UnsubscribeType:
+        """Subscribe to status changes for all resources.
+
+        Coroutine functions run on at most concurrency workers,
+        in order per resource ID.
+        Once max_queued invocations wait for a worker,
+        new ones are dropped and a warning is logged.
+        Inline callbacks are called on the dispatch thread in threaded mode.
+        Predicate limits callbacks to added or changed resources matching it.
+        """
+        deferred = iscoroutinefunction(callback)
+        if deferred:
+            callback = restore_changed_keys(callback)
+        sync_callback, async_subscriber = wrap_async(
+            callback, resource_id_key, concurrency, max_queued
+        )
         subscribers = [
-            self.alarm_systems.subscribe(callback),
-            self.groups.subscribe(callback),
-            self.lights.subscribe(callback),
-            self.sensors.subscribe(callback),
+            handler.subscribe(
+                freeze_changed_keys(sync_callback, handler.get)
+                if deferred
+                else sync_callback,
+                inline=inline,
+                predicate=predicate,
+            )
+            for handler in (self.alarm_systems, self.groups, self.lights, self.sensors)
         ]
 
         def unsubscribe() -> None:
             for subscriber in subscribers:
                 subscriber()
+            if async_subscriber:
+                async_subscriber.close()
+
+        return unsubscribe
+
+    def trace_requests(
+        self,
+        on_start: RequestHookType | None = None,
+        on_end: RequestHookType | None = None,
+    ) -> UnsubscribeType:
+        """Subscribe to start and end of REST requests, e.g. to emit spans.
+
+        on_start is called in the context of the caller.
+        Return function to unsubscribe.
+        """
+        hooks = (on_start, on_end)
+        self._request_hooks.append(hooks)
+
+        def unsubscribe() -> None:
+            self._request_hooks.remove(hooks)
 
         return unsubscribe
 
@@ -144,6 +440,8 @@ class DeconzSession:
             LOGGER.debug("Bridge is busy, schedule retry %s %s", path, str(json))
 
             if (tries := tries + 1) < 3:
+                if self.request_metrics is not None:
+                    self.request_metrics.retry(method, path)
                 self._sleep_tasks[path] = sleep_task = create_task(sleep(2 ** (tries)))
 
                 try:
@@ -156,6 +454,98 @@ class DeconzSession:
             self._sleep_tasks.pop(path, None)
             raise BridgeBusy
 
+    async def confirmed(
+        self, write: Awaitable[dict[str, Any]], timeout: float = CONFIRM_TIMEOUT
+    ) -> Future[float] | None:
+        """Make write and return a future resolving once deCONZ has applied it.
+
+        E.g. await session.confirmed(session.lights.lights.set_state("1", on=True)).
+        The future resolves with seconds from sending the write until the
+        resource reports the written values over the websocket,
+        or raises TimeoutError if it does not do so within timeout.
+        Commands and modifiers, e.g. alert and transition time, are not awaited.
+        None if write did not write to known resource data,
+        group actions are not confirmed as events do not report them.
+        """
+        futures: dict[str, Future[float]] = {}
+        token = _confirmations.set((timeout, futures))
+        try:
+            await write
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+        finally:
+            _confirmations.reset(token)
+
+        if not futures:
+            return None
+        if len(futures) == 1:
+            return next(iter(futures.values()))
+
+        async def all_confirmed() -> float:
+            return max(await gather(*futures.values()))
+
+        return create_task(all_confirmed())
+
+    def expect_write(
+        self, path: str, data: dict[str, Any], timeout: float = CONFIRM_TIMEOUT
+    ) -> Future[float] | None:
+        """Return future resolving once the resource written to has data.
+
+        None if path does not target known resource data or targets a section
+        holding the last command, e.g. group action, which events never update.
+        Registered under write lock so the dispatch thread sees the expectation
+        as soon as the resource data it was checked against changes.
+        """
+        with self.write_lock:
+            if (target := self._write_target(path)) is None or (
+                target[1] in COMMAND_SECTIONS
+            ):
+                return None
+            item, section, current = target
+            values = {
+                key: value
+                for key, value in data.items()
+                if key in current and key not in MODIFIERS and key not in COMMANDS
+            }
+            return item.expect(section, values, timeout)
+
+    def changed_values(self, path: str, data: dict[str, Any]) -> dict[str, Any]:
+        """Return data of a write to path without values the resource already has.
+
+        Data is returned as is if path does not target known resource data
+        or targets a section holding the last command, e.g. group action.
+        """
+        if (target := self._write_target(path)) is None or (
+            target[1] in COMMAND_SECTIONS
+        ):
+            return data
+        with self.write_lock:
+            return changed_values(target[2], data)
+
+    def _write_target(
+        self, path: str
+    ) -> tuple[APIItem, str | None, dict[str, Any]] | None:
+        """Return item, section and current section data written to by path."""
+        if (target := write_target(path)) is None:
+            return None
+        resource, id, section = target
+        handlers: dict[str, Any] = {
+            ResourceGroup.ALARM: self.alarm_systems,
+            ResourceGroup.GROUP: self.groups,
+            ResourceGroup.LIGHT: self.lights,
+            ResourceGroup.SENSOR: self.sensors,
+        }
+        if (handler := handlers.get(resource)) is None or (
+            item := handler.get(id)
+        ) is None:
+            return None
+        current = item.raw if section is None else item.raw.get(section)
+        if not isinstance(current, dict):
+            return None
+        return item, section, current
+
     async def request(
         self,
         method: str,
@@ -163,11 +553,63 @@ class DeconzSession:
         json: dict[str, Any] | None = None,
     ) -> dict[str, Any]:
         """Make a request to the API."""
-        response: dict[str, Any] = await self._request(
-            method,
-            url=f"http://{self.host}:{self.port}/api/{self.api_key}{path}",
-            json=json,
-        )
+        if (
+            method == "put"
+            and json
+            and (confirmations := _confirmations.get()) is not None
+            and path not in confirmations[1]
+            and (future := self.expect_write(path, json, confirmations[0]))
+        ):
+            confirmations[1][path] = future
+
+        if (
+            self.suppress_unchanged_writes
+            and method == "put"
+            and json
+            and not (json := self.changed_values(path, json))
+        ):
+            if self.request_metrics is not None:
+                self.request_metrics.suppress(method, path)
+            return {}
+
+        url = f"http://{self.host}:{self.port}/api/{self.api_key}{path}"
+
+        if self.request_metrics is None and not self._request_hooks:
+            response: dict[str, Any] = await self._request(method, url, json)
+            return response
+
+        return await self._traced_request(method, path, url, json)
+
+    async def _traced_request(
+        self,
+        method: str,
+        path: str,
+        url: str,
+        json: dict[str, Any] | None,
+    ) -> dict[str, Any]:
+        """Make a request to the API, record metrics and call request hooks."""
+        span = RequestSpan(method, path, endpoint_template(path))
+        if json is not None:
+            span.request_bytes = len(orjson.dumps(json))
+
+        for on_start, _ in self._request_hooks:
+            if on_start:
+                on_start(span)
+
+        try:
+            response: dict[str, Any] = await self._request(method, url, json, span)
+        except BaseException as err:
+            span.error = type(err).__name__
+            span.timeout = span.timeout or isinstance(err, TimeoutError)
+            raise
+        finally:
+            span.duration = perf_counter() - span.start
+            if self.request_metrics is not None:
+                self.request_metrics.record(span)
+            for _, on_end in self._request_hooks:
+                if on_end:
+                    on_end(span)
+
         return response
 
     async def _request(
@@ -175,8 +617,12 @@ class DeconzSession:
         method: str,
         url: str,
         json: dict[str, Any] | None = None,
+        span: RequestSpan | None = None,
     ) -> Any:
-        """Make a request."""
+        """Make a request.
+
+        Response size and timeouts are stored in span if provided.
+        """
         LOGGER.debug('Sending "%s" "%s" to "%s"', method, json, url)
 
         try:
@@ -186,18 +632,59 @@ class DeconzSession:
                         f"Invalid content type: {res.content_type} ({res})"
                     )
 
-                response = await res.json()
-                LOGGER.debug("HTTP request response: %s", pformat(response))
+                body = await res.read()
+                if span is not None:
+                    span.response_bytes = len(body)
+                response = await self._decode(body)
+                if LOGGER.isEnabledFor(logging.DEBUG):
+                    LOGGER.debug("HTTP request response: %s", pformat(response))
 
                 _raise_on_error(response)
 
                 return response
 
         except aiohttp.client_exceptions.ClientError as err:
+            if span is not None and isinstance(err, TimeoutError):
+                span.timeout = True
             raise RequestError(
                 f"Error requesting data from {self.host}: {err}"
             ) from None
 
+    async def _decode(self, body: bytes) -> Any:
+        """Decode JSON response body.
+
+        Large payloads are decoded in the default executor.
+        """
+        if not body.strip():
+            return None
+
+        try:
+            if len(body) > self.json_executor_threshold:
+                return await get_running_loop().run_in_executor(
+                    None, orjson.loads, body
+                )
+            return orjson.loads(body)
+
+        except orjson.JSONDecodeError as err:
+            raise ResponseError(f"Invalid JSON response: {err}") from None
+
+    def is_priority(self, data: dict[str, Any]) -> bool:
+        """Whether websocket event is safety or latency critical.
+
+        Alarm system events and events from fire, water, carbon monoxide,
+        alarm and ancillary control sensors, as well as switches with button
+        subscribers, are handled ahead of bulk traffic.
+        """
+        resource = data.get("r")
+        if resource == ResourceGroup.ALARM:
+            return True
+        if resource != ResourceGroup.SENSOR:
+            return False
+        id = data.get("id", "")
+        return self.sensors.is_safety_critical(
+            id
+        ) or self.sensors.switch.has_button_subscribers(id)
+
     async def session_handler(self, signal: Signal) -> None:
         """Signalling from websocket.
 
@@ -214,6 +701,14 @@ class DeconzSession:
             self.connection_status_callback(self.websocket.state == State.RUNNING)
 
 
+def _running_loop() -> AbstractEventLoop | None:
+    """Return event loop running in this thread, if any."""
+    try:
+        return get_running_loop()
+    except RuntimeError:
+        return None
+
+
 def _raise_on_error(data: list[dict[str, Any]] | dict[str, Any]) -> None:
     """Check response for error message."""
     if isinstance(data, list) and data:
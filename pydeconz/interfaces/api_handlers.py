@@ -10,14 +10,29 @@ from collections.abc import (
     KeysView,
     ValuesView,
 )
+from functools import wraps
+from inspect import iscoroutinefunction
 import itertools
 from typing import TYPE_CHECKING, Any, Generic
 
+from ..devices import DeviceRegistry
 from ..models import DataResource, ResourceGroup, ResourceType
 from ..models.event import Event, EventType
+from .indexes import ResourceIndex
+from .predicates import Predicate, PredicateIndex, PredicateSubscription
+from .subscriptions import (
+    MAX_QUEUED,
+    AsyncCallbackType,
+    AsyncSubscriber,
+    resource_id_key,
+    wrap_async,
+)
+from .views import AttributeView
 
 if TYPE_CHECKING:
+    from ..dispatch import ThreadedDispatcher
     from ..gateway import DeconzSession
+    from ..models.api import APIItem
 
 CallbackType = Callable[[EventType, str], None]
 SubscriptionType = tuple[Callable[[EventType, str], None], tuple[EventType, ...] | None]
@@ -26,6 +41,78 @@ UnsubscribeType = Callable[[], None]
 ID_FILTER_ALL = "*"
 
 
+def freeze_changed_keys(
+    callback: Callable[[EventType, str, APIItem | None, frozenset[str]], None],
+    get: Callable[[str], APIItem | None],
+) -> CallbackType:
+    """Pass the item and a frozen copy of its changed keys to callback.
+
+    The changed keys set of an item is reused by its next update.
+    """
+
+    @wraps(callback)
+    def freeze(event: EventType, id: str) -> None:
+        item = get(id)
+        callback(event, id, item, frozenset(item.changed_keys if item else ()))
+
+    return freeze
+
+
+def restore_changed_keys(
+    callback: CallbackType | AsyncCallbackType,
+) -> Callable[..., Any]:
+    """Set changed keys of the item to the frozen copy before callback."""
+    if iscoroutinefunction(callback):
+
+        @wraps(callback)
+        async def restore_async(
+            event: EventType,
+            id: str,
+            item: APIItem | None,
+            changed_keys: frozenset[str],
+        ) -> None:
+            if item is not None:
+                item.changed_keys = changed_keys
+            await callback(event, id)
+
+        return restore_async
+
+    @wraps(callback)
+    def restore(
+        event: EventType, id: str, item: APIItem | None, changed_keys: frozenset[str]
+    ) -> None:
+        if item is not None:
+            item.changed_keys = changed_keys
+        callback(event, id)
+
+    return restore
+
+
+def wrap_subscriber(
+    callback: CallbackType | AsyncCallbackType,
+    get: Callable[[str], APIItem | None],
+    concurrency: int,
+    dispatcher: ThreadedDispatcher | None = None,
+    max_queued: int = MAX_QUEUED,
+) -> tuple[CallbackType, AsyncSubscriber | None]:
+    """Wrap coroutine functions, and callbacks to call on the loop of dispatcher.
+
+    Callbacks called later see the changed keys of the item as signalled.
+    Return callback to subscribe and the async subscriber if created.
+    """
+    deferred = dispatcher is not None or iscoroutinefunction(callback)
+    if deferred:
+        callback = restore_changed_keys(callback)
+    sync_callback, async_subscriber = wrap_async(
+        callback, resource_id_key, concurrency, max_queued
+    )
+    if dispatcher is not None:
+        sync_callback = dispatcher.on_loop(sync_callback)
+    if deferred:
+        sync_callback = freeze_changed_keys(sync_callback, get)
+    return sync_callback, async_subscriber
+
+
 class APIHandler(Generic[DataResource]):  # noqa: UP046
     """Base class for a map of API Items."""
 
@@ -39,6 +126,15 @@ class APIHandler(Generic[DataResource]):  # noqa: UP046
         self.gateway = gateway
         self._items: dict[str, DataResource] = {}
         self._subscribers: dict[str, list[SubscriptionType]] = {ID_FILTER_ALL: []}
+        self._dispatch: dict[str, tuple[SubscriptionType, ...]] = {}
+        self._dispatch_all: tuple[SubscriptionType, ...] = ()
+        self._predicates = PredicateIndex()
+        self._index: ResourceIndex | None = None
+        self._views: tuple[AttributeView, ...] = ()
+        self._devices: DeviceRegistry | None = None
+        if self.resource_group in (ResourceGroup.LIGHT, ResourceGroup.SENSOR):
+            self._devices = gateway.devices
+        self._changed: set[str] = set()
 
         self.path = f"/{self.resource_group}"
 
@@ -52,8 +148,10 @@ class APIHandler(Generic[DataResource]):  # noqa: UP046
         """Post initialization method."""
         self.gateway.events.subscribe(
             self.process_event,
-            event_filter=(EventType.ADDED, EventType.CHANGED),
+            event_filter=(EventType.ADDED, EventType.CHANGED, EventType.DELETED),
             resource_filter=self.resource_group,
+            inline=True,
+            changed_filter=self.__contains__,
         )
 
     async def update(self) -> None:
@@ -63,48 +161,135 @@ class APIHandler(Generic[DataResource]):  # noqa: UP046
 
     def process_raw(self, raw: dict[str, dict[str, Any]]) -> None:
         """Process full data."""
-        for id, raw_item in raw.items():
-            self.process_item(id, raw_item)
+        with self.gateway.write_lock:
+            for id, raw_item in raw.items():
+                self.process_item(id, raw_item)
 
     def process_event(self, event: Event) -> None:
         """Process event."""
         if event.type == EventType.CHANGED and event.id in self:
-            self.process_item(event.id, event.changed_data)
+            if changed_data := event.changed_data:
+                self.process_item(event.id, changed_data)
             return
 
         if event.type == EventType.ADDED and event.id not in self:
             self.process_item(event.id, event.added_data)
 
+        elif event.type == EventType.DELETED:
+            self.remove_item(event.id)
+
     def process_item(self, id: str, raw: dict[str, Any]) -> None:
         """Process data."""
+        metrics = self.gateway.event_metrics
+
         if id in self._items:
             obj = self._items[id]
-            obj.update(raw)
+            if metrics is None:
+                obj.update(raw)
+            else:
+                metrics.update(obj, raw)
+            changed_keys = obj.changed_keys
+            if (index := self._index) is not None:
+                index.update(id, obj.raw, changed_keys)
+            if self._devices is not None and "uniqueid" in changed_keys:
+                self._devices.add(self.resource_group, id, obj)
+            for view in self._views:
+                view.update(id, obj, changed_keys)
             event = EventType.CHANGED
 
         else:
-            self._items[id] = self.item_cls(id, raw)
+            self._items[id] = obj = self.item_cls(id, raw)
+            obj.metrics = metrics
+            obj.watchdog = self.gateway.callback_watchdog
+            obj.dispatcher = self.gateway.dispatcher
+            if (index := self._index) is not None:
+                index.update(id, obj.raw)
+            if (devices := self._devices) is not None:
+                devices.add(self.resource_group, id, obj)
+            for view in self._views:
+                view.update(id, obj)
             event = EventType.ADDED
 
-        subscribers: list[SubscriptionType] = (
-            self._subscribers.get(id, []) + self._subscribers[ID_FILTER_ALL]
-        )
+        self._changed.add(id)
+        self.signal_subscribers(event, id, raw)
+
+    def remove_item(self, id: str) -> None:
+        """Remove item and signal subscribers."""
+        if self._items.pop(id, None) is None:
+            return
+        if self._index is not None:
+            self._index.remove(id)
+        if self._devices is not None:
+            self._devices.remove(self.resource_group, id)
+        for view in self._views:
+            view.remove(id)
+        self._changed.add(id)
+        self.signal_subscribers(EventType.DELETED, id)
+
+    def take_changed(self) -> set[str]:
+        """Return IDs of items added, changed or removed since last call."""
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def signal_subscribers(
+        self, event: EventType, id: str, raw: dict[str, Any] | None = None
+    ) -> None:
+        """Signal subscribers of item with id about event.
+
+        Predicate subscribers are signalled when raw, the processed data,
+        is provided.
+        """
+        subscribers = self._dispatch.get(id, self._dispatch_all)
+        if (
+            raw is not None
+            and self._predicates
+            and (matches := self._predicates.match(event, id, self._items[id].raw, raw))
+        ):
+            subscribers = (*subscribers, *matches)
+        if (metrics := self.gateway.event_metrics) is not None and not metrics.active:
+            metrics = None
+        if not (watchdog := self.gateway.callback_watchdog).enabled:
+            watchdog = None
         for callback, event_filter in subscribers:
             if event_filter is not None and event not in event_filter:
                 continue
-            callback(event, id)
+            if watchdog is not None:
+                watchdog.call(callback, (event, id), self.resource_group, id, metrics)
+            elif metrics is not None:
+                metrics.call(self.resource_group, callback, event, id)
+            else:
+                callback(event, id)
 
     def subscribe(
         self,
-        callback: CallbackType,
+        callback: CallbackType | AsyncCallbackType,
         event_filter: tuple[EventType, ...] | EventType | None = None,
         id_filter: tuple[str] | str | None = None,
+        concurrency: int = 1,
+        inline: bool = False,
+        predicate: Predicate | None = None,
+        max_queued: int = MAX_QUEUED,
     ) -> UnsubscribeType:
         """Subscribe to events.
 
         "callback" - callback function to call when on event.
+        Coroutine functions run on at most "concurrency" workers,
+        in order per resource ID.
+        Once "max_queued" invocations wait for a worker,
+        new ones are dropped and a warning is logged.
+        "inline" callbacks are called on the dispatch thread in threaded mode,
+        they must be thread-safe.
+        "predicate" limits callbacks to added or changed resources matching it.
         Return function to unsubscribe.
         """
+        sync_callback, async_subscriber = wrap_subscriber(
+            callback,
+            self._items.get,
+            concurrency,
+            None if inline else self.gateway.dispatcher,
+            max_queued,
+        )
+
         if isinstance(event_filter, EventType):
             event_filter = (event_filter,)
 
@@ -114,20 +299,81 @@ class APIHandler(Generic[DataResource]):  # noqa: UP046
         elif isinstance(id_filter, str):
             _id_filter = (id_filter,)
 
-        subscription = (callback, event_filter)
+        if predicate is not None:
+            if id_filter is not None:
+                predicate = predicate.restrict(_id_filter)
+            remove = self._predicates.subscribe(
+                PredicateSubscription(sync_callback, predicate, event_filter)
+            )
+
+            def unsubscribe_predicate() -> None:
+                remove()
+                if async_subscriber:
+                    async_subscriber.close()
+
+            return unsubscribe_predicate
+
+        # Subscriber lists are replaced rather than mutated
+        # so the dispatch thread can iterate them without locking.
+        subscription = (sync_callback, event_filter)
         for id in _id_filter:
-            if id not in self._subscribers:
-                self._subscribers[id] = []
-            self._subscribers[id].append(subscription)
+            self._subscribers[id] = [*self._subscribers.get(id, []), subscription]
+        self._update_dispatch()
 
         def unsubscribe() -> None:
             for id in _id_filter:
                 if id not in self._subscribers:
                     continue
-                self._subscribers[id].remove(subscription)
+                self._subscribers[id] = [
+                    s for s in self._subscribers[id] if s is not subscription
+                ]
+            self._update_dispatch()
+            if async_subscriber:
+                async_subscriber.close()
 
         return unsubscribe
 
+    def register_view(self, view: AttributeView) -> UnsubscribeType:
+        """Maintain view as items are added, changed and removed.
+
+        Return function to stop maintaining view.
+        """
+        for id, item in self._items.items():
+            view.update(id, item)
+        self._views = (*self._views, view)
+
+        def unregister() -> None:
+            self._views = tuple(v for v in self._views if v is not view)
+
+        return unregister
+
+    def _update_dispatch(self) -> None:
+        """Precompute subscribers to signal per item ID.
+
+        Signalling an item then only looks up an existing tuple.
+        """
+        subscribers_all = tuple(self._subscribers[ID_FILTER_ALL])
+        self._dispatch = {
+            id: (*subscribers, *subscribers_all)
+            for id, subscribers in self._subscribers.items()
+            if id != ID_FILTER_ALL and subscribers
+        }
+        self._dispatch_all = subscribers_all
+
+    def query(self, **criteria: Any) -> list[DataResource]:
+        """Return items matching all criteria using the secondary indexes.
+
+        Criteria are IndexKey names mapped to a value,
+        or to a function selecting values, e.g.
+        query(reachable=False, name=lambda name: "Kitchen" in name).
+        Indexes are built by the first query and maintained from then on.
+        """
+        if (index := self._index) is None:
+            index = self._index = ResourceIndex()
+            for id, item in self._items.items():
+                index.update(id, item.raw)
+        return [self._items[id] for id in index.query(criteria)]
+
     def items(self) -> ItemsView[str, DataResource]:
         """Return dictionary of IDs and API items."""
         return self._items.items()
@@ -144,6 +390,10 @@ class APIHandler(Generic[DataResource]):  # noqa: UP046
         """Get API item based on key, if no match return default."""
         return self._items.get(id, default)
 
+    def __contains__(self, obj_id: object) -> bool:
+        """Whether an API item with ID exists."""
+        return obj_id in self._items
+
     def __getitem__(self, obj_id: str) -> DataResource:
         """Get API item based on ID."""
         return self._items[obj_id]
@@ -178,23 +428,30 @@ class GroupedAPIHandler(Generic[DataResource]):  # noqa: UP046
         """Post initialization method."""
         self.gateway.events.subscribe(
             self.process_event,
-            event_filter=(EventType.ADDED, EventType.CHANGED),
+            event_filter=(EventType.ADDED, EventType.CHANGED, EventType.DELETED),
             resource_filter=self.resource_group,
+            inline=True,
+            changed_filter=self.__contains__,
         )
 
     def process_raw(self, raw: dict[str, dict[str, Any]]) -> None:
         """Process full data."""
-        for id, raw_item in raw.items():
-            self.process_item(id, raw_item)
+        with self.gateway.write_lock:
+            for id, raw_item in raw.items():
+                self.process_item(id, raw_item)
 
     def process_event(self, event: Event) -> None:
         """Process event."""
         if event.type == EventType.CHANGED and event.id in self:
-            self.process_item(event.id, event.changed_data)
+            if changed_data := event.changed_data:
+                self.process_item(event.id, changed_data)
 
         elif event.type == EventType.ADDED and event.id not in self:
             self.process_item(event.id, event.added_data)
 
+        elif event.type == EventType.DELETED:
+            self.remove_item(event.id)
+
     def process_item(self, id: str, raw: dict[str, Any]) -> None:
         """Process item data."""
         for handler in self._handlers:
@@ -210,24 +467,74 @@ class GroupedAPIHandler(Generic[DataResource]):  # noqa: UP046
         handler = self._resource_type_to_handler[resource_type]
         handler.process_item(id, raw)
 
+    def remove_item(self, id: str) -> None:
+        """Remove item from the handler managing it."""
+        for handler in self._handlers:
+            if id in handler:
+                handler.remove_item(id)
+                return
+
+    def take_changed(self) -> set[str]:
+        """Return IDs of items added, changed or removed since last call."""
+        return set().union(*(handler.take_changed() for handler in self._handlers))
+
     def subscribe(
         self,
-        callback: CallbackType,
+        callback: CallbackType | AsyncCallbackType,
         event_filter: tuple[EventType, ...] | EventType | None = None,
         id_filter: tuple[str] | str | None = None,
+        concurrency: int = 1,
+        inline: bool = False,
+        predicate: Predicate | None = None,
+        max_queued: int = MAX_QUEUED,
     ) -> UnsubscribeType:
-        """Subscribe to state changes for all grouped handler resources."""
+        """Subscribe to state changes for all grouped handler resources.
+
+        Coroutine functions share "concurrency" workers across handlers,
+        invocations beyond "max_queued" waiting ones are dropped.
+        Handlers not managing any of the predicate types are skipped.
+        """
+        sync_callback, async_subscriber = wrap_subscriber(
+            callback, self.get, concurrency, max_queued=max_queued
+        )
+        handlers = self._handlers
+        if predicate is not None and (types := predicate.types) is not None:
+            handlers = [
+                h for h in handlers if h.resource_types and types & h.resource_types
+            ]
         subscribers = [
-            h.subscribe(callback, event_filter=event_filter, id_filter=id_filter)
-            for h in self._handlers
+            h.subscribe(
+                sync_callback,
+                event_filter=event_filter,
+                id_filter=id_filter,
+                inline=inline,
+                predicate=predicate,
+            )
+            for h in handlers
         ]
 
         def unsubscribe() -> None:
             for subscriber in subscribers:
                 subscriber()
+            if async_subscriber:
+                async_subscriber.close()
 
         return unsubscribe
 
+    def register_view(self, view: AttributeView) -> UnsubscribeType:
+        """Maintain view over items of all handlers."""
+        unregisters = [h.register_view(view) for h in self._handlers]
+
+        def unregister() -> None:
+            for unregister_handler in unregisters:
+                unregister_handler()
+
+        return unregister
+
+    def query(self, **criteria: Any) -> list[DataResource]:
+        """Return items of all handlers matching all criteria."""
+        return [item for h in self._handlers for item in h.query(**criteria)]
+
     def items(self) -> Iterable[tuple[str, DataResource]]:
         """Return dictionary of IDs and API items."""
         return itertools.chain.from_iterable(h.items() for h in self._handlers)
@@ -244,6 +551,10 @@ class GroupedAPIHandler(Generic[DataResource]):  # noqa: UP046
         """Get API item based on key, if no match return default."""
         return next((h[id] for h in self._handlers if id in h), default)
 
+    def __contains__(self, id: object) -> bool:
+        """Whether an API item with ID exists in any handler."""
+        return any(id in handler for handler in self._handlers)
+
     def __getitem__(self, id: str) -> DataResource:
         """Get API item based on ID."""
         if item := self.get(id):
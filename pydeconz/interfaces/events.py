@@ -4,10 +4,12 @@ from __future__ import annotations
 
 from collections.abc import Callable
 import logging
-from typing import TYPE_CHECKING, Any
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Final
 
 from ..models import ResourceGroup
-from ..models.event import Event, EventType
+from ..models.event import Event, EventKey, EventType
+from .subscriptions import MAX_QUEUED, AsyncCallbackType, event_key, wrap_async
 
 if TYPE_CHECKING:
     from ..gateway import DeconzSession
@@ -19,9 +21,99 @@ SubscriptionType = tuple[
     Callable[[Event], None],
     tuple[EventType, ...] | None,
     tuple[ResourceGroup, ...] | None,
+    Callable[[str], bool] | None,
 ]
 UnsubscribeType = Callable[[], None]
 
+ATTRIBUTE_NEEDLE: Final = f'"{EventKey.ATTRIBUTE}":'
+EVENT_NEEDLE: Final = f'"{EventKey.EVENT}":'
+ID_NEEDLE: Final = f'"{EventKey.ID}":'
+RESOURCE_NEEDLE: Final = f'"{EventKey.RESOURCE}":'
+CHANGED_DATA_NEEDLES: Final = tuple(
+    f'"{key}":' for key in (EventKey.STATE, EventKey.CONFIG, EventKey.NAME)
+)
+
+
+def header_value(frame: str, needle: str) -> str | None:
+    """Return string value following needle in an undecoded JSON frame.
+
+    A substring search instead of decoding the frame, None unless needle
+    occurs exactly once and is followed by a plain string.
+    """
+    if (start := frame.find(needle)) == -1 or frame.find(needle, start + 1) != -1:
+        return None
+    start += len(needle)
+    if (quote := frame.find('"', start)) == -1 or frame[start:quote].strip():
+        return None
+    if (end := frame.find('"', quote + 1)) == -1:
+        return None
+    value = frame[quote + 1 : end]
+    return None if "\\" in value else value
+
+
+def without_attribute(frame: str) -> str:
+    """Return undecoded JSON frame with its "attr" object cut out.
+
+    Attribute data carries "id" and "name" keys of its own.
+    The cut ends at the first closing brace, if the object is nested
+    or a string contains a brace more of the frame is kept, never less.
+    """
+    if (start := frame.find(ATTRIBUTE_NEEDLE)) == -1 or (
+        end := frame.find("}", start)
+    ) == -1:
+        return frame
+    return frame[:start] + frame[end + 1 :]
+
+
+class FrameFilter:
+    """Decide from its header whether a websocket frame has subscribers.
+
+    Compiled from the event and resource filters of subscriptions.
+    Changed events for subscriptions with a changed filter are only of
+    interest if they carry state, config or name data outside of "attr",
+    attribute only events are not, for an ID accepted by the changed filter.
+    Frames whose header can not be read unambiguously are accepted.
+    """
+
+    def __init__(self, subscriptions: list[SubscriptionType]) -> None:
+        """Initialize filter."""
+        self._everything: set[tuple[str, str]] = set()
+        self._changed: dict[tuple[str, str], tuple[Callable[[str], bool], ...]] = {}
+
+        for _, event_filter, resource_filter, changed_filter in subscriptions:
+            for event in event_filter or EventType:
+                for resource in resource_filter or ResourceGroup:
+                    key = (event, resource)
+                    if event != EventType.CHANGED or changed_filter is None:
+                        self._everything.add(key)
+                    else:
+                        self._changed[key] = (
+                            *self._changed.get(key, ()),
+                            changed_filter,
+                        )
+
+    def accepts(self, frame: str, current: bool = True) -> bool:
+        """Whether frame may be of interest to a subscriber.
+
+        IDs are only checked if current, i.e. all earlier frames
+        have been processed so known IDs are up to date.
+        """
+        if (event := header_value(frame, EVENT_NEEDLE)) is None or (
+            resource := header_value(frame, RESOURCE_NEEDLE)
+        ) is None:
+            return True
+        key = (event, resource)
+        if key in self._everything:
+            return True
+        if (changed_filters := self._changed.get(key)) is None:
+            return False
+        frame = without_attribute(frame)
+        if not any(needle in frame for needle in CHANGED_DATA_NEEDLES):
+            return False
+        if not current or (id := header_value(frame, ID_NEEDLE)) is None:
+            return True
+        return any(changed_filter(id) for changed_filter in changed_filters)
+
 
 class EventHandler:
     """Event handler class."""
@@ -30,40 +122,125 @@ class EventHandler:
         """Initialize API items."""
         self.gateway = gateway
         self._subscribers: list[SubscriptionType] = []
+        self._filter = FrameFilter(self._subscribers)
+        self._raw_subscribers: dict[
+            str, tuple[Callable[[dict[str, Any]], None], ...]
+        ] = {}
 
     def subscribe(
         self,
-        callback: Callable[[Event], None],
+        callback: Callable[[Event], None] | AsyncCallbackType,
         event_filter: tuple[EventType, ...] | EventType | None = None,
         resource_filter: tuple[ResourceGroup, ...] | ResourceGroup | None = None,
+        concurrency: int = 1,
+        inline: bool = False,
+        changed_filter: Callable[[str], bool] | None = None,
+        max_queued: int = MAX_QUEUED,
     ) -> UnsubscribeType:
         """Subscribe to events.
 
         "callback" - callback function to call when on event.
+        Coroutine functions run on at most "concurrency" workers,
+        in order per resource.
+        Once "max_queued" invocations wait for a worker,
+        new ones are dropped and a warning is logged.
+        "inline" callbacks are called on the dispatch thread in threaded mode,
+        they must be thread-safe.
+        "changed_filter" - changed events are only of interest for IDs it accepts
+        and if they carry state, config or name data,
+        other changed frames may be dropped before being decoded.
         Return function to unsubscribe.
         """
+        sync_callback, async_subscriber = wrap_async(
+            callback, event_key, concurrency, max_queued
+        )
+        if self.gateway.dispatcher is not None and not inline:
+            sync_callback = self.gateway.dispatcher.on_loop(sync_callback)
+
         if isinstance(event_filter, EventType):
             event_filter = (event_filter,)
         if isinstance(resource_filter, ResourceGroup):
             resource_filter = (resource_filter,)
 
-        subscription = (callback, event_filter, resource_filter)
-        self._subscribers.append(subscription)
+        # Subscriber lists are replaced rather than mutated
+        # so the dispatch thread can iterate them without locking.
+        subscription = (sync_callback, event_filter, resource_filter, changed_filter)
+        self._subscribers = [*self._subscribers, subscription]
+        self._filter = FrameFilter(self._subscribers)
+
+        def unsubscribe() -> None:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+            self._filter = FrameFilter(self._subscribers)
+            if async_subscriber:
+                async_subscriber.close()
+
+        return unsubscribe
+
+    def subscribe_raw(
+        self, callback: Callable[[dict[str, Any]], None], resource: ResourceGroup
+    ) -> UnsubscribeType:
+        """Subscribe to decoded events of resource group.
+
+        Callback is called with the decoded event before any other subscriber,
+        on the dispatch thread in threaded mode.
+        Meant for latency critical paths, it must be cheap and thread-safe.
+        Return function to unsubscribe.
+        """
+        self._raw_subscribers = {
+            **self._raw_subscribers,
+            resource: (*self._raw_subscribers.get(resource, ()), callback),
+        }
 
         def unsubscribe() -> None:
-            self._subscribers.remove(subscription)
+            remaining = tuple(
+                c for c in self._raw_subscribers.get(resource, ()) if c is not callback
+            )
+            raw_subscribers = self._raw_subscribers | {resource: remaining}
+            if not remaining:
+                del raw_subscribers[resource]
+            self._raw_subscribers = raw_subscribers
 
         return unsubscribe
 
+    def accepts(self, frame: str, current: bool = True) -> bool:
+        """Whether undecoded frame may be of interest to a subscriber.
+
+        IDs of changed events are only checked if current,
+        i.e. all earlier frames have been processed.
+        """
+        return self._filter.accepts(frame, current)
+
     def handler(self, raw: dict[str, Any]) -> None:
         """Receive event from websocket and pass it along to subscribers."""
-        event = Event.from_dict(raw)
+        if raw_subscribers := self._raw_subscribers.get(raw.get(EventKey.RESOURCE, "")):
+            for raw_callback in raw_subscribers:
+                raw_callback(raw)
 
-        for callback, event_filter, resource_filter in self._subscribers:
+        if (metrics := self.gateway.event_metrics) is None:
+            self.signal_subscribers(Event.from_dict(raw))
+            return
+
+        start = perf_counter()
+        event = Event.from_dict(raw)
+        metrics.begin(event.resource, start)
+        try:
+            self.signal_subscribers(event)
+        finally:
+            metrics.end(event.resource)
+
+    def signal_subscribers(self, event: Event) -> None:
+        """Pass event along to subscribers matching filters."""
+        if not (watchdog := self.gateway.callback_watchdog).enabled:
+            watchdog = None
+
+        for callback, event_filter, resource_filter, _ in self._subscribers:
             if event_filter is not None and event.type not in event_filter:
                 continue
 
             if resource_filter is not None and event.resource not in resource_filter:
                 continue
 
-            callback(event)
+            if watchdog is None:
+                callback(event)
+            else:
+                watchdog.call(callback, (event,), event.resource, event.id)
@@ -0,0 +1,132 @@
+"""Secondary indexes over resource attributes."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Set
+import enum
+from operator import methodcaller
+from typing import Any, Final
+
+from ..devices import mac_address
+
+
+class IndexKey(enum.StrEnum):
+    """Attributes resources are indexed on."""
+
+    LOW_BATTERY = "low_battery"
+    MAC = "mac"
+    MANUFACTURER = "manufacturer"
+    MODEL_ID = "model_id"
+    NAME = "name"
+    REACHABLE = "reachable"
+    TYPE = "type"
+
+
+def _nested(key: str) -> Callable[[dict[str, Any]], Any]:
+    """Read key from state or config."""
+
+    def value(raw: dict[str, Any]) -> Any:
+        for group in ("state", "config"):
+            if isinstance(data := raw.get(group), dict) and key in data:
+                return data[key]
+        return None
+
+    return value
+
+
+def _mac(raw: dict[str, Any]) -> str | None:
+    """Read MAC address part of unique ID."""
+    return mac_address(raw.get("uniqueid")) or None
+
+
+INDEXED: Final[dict[IndexKey, tuple[str, Callable[[dict[str, Any]], Any]]]] = {
+    IndexKey.LOW_BATTERY: ("lowbattery", _nested("lowbattery")),
+    IndexKey.MAC: ("uniqueid", _mac),
+    IndexKey.MANUFACTURER: (
+        "manufacturername",
+        methodcaller("get", "manufacturername"),
+    ),
+    IndexKey.MODEL_ID: ("modelid", methodcaller("get", "modelid")),
+    IndexKey.NAME: ("name", methodcaller("get", "name")),
+    IndexKey.REACHABLE: ("reachable", _nested("reachable")),
+    IndexKey.TYPE: ("type", methodcaller("get", "type")),
+}
+TRIGGER_KEYS: Final = frozenset(key for key, _ in INDEXED.values())
+
+
+class ResourceIndex:
+    """Map attribute values to IDs of resources having them.
+
+    Missing attributes and unhashable values are not indexed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize index."""
+        self._ids: dict[IndexKey, dict[Any, set[str]]] = {key: {} for key in IndexKey}
+        self._values: dict[str, dict[IndexKey, Any]] = {}
+
+    def update(
+        self, id: str, raw: dict[str, Any], changed_keys: Set[str] | None = None
+    ) -> None:
+        """Index resource, only re-index attributes in changed_keys if provided."""
+        indexed: Iterable[tuple[IndexKey, tuple[str, Callable[..., Any]]]]
+        if changed_keys is None:
+            indexed = INDEXED.items()
+        elif changed_keys.isdisjoint(TRIGGER_KEYS):
+            return
+        else:
+            indexed = [item for item in INDEXED.items() if item[1][0] in changed_keys]
+
+        if (values := self._values.get(id)) is None:
+            values = self._values[id] = {}
+        for key, (_, read) in indexed:
+            previous = values.get(key)
+            if (value := read(raw)) == previous:
+                continue
+            if previous is not None:
+                self._discard(key, values.pop(key), id)
+                if value is None:
+                    continue
+            try:
+                if (ids := self._ids[key].get(value)) is None:
+                    ids = self._ids[key][value] = set()
+            except TypeError:
+                continue
+            ids.add(id)
+            values[key] = value
+
+    def remove(self, id: str) -> None:
+        """Remove resource from index."""
+        for key, value in self._values.pop(id, {}).items():
+            self._discard(key, value, id)
+
+    def _discard(self, key: IndexKey, value: Any, id: str) -> None:
+        """Remove ID from value bucket, dropping empty buckets."""
+        ids = self._ids[key][value]
+        ids.discard(id)
+        if not ids:
+            del self._ids[key][value]
+
+    def lookup(self, key: IndexKey, value: Any) -> set[str]:
+        """Return IDs of resources matching value.
+
+        A callable value is called with each distinct indexed value
+        and matches if it returns True.
+        """
+        buckets = self._ids[key]
+        if callable(value):
+            return set().union(*(ids for v, ids in buckets.items() if value(v)))
+        return buckets.get(value, set())
+
+    def query(self, criteria: dict[str, Any]) -> set[str]:
+        """Return IDs of resources matching all criteria."""
+        matches: Iterable[set[str]] = sorted(
+            (self.lookup(IndexKey(key), value) for key, value in criteria.items()),
+            key=len,
+        )
+        result: set[str] | None = None
+        for ids in matches:
+            result = set(ids) if result is None else result & ids
+            if not result:
+                break
+        return result if result is not None else set(self._values)
@@ -0,0 +1,220 @@
+"""Declarative subscription predicates indexed at subscribe time."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass, replace
+import enum
+import operator
+from typing import Any, Final
+
+from ..models.event import EventType
+
+MISSING: Final = object()
+
+
+class Operator(enum.StrEnum):
+    """Comparison of an attribute value against a condition value."""
+
+    EQ = "=="
+    NE = "!="
+    GT = ">"
+    GE = ">="
+    LT = "<"
+    LE = "<="
+    IN = "in"
+
+
+OPERATORS: Final[dict[Operator, Callable[[Any, Any], bool]]] = {
+    Operator.EQ: operator.eq,
+    Operator.NE: operator.ne,
+    Operator.GT: operator.gt,
+    Operator.GE: operator.ge,
+    Operator.LT: operator.lt,
+    Operator.LE: operator.le,
+    Operator.IN: lambda value, values: value in values,
+}
+
+
+def lookup(raw: dict[str, Any], path: tuple[str, ...]) -> Any:
+    """Return value at path in raw data, MISSING if not present."""
+    value: Any = raw
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return MISSING
+        value = value[key]
+    return value
+
+
+@dataclass(frozen=True)
+class Condition:
+    """Attribute at path compared to value using operator.
+
+    Path is the key sequence into raw data, e.g. ("state", "buttonevent").
+    """
+
+    path: tuple[str, ...]
+    operator: Operator
+    value: Any
+
+    def matches(self, raw: dict[str, Any]) -> bool:
+        """Whether raw data fulfills condition, missing attributes never do."""
+        if (value := lookup(raw, self.path)) is MISSING:
+            return False
+        try:
+            return OPERATORS[self.operator](value, self.value)
+        except TypeError:
+            return False
+
+    @property
+    def keys(self) -> tuple[Hashable, ...]:
+        """Values an attribute can be bucketed on, empty if not indexable."""
+        if self.operator == Operator.EQ:
+            values: Iterable[Any] = (self.value,)
+        elif self.operator == Operator.IN:
+            values = self.value
+        else:
+            return ()
+        try:
+            return tuple({hash(value): value for value in values}.values())
+        except TypeError:
+            return ()
+
+
+def where(path: str, op: Operator | str, value: Any) -> Condition:
+    """Create condition from a dotted attribute path, e.g. "state.temperature".
+
+    Values of the in operator are stored as a frozenset.
+    """
+    op = Operator(op)
+    if op == Operator.IN:
+        value = frozenset(value)
+    return Condition(tuple(path.split(".")), op, value)
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """Declarative resource filter.
+
+    Matches resources of one of types, with one of ids,
+    fulfilling all conditions.
+    """
+
+    conditions: tuple[Condition, ...] = ()
+    ids: frozenset[str] | None = None
+    types: frozenset[str] | None = None
+
+    def matches(self, id: str, raw: dict[str, Any]) -> bool:
+        """Whether resource with id and raw data matches predicate."""
+        if self.ids is not None and id not in self.ids:
+            return False
+        if self.types is not None and raw.get("type") not in self.types:
+            return False
+        return all(condition.matches(raw) for condition in self.conditions)
+
+    def touched(self, update: dict[str, Any]) -> bool:
+        """Whether update contains an attribute used by a condition."""
+        if not self.conditions:
+            return True
+        return any(lookup(update, c.path) is not MISSING for c in self.conditions)
+
+    def restrict(self, ids: Iterable[str]) -> Predicate:
+        """Return predicate only matching resources with one of ids."""
+        ids = frozenset(ids)
+        return replace(self, ids=ids if self.ids is None else self.ids & ids)
+
+
+@dataclass(eq=False)
+class PredicateSubscription:
+    """Callback subscribed with a predicate."""
+
+    callback: Callable[[EventType, str], None]
+    predicate: Predicate
+    event_filter: tuple[EventType, ...] | None = None
+
+
+class PredicateIndex:
+    """Predicate subscriptions bucketed so only candidates are evaluated.
+
+    Subscriptions with an equality or membership condition are bucketed per
+    attribute value, others per resource ID, remaining ones are always
+    evaluated. Buckets are replaced rather than mutated, so they can be
+    iterated while subscribing from another thread.
+    """
+
+    def __init__(self) -> None:
+        """Initialize index."""
+        self._by_value: dict[
+            tuple[str, ...], dict[Hashable, tuple[PredicateSubscription, ...]]
+        ] = {}
+        self._by_id: dict[str, tuple[PredicateSubscription, ...]] = {}
+        self._other: tuple[PredicateSubscription, ...] = ()
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return number of subscriptions."""
+        return self._count
+
+    def subscribe(self, subscription: PredicateSubscription) -> Callable[[], None]:
+        """Add subscription, return function removing it."""
+        predicate = subscription.predicate
+        buckets: list[tuple[dict[Any, tuple[PredicateSubscription, ...]], Any]] = []
+
+        condition = next((c for c in predicate.conditions if c.keys), None)
+        if condition is not None:
+            values = self._by_value.setdefault(condition.path, {})
+            buckets = [(values, key) for key in condition.keys]
+        elif predicate.ids is not None:
+            buckets = [(self._by_id, id) for id in predicate.ids]
+
+        for bucket, key in buckets:
+            bucket[key] = (*bucket.get(key, ()), subscription)
+        if not buckets:
+            self._other = (*self._other, subscription)
+        self._count += 1
+
+        def unsubscribe() -> None:
+            for bucket, key in buckets:
+                if remaining := tuple(
+                    s for s in bucket.get(key, ()) if s is not subscription
+                ):
+                    bucket[key] = remaining
+                else:
+                    bucket.pop(key, None)
+            if not buckets:
+                self._other = tuple(s for s in self._other if s is not subscription)
+            self._count -= 1
+
+        return unsubscribe
+
+    def candidates(self, id: str, raw: dict[str, Any]) -> list[PredicateSubscription]:
+        """Return subscriptions that can match resource with id and raw data."""
+        candidates = [*self._other, *self._by_id.get(id, ())]
+        for path, values in self._by_value.items():
+            if (value := lookup(raw, path)) is MISSING:
+                continue
+            try:
+                candidates.extend(values.get(value, ()))
+            except TypeError:
+                continue
+        return candidates
+
+    def match(
+        self,
+        event: EventType,
+        id: str,
+        raw: dict[str, Any],
+        update: dict[str, Any],
+    ) -> list[tuple[Callable[[EventType, str], None], None]]:
+        """Return subscribers whose predicate matches resource after update.
+
+        Changes only match if the update contains an attribute
+        used by one of the predicate conditions.
+        """
+        return [
+            (subscription.callback, None)
+            for subscription in self.candidates(id, raw)
+            if (subscription.event_filter is None or event in subscription.event_filter)
+            and (event != EventType.CHANGED or subscription.predicate.touched(update))
+            and subscription.predicate.matches(id, raw)
+        ]
@@ -1,12 +1,17 @@
 """Python library to connect deCONZ and Home Assistant to work together."""
 
-from typing import Any, cast
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, cast
 
 from ..models import ResourceGroup
 from ..models.event import EventType
 from ..models.scene import Scene
 from .api_handlers import APIHandler
 
+if TYPE_CHECKING:
+    from ..gateway import DeconzSession
+
 
 class Scenes(APIHandler[Scene]):
     """Represent scenes of a deCONZ group."""
@@ -14,11 +19,17 @@ class Scenes(APIHandler[Scene]):
     item_cls = Scene
     resource_group = ResourceGroup.SCENE
 
+    def __init__(self, gateway: DeconzSession) -> None:
+        """Initialize scene handler."""
+        self._group_scenes: dict[str, set[str]] = {}
+        super().__init__(gateway)
+
     def _event_subscribe(self) -> None:
         """Register for group data events."""
         self.gateway.groups.subscribe(
             self.group_data_callback,
-            event_filter=(EventType.ADDED, EventType.CHANGED),
+            event_filter=(EventType.ADDED, EventType.CHANGED, EventType.DELETED),
+            inline=True,
         )
 
     async def create_scene(self, group_id: str, name: str) -> dict[str, Any]:
@@ -76,12 +87,38 @@ class Scenes(APIHandler[Scene]):
         )
 
     def group_data_callback(self, action: EventType, group_id: str) -> None:
-        """Subscribe callback for new group data."""
+        """Subscribe callback for new group data.
+
+        Only reconcile scenes of a changed group if its scene list has changed.
+        Scenes of a deleted group are removed.
+        """
+        if action == EventType.DELETED:
+            for scene_id in self._group_scenes.pop(group_id, set()):
+                self.remove_item(scene_id)
+            return
+        if (
+            action == EventType.CHANGED
+            and "scenes" not in self.gateway.groups[group_id].changed_keys
+        ):
+            return
         self.process_item(group_id, {})
 
     def process_item(self, id: str, raw: dict[str, Any]) -> None:
-        """Pre-process scene data."""
+        """Pre-process scene data.
+
+        Diff the scene list of the group against known scenes.
+        New or altered scenes are processed, scenes no longer listed are removed.
+        """
         group = self.gateway.groups[id]
 
+        scene_ids: set[str] = set()
         for scene in group.raw["scenes"]:
-            super().process_item(f"{id}_{scene['id']}", cast(dict[str, Any], scene))
+            scene_ids.add(scene_id := f"{id}_{scene['id']}")
+            if (obj := self._items.get(scene_id)) is not None and obj.raw == scene:
+                continue
+            super().process_item(scene_id, cast(dict[str, Any], scene))
+
+        for scene_id in self._group_scenes.get(id, set()) - scene_ids:
+            self.remove_item(scene_id)
+
+        self._group_scenes[id] = scene_ids
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
 from typing import TYPE_CHECKING, Any
 
 from ..models import ResourceGroup, ResourceType
@@ -50,11 +51,13 @@ from ..models.sensor.thermostat import (
 from ..models.sensor.time import Time
 from ..models.sensor.vibration import Vibration
 from ..models.sensor.water import Water
-from .api_handlers import APIHandler, GroupedAPIHandler
+from .api_handlers import APIHandler, GroupedAPIHandler, UnsubscribeType
 
 if TYPE_CHECKING:
     from ..gateway import DeconzSession
 
+ButtonCallbackType = Callable[[str, int], None]
+
 
 class AirPurifierHandler(APIHandler[AirPurifier]):
     """Handler for air purifier sensor."""
@@ -440,6 +443,82 @@ class SwitchHandler(APIHandler[Switch]):
     }
     item_cls = Switch
 
+    def __init__(self, gateway: DeconzSession, grouped: bool = False) -> None:
+        """Initialize switch handler."""
+        super().__init__(gateway, grouped)
+        self._buttons: dict[tuple[str, int | None], tuple[ButtonCallbackType, ...]] = {}
+        self._button_ids: dict[str, int] = {}
+        self._unsubscribe_raw: UnsubscribeType | None = None
+
+    def subscribe_button(
+        self,
+        callback: ButtonCallbackType,
+        id: str,
+        button_event: int | None = None,
+        inline: bool = False,
+    ) -> UnsubscribeType:
+        """Subscribe to button events of switch, any button if button_event is None.
+
+        Callback is called with switch ID and button event straight from the
+        websocket event, before the switch is updated and other subscribers
+        are signalled. Button events of subscribed switches are also
+        handled ahead of bulk traffic.
+        "inline" callbacks are called on the dispatch thread in threaded mode,
+        they must be thread-safe.
+        Return function to unsubscribe.
+        """
+        if self.gateway.dispatcher is not None and not inline:
+            callback = self.gateway.dispatcher.on_loop(callback)
+
+        key = (id, button_event)
+        self._buttons = {**self._buttons, key: (*self._buttons.get(key, ()), callback)}
+        self._button_ids[id] = self._button_ids.get(id, 0) + 1
+        if self._unsubscribe_raw is None:
+            self._unsubscribe_raw = self.gateway.events.subscribe_raw(
+                self._button_event, self.resource_group
+            )
+
+        def unsubscribe() -> None:
+            if callback not in self._buttons.get(key, ()):
+                return
+            buttons = self._buttons | {
+                key: tuple(c for c in self._buttons[key] if c is not callback)
+            }
+            if not buttons[key]:
+                del buttons[key]
+            self._buttons = buttons
+            if not (count := self._button_ids.pop(id) - 1):
+                if not self._button_ids and self._unsubscribe_raw is not None:
+                    self._unsubscribe_raw()
+                    self._unsubscribe_raw = None
+                return
+            self._button_ids[id] = count
+
+        return unsubscribe
+
+    def has_button_subscribers(self, id: str) -> bool:
+        """Whether switch ID has button subscribers."""
+        return id in self._button_ids
+
+    def _button_event(self, raw: dict[str, Any]) -> None:
+        """Signal button subscribers of a switch button event."""
+        if (state := raw.get("state")) is None or (
+            button_event := state.get("buttonevent")
+        ) is None:
+            return
+        if (id := raw.get("id")) not in self._button_ids or id not in self._items:
+            return
+
+        if not (watchdog := self.gateway.callback_watchdog).enabled:
+            watchdog = None
+        buttons = self._buttons
+        for key in ((id, button_event), (id, None)):
+            for callback in buttons.get(key, ()):
+                if watchdog is None:
+                    callback(id, button_event)
+                else:
+                    watchdog.call(callback, (id, button_event), self.resource_group, id)
+
     async def set_config(
         self,
         id: str,
@@ -728,3 +807,15 @@ class SensorResourceManager(GroupedAPIHandler[SensorResources]):
         ]
 
         super().__init__(gateway, handlers)
+
+        self._safety_handlers: tuple[APIHandler[Any], ...] = (
+            self.alarm,
+            self.ancillary_control,
+            self.carbon_monoxide,
+            self.fire,
+            self.water,
+        )
+
+    def is_safety_critical(self, id: str) -> bool:
+        """Whether sensor ID belongs to a fire, water, CO or alarm sensor."""
+        return any(id in handler for handler in self._safety_handlers)
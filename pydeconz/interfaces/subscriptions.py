@@ -0,0 +1,163 @@
+"""Subscriber adapters used by the API and event handlers."""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task, create_task
+from collections import deque
+from collections.abc import Callable, Coroutine, Hashable
+from inspect import iscoroutinefunction
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Final, cast
+
+if TYPE_CHECKING:
+    from ..models.event import Event, EventType
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_QUEUED: Final = 1000
+DROP_WARNING_INTERVAL: Final = 60
+
+AsyncCallbackType = Callable[..., Coroutine[Any, Any, None]]
+
+
+class AsyncSubscriber:
+    """Run a coroutine function subscriber on bounded workers.
+
+    Calling the subscriber only queues the arguments, so the synchronous
+    dispatch path is not blocked by slow consumers.
+    At most concurrency invocations run at a time and invocations sharing
+    a key, e.g. a resource ID, run one at a time in the order they were queued.
+    When max_queued invocations are waiting new invocations are dropped,
+    with a warning at most every DROP_WARNING_INTERVAL seconds.
+    """
+
+    def __init__(
+        self,
+        callback: AsyncCallbackType,
+        key: Callable[..., Hashable],
+        concurrency: int = 1,
+        max_queued: int = MAX_QUEUED,
+    ) -> None:
+        """Initialize subscriber."""
+        self.callback = callback
+        self.key = key
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+
+        self.queued = 0
+        self.dropped = 0
+        self._warned_dropped = 0
+        self._warned_at: float = -DROP_WARNING_INTERVAL
+
+        self._pending: dict[Hashable, deque[tuple[Any, ...]]] = {}
+        self._ready: deque[Hashable] = deque()
+        self._workers: set[Task[None]] = set()
+        self._running = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+
+    @property
+    def __wrapped__(self) -> AsyncCallbackType:
+        """Original callback, used to name it in metrics."""
+        return self.callback
+
+    def __call__(self, *args: Any) -> None:
+        """Queue invocation of callback with args."""
+        if self._closed:
+            return
+
+        if self.queued >= self.max_queued:
+            self.dropped += 1
+            if (now := time.monotonic()) - self._warned_at >= DROP_WARNING_INTERVAL:
+                LOGGER.warning(
+                    "Dropped %d invocations of %s, %d are queued",
+                    self.dropped - self._warned_dropped,
+                    self.callback,
+                    self.queued,
+                )
+                self._warned_at = now
+                self._warned_dropped = self.dropped
+            return
+
+        key = self.key(*args)
+        if (pending := self._pending.get(key)) is None:
+            pending = self._pending[key] = deque()
+            self._ready.append(key)
+        pending.append(args)
+        self.queued += 1
+        self._idle.clear()
+
+        if self._running < self.concurrency:
+            self._running += 1
+            task = create_task(self._work())
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+
+    async def _work(self) -> None:
+        """Process ready keys until there are none left.
+
+        A key is only ready while no worker processes it.
+        """
+        while self._ready:
+            key = self._ready.popleft()
+            pending = self._pending[key]
+            args = pending.popleft()
+            self.queued -= 1
+
+            try:
+                await self.callback(*args)
+            except Exception:
+                LOGGER.exception("Error in subscriber %s", self.callback)
+
+            if pending:
+                self._ready.append(key)
+            else:
+                del self._pending[key]
+
+        self._running -= 1
+        if self._running == 0:
+            self._idle.set()
+
+    async def join(self) -> None:
+        """Wait until all queued invocations are done."""
+        await self._idle.wait()
+
+    def close(self) -> None:
+        """Stop accepting invocations and cancel queued and running ones."""
+        self._closed = True
+        for task in self._workers:
+            task.cancel()
+        self._running = 0
+        self._pending.clear()
+        self._ready.clear()
+        self.queued = 0
+        self._idle.set()
+
+
+def resource_id_key(event: EventType, id: str, *args: Any) -> str:
+    """Order API handler callbacks per resource ID."""
+    return id
+
+
+def event_key(event: Event) -> tuple[str, str]:
+    """Order event handler callbacks per resource group and ID."""
+    return event.resource, event.id
+
+
+def wrap_async(
+    callback: Callable[..., Any],
+    key: Callable[..., Hashable],
+    concurrency: int,
+    max_queued: int = MAX_QUEUED,
+) -> tuple[Callable[..., None], AsyncSubscriber | None]:
+    """Wrap coroutine function in an AsyncSubscriber.
+
+    Return callback to subscribe and the async subscriber if created.
+    """
+    if not iscoroutinefunction(callback):
+        return cast(Callable[..., None], callback), None
+    subscriber = AsyncSubscriber(callback, key, concurrency, max_queued)
+    return subscriber, subscriber
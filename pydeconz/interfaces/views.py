@@ -0,0 +1,140 @@
+"""Sorted attribute views maintained as resources change."""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Callable, Set
+from datetime import UTC, datetime
+from operator import itemgetter
+import time
+from typing import Any
+
+from ..models.api import APIItem
+from .predicates import MISSING, lookup
+
+_value = itemgetter(0)
+
+
+def parse_time(value: Any) -> float | None:
+    """Convert deCONZ timestamp, e.g. state.lastupdated, to POSIX time.
+
+    deCONZ timestamps without time zone are in UTC.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=UTC)
+    return parsed.timestamp()
+
+
+class AttributeView:
+    """Resources ordered on the attribute at path.
+
+    Path is a dotted path into raw data, e.g. "config.battery",
+    values are passed through convert if provided.
+    Resources without the attribute, or with a None value, are left out.
+    Queries return items and only cost the number of items returned
+    on top of a binary search.
+    """
+
+    def __init__(self, path: str, convert: Callable[[Any], Any] | None = None) -> None:
+        """Initialize view."""
+        self.path = tuple(path.split("."))
+        self.convert = convert
+        self.triggers = frozenset(self.path[-1:])
+
+        self._entries: list[tuple[Any, str]] = []
+        self._values: dict[str, Any] = {}
+        self._items: dict[str, APIItem] = {}
+
+    def __len__(self) -> int:
+        """Return number of resources in view."""
+        return len(self._entries)
+
+    def value(self, id: str, raw: dict[str, Any]) -> Any:
+        """Return value to order resource on, None to leave it out."""
+        if (value := lookup(raw, self.path)) is MISSING:
+            return None
+        if self.convert is not None and value is not None:
+            return self.convert(value)
+        return value
+
+    def update(
+        self, id: str, item: APIItem, changed_keys: Set[str] | None = None
+    ) -> None:
+        """Reposition resource if an attribute in changed_keys affects it."""
+        if changed_keys is not None and self.triggers.isdisjoint(changed_keys):
+            return
+
+        previous = self._values.get(id)
+        if (value := self.value(id, item.raw)) == previous:
+            return
+        if previous is not None:
+            self.remove(id)
+        if value is None:
+            return
+        try:
+            insort(self._entries, (value, id))
+        except TypeError:
+            return
+        self._values[id] = value
+        self._items[id] = item
+
+    def remove(self, id: str) -> None:
+        """Remove resource from view."""
+        if (value := self._values.pop(id, None)) is None:
+            return
+        del self._items[id]
+        index = bisect_left(self._entries, (value, id))
+        del self._entries[index]
+
+    def smallest(self, k: int) -> list[APIItem]:
+        """Return k resources with the lowest values, lowest first."""
+        return [self._items[id] for _, id in self._entries[:k]]
+
+    def largest(self, k: int) -> list[APIItem]:
+        """Return k resources with the highest values, highest first."""
+        return [self._items[id] for _, id in reversed(self._entries[-k:])] if k else []
+
+    def below(self, limit: Any, inclusive: bool = False) -> list[APIItem]:
+        """Return resources with values below limit, lowest first."""
+        bisect = bisect_right if inclusive else bisect_left
+        end = bisect(self._entries, limit, key=_value)
+        return [self._items[id] for _, id in self._entries[:end]]
+
+    def above(self, limit: Any, inclusive: bool = False) -> list[APIItem]:
+        """Return resources with values above limit, lowest first."""
+        bisect = bisect_left if inclusive else bisect_right
+        start = bisect(self._entries, limit, key=_value)
+        return [self._items[id] for _, id in self._entries[start:]]
+
+
+class SinceView(AttributeView):
+    """Resources ordered on since when the attribute at path has been value.
+
+    E.g. SinceView("config.reachable", False) tracks unreachable sensors.
+    """
+
+    def __init__(
+        self, path: str, value: Any, clock: Callable[[], float] = time.time
+    ) -> None:
+        """Initialize view."""
+        super().__init__(path)
+        self.target = value
+        self.clock = clock
+
+    def value(self, id: str, raw: dict[str, Any]) -> Any:
+        """Return time attribute became target value, None if it is not."""
+        if lookup(raw, self.path) != self.target:
+            return None
+        if (since := self._values.get(id)) is not None:
+            return since
+        return self.clock()
+
+    def longer_than(self, seconds: float) -> list[APIItem]:
+        """Return resources having had the value for more than seconds."""
+        return self.below(self.clock() - seconds)
@@ -0,0 +1,158 @@
+"""Incremental parsing of the deCONZ full state document."""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Final
+
+import orjson
+
+from .errors import ResponseError
+
+STRING_END: Final = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+TOKEN: Final = re.compile(rb'["{}\[\]:,]')
+
+OBJECT_START: Final = ord("{")
+ARRAY_START: Final = ord("[")
+QUOTE: Final = ord('"')
+COLON: Final = ord(":")
+COMMA: Final = ord(",")
+
+StreamItemType = tuple[str, str, Any]
+
+
+class JSONStreamParser:
+    """Parse a JSON object of objects incrementally.
+
+    Fed chunks of a document like {"lights": {"1": {...}, "2": {...}}, ...}
+    each member of the selected top level objects is decoded and returned
+    as soon as its last byte has been received.
+    Only the bytes of the member currently being received are buffered.
+
+    If the root is not an object, as is the case with error responses,
+    the complete document is buffered and returned by close.
+    """
+
+    def __init__(self, groups: set[str]) -> None:
+        """Initialize parser, groups are the top level keys to return members of."""
+        self.groups = groups
+
+        self._buffer = bytearray()
+        self._position = 0
+        self._stack = bytearray()
+        self._expect_key = False
+        self._group = ""
+        self._key = ""
+        self._value_start: int | None = None
+        self._root_is_object: bool | None = None
+
+    def feed(self, chunk: bytes) -> list[StreamItemType]:
+        """Parse chunk and return completed (group, key, value) members."""
+        self._buffer += chunk
+
+        if self._root_is_object is None and not self._detect_root():
+            return []
+        if not self._root_is_object:
+            return []
+
+        items = self._scan()
+
+        # Keep only bytes still needed
+        keep = self._position if self._value_start is None else self._value_start
+        if keep:
+            del self._buffer[:keep]
+            self._position -= keep
+            if self._value_start is not None:
+                self._value_start -= keep
+
+        return items
+
+    def close(self) -> Any:
+        """Verify document is complete.
+
+        Return decoded document if root is not an object.
+        """
+        if self._root_is_object:
+            if self._stack:
+                raise ResponseError("Incomplete JSON document")
+            return None
+        return _decode(bytes(self._buffer))
+
+    def _detect_root(self) -> bool:
+        """Identify the type of the root element."""
+        if not (stripped := self._buffer.lstrip()):
+            return False
+        self._root_is_object = stripped[0] == OBJECT_START
+        return True
+
+    def _scan(self) -> list[StreamItemType]:
+        """Scan buffer for structural tokens."""
+        items: list[StreamItemType] = []
+        buffer = self._buffer
+        stack = self._stack
+
+        while match := TOKEN.search(buffer, self._position):
+            index = match.start()
+            token = buffer[index]
+
+            if token == QUOTE:
+                if (end := STRING_END.match(buffer, index + 1)) is None:
+                    self._position = index
+                    break
+                if self._expect_key:
+                    self._key = _decode(bytes(buffer[index : end.end()]))
+                    self._expect_key = False
+                self._position = end.end()
+                continue
+
+            depth = len(stack)
+
+            if token == COLON:
+                if depth == 2 and self._group:
+                    self._value_start = index + 1
+
+            elif token == COMMA:
+                if depth == 2 and self._value_start is not None:
+                    items.append(self._member(self._value_start, index))
+                self._expect_key = 0 < depth <= 2 and stack[-1] == OBJECT_START
+
+            elif token in (OBJECT_START, ARRAY_START):
+                self._open(token, depth)
+
+            else:
+                if depth == 2 and self._value_start is not None:
+                    items.append(self._member(self._value_start, index))
+                if depth == 2:
+                    self._group = ""
+                stack.pop()
+
+            self._position = index + 1
+
+        else:
+            self._position = len(buffer)
+
+        return items
+
+    def _open(self, token: int, depth: int) -> None:
+        """Enter object or array."""
+        self._stack.append(token)
+        if depth == 0:
+            self._expect_key = True
+        elif depth == 1:
+            self._expect_key = token == OBJECT_START
+            if self._expect_key and self._key in self.groups:
+                self._group = self._key
+
+    def _member(self, start: int, end: int) -> StreamItemType:
+        """Decode member value between start and end."""
+        value = _decode(bytes(self._buffer[start:end]))
+        self._value_start = None
+        return (self._group, self._key, value)
+
+
+def _decode(data: bytes) -> Any:
+    """Decode JSON data."""
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError as err:
+        raise ResponseError(f"Invalid JSON response: {err}") from None
@@ -0,0 +1,495 @@
+"""Low overhead latency and request metrics."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import enum
+from functools import lru_cache, partial
+import logging
+import threading
+from time import perf_counter, time
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from .models.api import APIItem
+
+LOGGER = logging.getLogger(__name__)
+
+LATENCY_BUCKETS: Final = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+SLOW_CALLBACK_THRESHOLD: Final = 0.05
+
+
+class LatencyStage(enum.StrEnum):
+    """Stage of processing a websocket event.
+
+    Supported stages:
+    - decode, frame received to decoded JSON
+    - queue, decoded to picked up by the session handler
+    - parse, creating Event from the decoded frame
+    - route, event parsed to API item update started
+    - update, API item update including item callbacks
+    - callback, each subscriber callback
+    - total, frame received to last callback returned
+    """
+
+    DECODE = "decode"
+    QUEUE = "queue"
+    PARSE = "parse"
+    ROUTE = "route"
+    UPDATE = "update"
+    CALLBACK = "callback"
+    TOTAL = "total"
+
+
+class Histogram:
+    """Fixed bucket histogram of durations in seconds."""
+
+    __slots__ = ("buckets", "count", "counts", "max", "total")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialize histogram with upper bounds of buckets."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add value to histogram."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float | None:
+        """Average of observed values."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, quantile: float) -> float | None:
+        """Upper bound of bucket containing quantile, e.g. 0.99."""
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Histogram as plain data, buckets keyed by upper bound."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "buckets": {
+                **dict(zip(map(str, self.buckets), self.counts, strict=False)),
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class _EventTimestamps(threading.local):
+    """Timestamps of the event being processed by the current thread."""
+
+    received: float | None = None
+    parsed: float | None = None
+
+
+class EventMetrics:
+    """Latency histograms of websocket events per resource group and stage.
+
+    Timestamps of the event being processed are kept per thread between
+    begin and end, so the dispatch thread and the event loop can both
+    process events. Histograms are updated under a lock for the same reason.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialize empty metrics."""
+        self.buckets = buckets
+        self.histograms: dict[tuple[str, LatencyStage], Histogram] = {}
+        self._event = _EventTimestamps()
+        self._lock = threading.Lock()
+
+    @property
+    def received(self) -> float | None:
+        """When the event being processed was received."""
+        return self._event.received
+
+    @received.setter
+    def received(self, received: float | None) -> None:
+        self._event.received = received
+
+    @property
+    def parsed(self) -> float | None:
+        """When the event being processed was parsed."""
+        return self._event.parsed
+
+    @parsed.setter
+    def parsed(self, parsed: float | None) -> None:
+        self._event.parsed = parsed
+
+    @property
+    def active(self) -> bool:
+        """Whether an event is being processed."""
+        return self.parsed is not None
+
+    def observe(self, resource: str, stage: LatencyStage, duration: float) -> None:
+        """Add duration of stage for resource group."""
+        with self._lock:
+            try:
+                histogram = self.histograms[resource, stage]
+            except KeyError:
+                histogram = self.histograms[resource, stage] = Histogram(self.buckets)
+            histogram.observe(duration)
+
+    def histogram(self, resource: str, stage: LatencyStage) -> Histogram | None:
+        """Histogram of stage for resource group."""
+        return self.histograms.get((resource, stage))
+
+    def frame_decoded(self, resource: str, received: float, decoded: float) -> None:
+        """Frame has been received and decoded by websocket."""
+        self.observe(resource, LatencyStage.DECODE, decoded - received)
+
+    def frame_dequeued(self, resource: str, received: float, decoded: float) -> None:
+        """Frame has been picked up for processing."""
+        self.received = received
+        self.observe(resource, LatencyStage.QUEUE, perf_counter() - decoded)
+
+    def begin(self, resource: str, start: float) -> None:
+        """Event has been parsed, start was taken before parsing."""
+        event = self._event
+        event.parsed = perf_counter()
+        self.observe(resource, LatencyStage.PARSE, event.parsed - start)
+        if event.received is None:
+            event.received = start
+
+    def end(self, resource: str) -> None:
+        """Event has been processed."""
+        event = self._event
+        if event.received is not None:
+            self.observe(resource, LatencyStage.TOTAL, perf_counter() - event.received)
+        event.received = event.parsed = None
+
+    def update(self, item: APIItem, raw: dict[str, Any]) -> None:
+        """Update item, timed if an event is being processed."""
+        if self.parsed is None:
+            item.update(raw)
+            return
+        start = perf_counter()
+        self.observe(item.resource_group, LatencyStage.ROUTE, start - self.parsed)
+        item.update(raw)
+        self.observe(item.resource_group, LatencyStage.UPDATE, perf_counter() - start)
+
+    def call(self, resource: str, callback: Callable[..., None], *args: Any) -> None:
+        """Call callback, timed if an event is being processed."""
+        if self.parsed is None:
+            callback(*args)
+            return
+        start = perf_counter()
+        try:
+            callback(*args)
+        finally:
+            self.observe(resource, LatencyStage.CALLBACK, perf_counter() - start)
+
+    def as_dict(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Histograms as plain data keyed by resource group and stage."""
+        data: dict[str, dict[str, dict[str, Any]]] = {}
+        with self._lock:
+            for (resource, stage), histogram in self.histograms.items():
+                data.setdefault(resource, {})[stage] = histogram.as_dict()
+        return data
+
+    def reset(self) -> None:
+        """Remove all observations."""
+        with self._lock:
+            self.histograms.clear()
+
+
+@lru_cache(maxsize=1024)
+def endpoint_template(path: str) -> str:
+    """Replace resource IDs in path, e.g. /lights/1/state -> /lights/{id}/state."""
+    return "/".join(
+        "{id}" if any(char.isdigit() for char in segment) else segment
+        for segment in path.split("/")
+    )
+
+
+@dataclass
+class RequestSpan:
+    """A REST request to deCONZ as seen by request hooks.
+
+    Hooks may annotate attributes, e.g. with the automation causing the request.
+    """
+
+    method: str
+    path: str
+    template: str
+    start: float = field(default_factory=perf_counter)
+    start_time: float = field(default_factory=time)
+    request_bytes: int = 0
+    response_bytes: int = 0
+    duration: float | None = None
+    error: str | None = None
+    timeout: bool = False
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def endpoint(self) -> str:
+        """Method and endpoint template, e.g. PUT /lights/{id}/state."""
+        return f"{self.method.upper()} {self.template}"
+
+
+class EndpointMetrics:
+    """Aggregated requests to one endpoint."""
+
+    __slots__ = (
+        "count",
+        "errors",
+        "latency",
+        "request_bytes",
+        "response_bytes",
+        "retries",
+        "suppressed",
+        "timeouts",
+    )
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Initialize empty endpoint metrics."""
+        self.count = 0
+        self.latency = Histogram(buckets)
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.suppressed = 0
+        self.timeouts = 0
+        self.errors: dict[str, int] = {}
+
+    def as_dict(self) -> dict[str, Any]:
+        """Endpoint metrics as plain data."""
+        return {
+            "count": self.count,
+            "latency": self.latency.as_dict(),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "retries": self.retries,
+            "suppressed": self.suppressed,
+            "timeouts": self.timeouts,
+            "errors": dict(self.errors),
+        }
+
+
+class RequestMetrics:
+    """Metrics of REST requests per endpoint template."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialize empty metrics."""
+        self.buckets = buckets
+        self.endpoints: dict[str, EndpointMetrics] = {}
+
+    def _endpoint(self, endpoint: str) -> EndpointMetrics:
+        """Get or create metrics of endpoint."""
+        try:
+            return self.endpoints[endpoint]
+        except KeyError:
+            metrics = self.endpoints[endpoint] = EndpointMetrics(self.buckets)
+            return metrics
+
+    def endpoint(self, method: str, path: str) -> EndpointMetrics | None:
+        """Metrics of endpoint matching method and path."""
+        return self.endpoints.get(f"{method.upper()} {endpoint_template(path)}")
+
+    def record(self, span: RequestSpan) -> None:
+        """Add finished request."""
+        metrics = self._endpoint(span.endpoint)
+        metrics.count += 1
+        if span.duration is not None:
+            metrics.latency.observe(span.duration)
+        metrics.request_bytes += span.request_bytes
+        metrics.response_bytes += span.response_bytes
+        if span.timeout:
+            metrics.timeouts += 1
+        if span.error is not None:
+            metrics.errors[span.error] = metrics.errors.get(span.error, 0) + 1
+
+    def retry(self, method: str, path: str) -> None:
+        """Add retry of request after bridge busy."""
+        self._endpoint(f"{method.upper()} {endpoint_template(path)}").retries += 1
+
+    def suppress(self, method: str, path: str) -> None:
+        """Add request skipped as it would not change anything."""
+        self._endpoint(f"{method.upper()} {endpoint_template(path)}").suppressed += 1
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        """Metrics as plain data keyed by endpoint."""
+        return {
+            endpoint: metrics.as_dict() for endpoint, metrics in self.endpoints.items()
+        }
+
+    def reset(self) -> None:
+        """Remove all observations."""
+        self.endpoints.clear()
+
+
+def callback_name(callback: Callable[..., Any]) -> str:
+    """Qualified name of callback, e.g. module.Class.method.
+
+    Partials and wrappers exposing __wrapped__ are named after what they wrap.
+    """
+    while True:
+        if isinstance(callback, partial):
+            callback = callback.func
+        elif (wrapped := getattr(callback, "__wrapped__", None)) is not None:
+            callback = wrapped
+        else:
+            break
+    if (qualname := getattr(callback, "__qualname__", None)) is None:
+        return repr(callback)
+    return f"{getattr(callback, '__module__', None)}.{qualname}"
+
+
+@dataclass
+class SlowCallback:
+    """Callback invocation slower than the watchdog threshold."""
+
+    name: str
+    resource: str
+    id: str
+    duration: float
+
+
+@dataclass
+class CallbackStatistics:
+    """Aggregated invocations of one callback."""
+
+    name: str
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    slow: int = 0
+
+    @property
+    def mean(self) -> float | None:
+        """Average duration in seconds."""
+        return self.total / self.count if self.count else None
+
+
+class _CallStack(threading.local):
+    """Time spent in nested callbacks per callback being called by a thread."""
+
+    def __init__(self) -> None:
+        """Initialize empty stack."""
+        self.nested: list[float] = []
+
+
+class CallbackWatchdog:
+    """Time subscriber callbacks and report those slower than threshold.
+
+    Durations exclude time spent in nested callbacks,
+    so a slow consumer is not attributed to the pydeCONZ handler calling it.
+    Nesting is tracked per thread and statistics are updated under a lock,
+    as callbacks are called by both the dispatch thread and the event loop.
+    Offenders are logged as warnings unless a report callback is provided.
+    """
+
+    def __init__(self) -> None:
+        """Initialize disabled watchdog."""
+        self.enabled = False
+        self.threshold: float = SLOW_CALLBACK_THRESHOLD
+        self.report: Callable[[SlowCallback], None] | None = None
+        self.callbacks: dict[str, CallbackStatistics] = {}
+        self._stack = _CallStack()
+        self._lock = threading.Lock()
+
+    def enable(
+        self,
+        threshold: float = SLOW_CALLBACK_THRESHOLD,
+        report: Callable[[SlowCallback], None] | None = None,
+    ) -> None:
+        """Start timing callbacks, threshold is in seconds."""
+        self.enabled = True
+        self.threshold = threshold
+        self.report = report
+
+    def disable(self) -> None:
+        """Stop timing callbacks."""
+        self.enabled = False
+
+    def call(
+        self,
+        callback: Callable[..., None],
+        args: tuple[Any, ...],
+        resource: str,
+        id: str,
+        metrics: EventMetrics | None = None,
+    ) -> None:
+        """Call and time callback, also observed by metrics if provided."""
+        nested = self._stack.nested
+        nested.append(0.0)
+        start = perf_counter()
+        try:
+            callback(*args)
+        finally:
+            duration = perf_counter() - start
+            exclusive = duration - nested.pop()
+            if nested:
+                nested[-1] += duration
+            if metrics is not None:
+                metrics.observe(resource, LatencyStage.CALLBACK, duration)
+            self.observe(callback, resource, id, exclusive)
+
+    def observe(
+        self, callback: Callable[..., None], resource: str, id: str, duration: float
+    ) -> None:
+        """Add duration of callback invocation for resource id."""
+        name = callback_name(callback)
+        with self._lock:
+            try:
+                statistics = self.callbacks[name]
+            except KeyError:
+                statistics = self.callbacks[name] = CallbackStatistics(name)
+            statistics.count += 1
+            statistics.total += duration
+            statistics.max = max(statistics.max, duration)
+            if duration <= self.threshold:
+                return
+            statistics.slow += 1
+
+        if self.report is not None:
+            self.report(SlowCallback(name, resource, id, duration))
+            return
+        LOGGER.warning(
+            "Callback %s for %s %s took %.3f seconds", name, resource, id, duration
+        )
+
+    def offenders(self, limit: int = 10) -> list[CallbackStatistics]:
+        """Callbacks with the most cumulative duration."""
+        with self._lock:
+            callbacks = list(self.callbacks.values())
+        return sorted(callbacks, key=lambda s: s.total, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        """Remove all observations."""
+        with self._lock:
+            self.callbacks.clear()
@@ -2,11 +2,19 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable
+from asyncio import Future, get_running_loop
+from collections.abc import Callable, Set
+from contextlib import nullcontext
+from dataclasses import dataclass
 import logging
+from time import perf_counter
 from typing import TYPE_CHECKING, Any
 
+from ..writes import differs
+
 if TYPE_CHECKING:
+    from ..dispatch import ThreadedDispatcher
+    from ..metrics import CallbackWatchdog, EventMetrics
     from . import ResourceGroup
 
 LOGGER = logging.getLogger(__name__)
@@ -15,6 +23,121 @@ SubscriptionType = Callable[..., None]
 UnsubscribeType = Callable[[], None]
 
 
+@dataclass(frozen=True)
+class Deadband:
+    """Smallest significant change of the attribute at path, e.g. "state.power".
+
+    A change is significant if it differs from the last delivered value
+    by at least absolute, or by at least relative times the last value.
+    The relative band does not apply to a last value of zero,
+    where the absolute band or else any change is significant.
+    Without bands any change is significant.
+    Non-numeric values are significant whenever they differ.
+    """
+
+    path: str
+    absolute: float = 0
+    relative: float = 0
+
+
+class DeadbandCallback:
+    """Call callback only on significant changes of item attributes.
+
+    The value of each attribute last delivered is kept per subscription,
+    starting with the value when subscribing.
+    """
+
+    __slots__ = ("bands", "callback", "item", "keys", "last")
+
+    def __init__(
+        self, item: APIItem, callback: SubscriptionType, deadbands: tuple[Deadband, ...]
+    ) -> None:
+        """Initialize deadband callback."""
+        self.item = item
+        self.callback = callback
+        self.bands = tuple(
+            (tuple(band.path.split(".")), band.absolute, band.relative)
+            for band in deadbands
+        )
+        self.keys = frozenset(path[-1] for path, _, _ in self.bands)
+        self.last = [self.value(path) for path, _, _ in self.bands]
+
+    def value(self, path: tuple[str, ...]) -> Any:
+        """Return value at path in item data, None if not present."""
+        value = self.item.raw
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    @property
+    def __wrapped__(self) -> SubscriptionType:
+        """Original callback, used to name it in metrics."""
+        return self.callback
+
+    def significant(self, index: int, value: Any) -> bool:
+        """Whether value differs significantly from the last delivered value."""
+        last = self.last[index]
+        if not isinstance(value, int | float) or not isinstance(last, int | float):
+            return bool(value != last)
+        _, absolute, relative = self.bands[index]
+        change = abs(value - last)
+        if not change:
+            return False
+        if relative > 0 and last and change >= relative * abs(last):
+            return True
+        if absolute > 0:
+            return change >= absolute
+        return not (relative > 0 and last)
+
+    def __call__(self) -> None:
+        """Call callback if a changed attribute moved outside its deadband."""
+        if self.keys.isdisjoint(self.item.changed_keys):
+            return
+        bands = self.bands
+        for index in range(len(bands)):
+            if self.significant(index, self.value(bands[index][0])):
+                break
+        else:
+            return
+        for index in range(len(bands)):
+            self.last[index] = self.value(bands[index][0])
+        self.callback()
+
+
+class Expectation:
+    """Values awaited in a section of item data, e.g. after a write."""
+
+    __slots__ = ("future", "section", "started", "values")
+
+    def __init__(
+        self, future: Future[float], section: str | None, values: dict[str, Any]
+    ) -> None:
+        """Initialize expectation."""
+        self.future = future
+        self.section = section
+        self.values = values
+        self.started = perf_counter()
+
+    def met(self, raw: dict[str, Any]) -> bool:
+        """Whether section of raw has all expected values."""
+        current = raw if self.section is None else raw.get(self.section)
+        if not isinstance(current, dict):
+            return False
+        return not any(differs(current, k, v) for k, v in self.values.items())
+
+    def resolve(self, now: float) -> None:
+        """Resolve future with seconds since expecting."""
+        if not self.future.done():
+            self.future.set_result(now - self.started)
+
+    def expire(self) -> None:
+        """Fail future as values were not seen in time."""
+        if not self.future.done():
+            self.future.set_exception(TimeoutError)
+
+
 class APIItem:
     """Base class for a deCONZ API item."""
 
@@ -25,10 +148,16 @@ class APIItem:
         self.resource_id = resource_id
         self.raw = raw
 
-        self.changed_keys: set[str] = set()
+        self.changed_keys: Set[str] = set()
+        self._changed_keys: set[str] = set()
+        self.metrics: EventMetrics | None = None
+        self.watchdog: CallbackWatchdog | None = None
+        self.dispatcher: ThreadedDispatcher | None = None
 
         self._callbacks: list[SubscriptionType] = []
         self._subscribers: list[SubscriptionType] = []
+        self._dispatch: tuple[SubscriptionType, ...] = ()
+        self._expectations: tuple[Expectation, ...] = ()
 
     @property
     def deconz_id(self) -> str:
@@ -38,37 +167,88 @@ class APIItem:
     def register_callback(self, callback: SubscriptionType) -> None:
         """Register callback for signalling."""
         self._callbacks.append(callback)
+        self._update_dispatch()
 
     def remove_callback(self, callback: SubscriptionType) -> None:
         """Remove callback previously registered."""
         if callback in self._callbacks:
             self._callbacks.remove(callback)
+            self._update_dispatch()
 
-    def subscribe(self, callback: SubscriptionType) -> UnsubscribeType:
+    def subscribe(
+        self, callback: SubscriptionType, *deadbands: Deadband
+    ) -> UnsubscribeType:
         """Subscribe to events.
 
+        With deadbands callback is only called when one of the attributes
+        changes significantly since it was last called.
         Return function to unsubscribe.
         """
+        if deadbands:
+            callback = DeadbandCallback(self, callback, deadbands)
         self._subscribers.append(callback)
+        self._update_dispatch()
 
         def unsubscribe() -> None:
             """Unsubscribe callback."""
             self._subscribers.remove(callback)
+            self._update_dispatch()
 
         return unsubscribe
 
+    def expect(
+        self, section: str | None, values: dict[str, Any], timeout: float
+    ) -> Future[float]:
+        """Return future resolving once section of item data has values.
+
+        Section None is the item data itself.
+        The result is seconds since expecting, TimeoutError is raised
+        if the values are not seen within timeout.
+        """
+        loop = get_running_loop()
+        expectation = Expectation(loop.create_future(), section, values)
+        # The dispatch thread updates items and checks expectations holding its lock
+        lock = nullcontext() if self.dispatcher is None else self.dispatcher.lock
+        with lock:
+            if expectation.met(self.raw):
+                expectation.resolve(expectation.started)
+                return expectation.future
+            self._expectations = (*self._expectations, expectation)
+
+        timer = loop.call_later(timeout, expectation.expire)
+
+        def done(_: Future[float]) -> None:
+            timer.cancel()
+            with lock:
+                self._expectations = tuple(
+                    e for e in self._expectations if e is not expectation
+                )
+
+        expectation.future.add_done_callback(done)
+        return expectation.future
+
+    def _update_dispatch(self) -> None:
+        """Precompute callbacks and subscribers to signal on update."""
+        self._dispatch = (*self._callbacks, *self._subscribers)
+
     def update(self, raw: dict[str, dict[str, Any]]) -> None:
         """Update input attr in self.
 
         Store a set of keys with changed values.
+        The set is reused by the next update unless events are dispatched
+        on a worker thread, copy it to keep it.
         """
-        changed_keys = set()
+        if (dispatcher := self.dispatcher) is None:
+            changed_keys = self._changed_keys
+            changed_keys.clear()
+        else:
+            changed_keys = set()
 
         for k, v in raw.items():
             changed_keys.add(k)
 
             if isinstance(self.raw.get(k), dict) and isinstance(v, dict):
-                changed_keys.update(set(v.keys()))
+                changed_keys.update(v)
                 self.raw[k].update(v)
 
             else:
@@ -76,5 +256,47 @@ class APIItem:
 
         self.changed_keys = changed_keys
 
-        for callback in self._callbacks + self._subscribers:
-            callback()
+        if self._expectations:
+            self._check_expectations()
+
+        if dispatcher is not None and dispatcher.in_worker():
+            dispatcher.call_soon(self.signal_callbacks, changed_keys)
+            return
+
+        self.signal_callbacks(changed_keys)
+
+    def _check_expectations(self) -> None:
+        """Resolve expectations met by item data."""
+        now = perf_counter()
+        threaded = self.dispatcher is not None and self.dispatcher.in_worker()
+        pending = []
+        for expectation in self._expectations:
+            if not expectation.met(self.raw):
+                pending.append(expectation)
+                continue
+            if threaded:
+                expectation.future.get_loop().call_soon_threadsafe(
+                    expectation.resolve, now
+                )
+            else:
+                expectation.resolve(now)
+        self._expectations = tuple(pending)
+
+    def signal_callbacks(self, changed_keys: Set[str]) -> None:
+        """Signal callbacks and subscribers about changed keys."""
+        self.changed_keys = changed_keys
+
+        if (metrics := self.metrics) is not None and not metrics.active:
+            metrics = None
+        if (watchdog := self.watchdog) is not None and not watchdog.enabled:
+            watchdog = None
+
+        for callback in self._dispatch:
+            if watchdog is not None:
+                watchdog.call(
+                    callback, (), self.resource_group, self.resource_id, metrics
+                )
+            elif metrics is not None:
+                metrics.call(self.resource_group, callback)
+            else:
+                callback()
@@ -0,0 +1,233 @@
+"""Manage multiple deCONZ gateways sharing connection resources."""
+
+from __future__ import annotations
+
+from asyncio import Semaphore, gather
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+import time
+from typing import Final, Self
+
+import aiohttp
+
+from .errors import pydeconzException
+from .gateway import DeconzSession
+from .interfaces.api_handlers import UnsubscribeType
+from .models.event import EventType
+
+LOGGER = logging.getLogger(__name__)
+
+LIMIT_PER_HOST: Final = 8
+MAX_CONCURRENCY: Final = 4
+
+PoolCallbackType = Callable[[str, EventType, str], None]
+PoolConnectionCallbackType = Callable[[str, bool], None]
+
+
+@dataclass
+class GatewayMetrics:
+    """Health and latency metrics of a gateway in the pool."""
+
+    host: str
+    port: int
+    bridge_id: str = ""
+    connected: bool = False
+    refresh_count: int = 0
+    refresh_failures: int = 0
+    last_refresh_duration: float | None = None
+    max_refresh_duration: float = 0.0
+    total_refresh_duration: float = 0.0
+
+    @property
+    def mean_refresh_duration(self) -> float | None:
+        """Average duration in seconds of successful refreshes."""
+        if self.refresh_count == 0:
+            return None
+        return self.total_refresh_duration / self.refresh_count
+
+
+@dataclass
+class PoolMetrics:
+    """Aggregated metrics of all gateways in the pool."""
+
+    gateways: int
+    connected: int
+    refresh_count: int
+    refresh_failures: int
+    mean_refresh_duration: float | None
+    max_refresh_duration: float
+
+
+class DeconzSessionPool:
+    """Manage a pool of deCONZ gateways.
+
+    Gateways share one aiohttp session whose connector limits connections
+    per host. Refreshing and starting gateways run concurrently,
+    capped by max_concurrency.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        limit_per_host: int = LIMIT_PER_HOST,
+        connection_status: PoolConnectionCallbackType | None = None,
+    ) -> None:
+        """Pool setup."""
+        self.limit_per_host = limit_per_host
+        self.connection_status_callback = connection_status
+
+        self._semaphore = Semaphore(max_concurrency)
+        self._session: aiohttp.ClientSession | None = None
+
+        self._gateways: dict[str, DeconzSession] = {}
+        self._started: set[str] = set()
+        self._metrics: dict[str, GatewayMetrics] = {}
+        self._subscribers: list[PoolCallbackType] = []
+
+    async def __aenter__(self) -> Self:
+        """Enter pool context."""
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        """Close pool when leaving context."""
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session, created on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.limit_per_host)
+            )
+        return self._session
+
+    @property
+    def gateways(self) -> dict[str, DeconzSession]:
+        """Gateways in pool keyed on "host:port"."""
+        return self._gateways
+
+    def add_gateway(self, host: str, port: int, api_key: str) -> DeconzSession:
+        """Add gateway to pool."""
+        key = f"{host}:{port}"
+        if key in self._gateways:
+            return self._gateways[key]
+
+        gateway = DeconzSession(
+            self.session,
+            host,
+            port,
+            api_key,
+            connection_status=lambda available: self._connection_status(key, available),
+        )
+        gateway.subscribe(
+            lambda event, id: self._signal_subscribers(gateway, event, id)
+        )
+
+        self._gateways[key] = gateway
+        self._metrics[key] = GatewayMetrics(host=host, port=port)
+        return gateway
+
+    def remove_gateway(self, host: str, port: int) -> None:
+        """Close and remove gateway from pool."""
+        key = f"{host}:{port}"
+        if gateway := self._gateways.pop(key, None):
+            gateway.close()
+            self._metrics.pop(key)
+            self._started.discard(key)
+
+    async def refresh(self) -> None:
+        """Refresh state of all gateways concurrently."""
+        await gather(*(self._refresh(key) for key in self._gateways))
+
+    async def start(self) -> None:
+        """Refresh gateways not yet started and connect their websockets.
+
+        Calling start again retries gateways whose refresh failed.
+        """
+        keys = self._gateways.keys() - self._started
+        self._started |= keys
+        await gather(*(self._refresh(key, start=True) for key in keys))
+
+    async def close(self) -> None:
+        """Close all websockets and the shared session."""
+        for gateway in self._gateways.values():
+            gateway.close()
+        self._started.clear()
+        if self._session is not None:
+            await self._session.close()
+
+    def subscribe(self, callback: PoolCallbackType) -> UnsubscribeType:
+        """Subscribe to status changes for all resources of all gateways.
+
+        Callback receives bridge ID, event type and resource ID.
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def gateway_metrics(self) -> dict[str, GatewayMetrics]:
+        """Return metrics per gateway keyed on "host:port"."""
+        return self._metrics
+
+    def metrics(self) -> PoolMetrics:
+        """Return metrics aggregated over all gateways."""
+        metrics = self._metrics.values()
+        refresh_count = sum(m.refresh_count for m in metrics)
+        total_duration = sum(m.total_refresh_duration for m in metrics)
+        return PoolMetrics(
+            gateways=len(metrics),
+            connected=sum(m.connected for m in metrics),
+            refresh_count=refresh_count,
+            refresh_failures=sum(m.refresh_failures for m in metrics),
+            mean_refresh_duration=(
+                total_duration / refresh_count if refresh_count else None
+            ),
+            max_refresh_duration=max(
+                (m.max_refresh_duration for m in metrics), default=0.0
+            ),
+        )
+
+    async def _refresh(self, key: str, start: bool = False) -> None:
+        """Refresh gateway state within the concurrency cap."""
+        gateway = self._gateways[key]
+        metrics = self._metrics[key]
+
+        async with self._semaphore:
+            begin = time.monotonic()
+            try:
+                await gateway.refresh_state()
+            except (pydeconzException, TimeoutError) as err:
+                metrics.refresh_failures += 1
+                LOGGER.error("Refreshing deCONZ gateway %s failed: %s", key, err)
+                if start:
+                    self._started.discard(key)
+                return
+            duration = time.monotonic() - begin
+
+        metrics.bridge_id = gateway.config.bridge_id
+        metrics.refresh_count += 1
+        metrics.last_refresh_duration = duration
+        metrics.max_refresh_duration = max(metrics.max_refresh_duration, duration)
+        metrics.total_refresh_duration += duration
+
+        if start:
+            gateway.start()
+
+    def _connection_status(self, key: str, available: bool) -> None:
+        """Track gateway connection state and pass it on."""
+        metrics = self._metrics[key]
+        metrics.connected = available
+        if self.connection_status_callback:
+            self.connection_status_callback(metrics.bridge_id, available)
+
+    def _signal_subscribers(
+        self, gateway: DeconzSession, event: EventType, id: str
+    ) -> None:
+        """Tag event with bridge ID and pass it to pool subscribers."""
+        bridge_id = gateway.config.bridge_id
+        for callback in self._subscribers:
+            callback(bridge_id, event, id)
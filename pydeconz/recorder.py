@@ -0,0 +1,190 @@
+"""Record websocket traffic from deCONZ and replay it.
+
+Recordings are append-only files starting with a magic header followed by
+records of a little-endian header (monotonic timestamp in nanoseconds,
+frame length) and the raw websocket frame.
+"""
+
+from __future__ import annotations
+
+from asyncio import sleep
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import mmap
+from pathlib import Path
+import struct
+import time
+from typing import TYPE_CHECKING, BinaryIO, Final, Self
+
+import orjson
+
+from .errors import pydeconzException
+
+if TYPE_CHECKING:
+    from .gateway import DeconzSession
+
+MAGIC: Final = b"PYDECONZREC\x01"
+RECORD_HEADER: Final = struct.Struct("<QI")
+FLUSH_SIZE: Final = 64 * 1024
+
+
+class RecordingError(pydeconzException):
+    """Recording is not valid."""
+
+
+class WSRecorder:
+    """Append raw websocket frames with monotonic timestamps to a file.
+
+    Records are buffered in memory and written by a single background thread
+    once flush_size bytes are pending, so recording never blocks the event loop
+    on disk I/O. Remaining records are written on flush and close.
+    """
+
+    def __init__(self, path: str | Path, flush_size: int = FLUSH_SIZE) -> None:
+        """Open recording for appending, write header to new recordings."""
+        self.path = Path(path)
+        self.frames = 0
+        self.flush_size = flush_size
+        self._buffer = bytearray()
+        self._file: BinaryIO = self.path.open("ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="pydeconz-recorder")
+
+    def record(self, frame: str | bytes, timestamp: int | None = None) -> None:
+        """Append frame, timestamp defaults to time.monotonic_ns()."""
+        if isinstance(frame, str):
+            frame = frame.encode()
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        self._buffer += RECORD_HEADER.pack(timestamp, len(frame))
+        self._buffer += frame
+        self.frames += 1
+        if len(self._buffer) >= self.flush_size:
+            self._submit()
+
+    def _submit(self) -> None:
+        """Hand buffered records to the writer thread."""
+        if self._buffer:
+            buffer, self._buffer = self._buffer, bytearray()
+            self._writer.submit(self._file.write, buffer)
+
+    def flush(self) -> None:
+        """Write all buffered records to disk and wait for it to finish."""
+        self._submit()
+        self._writer.submit(self._file.flush).result()
+
+    def close(self) -> None:
+        """Flush and close recording."""
+        self._submit()
+        self._writer.shutdown()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        """Use recorder as context manager."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close recording when leaving context."""
+        self.close()
+
+
+def read_recording(path: str | Path) -> Iterator[tuple[int, bytes]]:
+    """Yield timestamp and frame of each record.
+
+    The file is memory mapped so recordings larger than memory can be read.
+    """
+    with Path(path).open("rb") as file:
+        if not file.read(len(MAGIC)):
+            return
+        file.seek(0)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[: len(MAGIC)] != MAGIC:
+                raise RecordingError(f"Not a pydeCONZ recording: {path}")
+
+            offset = len(MAGIC)
+            while offset < len(data):
+                if offset + RECORD_HEADER.size > len(data):
+                    raise RecordingError(f"Truncated record at {offset}: {path}")
+                timestamp, length = RECORD_HEADER.unpack_from(data, offset)
+                offset += RECORD_HEADER.size
+                if offset + length > len(data):
+                    raise RecordingError(f"Truncated record at {offset}: {path}")
+                yield timestamp, data[offset : offset + length]
+                offset += length
+
+
+@dataclass
+class StageStatistics:
+    """Time spent in one stage of event processing."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, duration: float) -> None:
+        """Add duration in seconds of one event."""
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    @property
+    def mean(self) -> float | None:
+        """Average duration in seconds."""
+        return self.total / self.count if self.count else None
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of replaying a recording."""
+
+    events: int = 0
+    duration: float = 0.0
+    decode: StageStatistics = field(default_factory=StageStatistics)
+    dispatch: StageStatistics = field(default_factory=StageStatistics)
+    lag: StageStatistics = field(default_factory=StageStatistics)
+
+    @property
+    def events_per_second(self) -> float:
+        """Replay throughput."""
+        return self.events / self.duration if self.duration else 0.0
+
+
+async def replay(
+    gateway: DeconzSession,
+    path: str | Path,
+    realtime: bool = False,
+    speed: float = 1.0,
+) -> ReplayReport:
+    """Feed recorded frames to the event handler of gateway.
+
+    As fast as possible by default, with realtime frames are fed
+    with their recorded spacing divided by speed.
+    Lag is how late each frame was fed compared to its schedule.
+    """
+    report = ReplayReport()
+    handler = gateway.events.handler
+    clock = time.perf_counter
+    start = clock()
+    first_timestamp: int | None = None
+
+    for timestamp, frame in read_recording(path):
+        if realtime:
+            if first_timestamp is None:
+                first_timestamp = timestamp
+            due = start + (timestamp - first_timestamp) / 1e9 / speed
+            if (delay := due - clock()) > 0:
+                await sleep(delay)
+            report.lag.add(max(clock() - due, 0.0))
+
+        begin = clock()
+        data = orjson.loads(frame)
+        decoded = clock()
+        handler(data)
+        report.dispatch.add(clock() - decoded)
+        report.decode.add(decoded - begin)
+        report.events += 1
+
+    report.duration = clock() - start
+    return report
@@ -0,0 +1,97 @@
+"""Immutable point-in-time views of deCONZ resources for other threads."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+from .config import Config
+from .errors import pydeconzException
+from .models.api import APIItem
+
+if TYPE_CHECKING:
+    from .gateway import DeconzSession
+    from .interfaces.api_handlers import APIHandler, GroupedAPIHandler
+
+
+def freeze(value: Any) -> Any:
+    """Return read-only copy of decoded JSON value."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def freeze_item(item: APIItem) -> APIItem:
+    """Return copy of API item backed by a read-only copy of its data."""
+    return item.__class__(item.resource_id, freeze(item.raw))
+
+
+async def _read_only_request(*args: Any, **kwargs: Any) -> dict[str, Any]:
+    """Reject requests made through a snapshot."""
+    raise pydeconzException("Snapshots are read-only")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Consistent read-only view of all resources.
+
+    Unchanged items are shared with the previous snapshot.
+    """
+
+    version: int
+    config: Config
+    alarm_systems: Mapping[str, APIItem]
+    groups: Mapping[str, APIItem]
+    lights: Mapping[str, APIItem]
+    scenes: Mapping[str, APIItem]
+    sensors: Mapping[str, APIItem]
+
+
+class SnapshotBuilder:
+    """Build snapshots from resources changed since the previous snapshot."""
+
+    def __init__(self, gateway: DeconzSession) -> None:
+        """Initialize builder."""
+        self.gateway = gateway
+        self.latest: Snapshot | None = None
+
+    def build(self) -> Snapshot:
+        """Create snapshot, must be called from the event loop thread."""
+        gateway = self.gateway
+        previous = self.latest
+        self.latest = snapshot = Snapshot(
+            version=previous.version + 1 if previous else 1,
+            config=Config(freeze(gateway.config.raw), _read_only_request),
+            alarm_systems=self._update(
+                gateway.alarm_systems, previous.alarm_systems if previous else None
+            ),
+            groups=self._update(gateway.groups, previous.groups if previous else None),
+            lights=self._update(gateway.lights, previous.lights if previous else None),
+            scenes=self._update(gateway.scenes, previous.scenes if previous else None),
+            sensors=self._update(
+                gateway.sensors, previous.sensors if previous else None
+            ),
+        )
+        return snapshot
+
+    @staticmethod
+    def _update(
+        handler: APIHandler[Any] | GroupedAPIHandler[Any],
+        previous: Mapping[str, APIItem] | None,
+    ) -> Mapping[str, APIItem]:
+        """Copy previous items and replace those changed since."""
+        changed = handler.take_changed()
+        if previous is not None and not changed:
+            return previous
+
+        items = dict(previous or {})
+        for id in changed:
+            if (item := handler.get(id)) is None:
+                items.pop(id, None)
+            else:
+                items[id] = freeze_item(item)
+        return MappingProxyType(items)
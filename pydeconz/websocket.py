@@ -5,11 +5,15 @@ from collections import deque
 from collections.abc import Callable, Coroutine
 import enum
 import logging
+from time import perf_counter
 from typing import Any, Final
 
 import aiohttp
 import orjson
 
+from .metrics import EventMetrics
+from .recorder import WSRecorder
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -41,17 +45,38 @@ class WSClient:
         host: str,
         port: int,
         callback: Callable[[Signal], Coroutine[Any, Any, None]],
+        recorder: WSRecorder | None = None,
+        metrics: EventMetrics | None = None,
+        frame_handler: Callable[[str, float], None] | None = None,
+        priority: Callable[[dict[str, Any]], bool] | None = None,
+        frame_filter: Callable[[str, bool], bool] | None = None,
     ) -> None:
-        """Create resources for websocket communication."""
+        """Create resources for websocket communication.
+
+        Received frames are appended to recorder if provided.
+        Decode and queue latency is reported to metrics if provided.
+        Frames are passed undecoded with their receive time to frame_handler
+        if provided, instead of being signalled to callback.
+        Decoded frames for which priority returns True are queued on an express
+        lane which is always drained before bulk traffic.
+        Frames rejected by frame_filter are dropped before being decoded,
+        it is told whether all earlier frames have been processed.
+        """
         self.session = session
         self.host = host
         self.port = port
         self.session_handler_callback = callback
+        self.recorder = recorder
+        self.metrics = metrics
+        self.frame_handler = frame_handler
+        self.priority = priority
+        self.frame_filter = frame_filter
 
         self.loop = get_running_loop()
         self._background_tasks: set[Task[Any]] = set()
 
-        self._data: deque[dict[str, Any]] = deque()
+        self._data: deque[tuple[dict[str, Any], float, float]] = deque()
+        self._priority: deque[tuple[dict[str, Any], float, float]] = deque()
         self._state = self._previous_state = State.NONE
 
     def create_background_task(self, target: Coroutine[Any, Any, Any]) -> None:
@@ -68,11 +93,15 @@ class WSClient:
 
     @property
     def data(self) -> dict[str, Any]:
-        """Return data from data queue."""
+        """Return data from priority queue, or data queue if it is empty."""
         try:
-            return self._data.popleft()
+            queue = self._priority or self._data
+            data, received, decoded = queue.popleft()
         except IndexError:
             return {}
+        if self.metrics is not None:
+            self.metrics.frame_dequeued(data.get("r", ""), received, decoded)
+        return data
 
     @property
     def state(self) -> State:
@@ -113,11 +142,7 @@ class WSClient:
                         break
 
                     if msg.type == aiohttp.WSMsgType.TEXT:
-                        self._data.append(orjson.loads(msg.data))
-                        self.create_background_task(
-                            self.session_handler_callback(Signal.DATA)
-                        )
-                        LOGGER.debug(msg.data)
+                        self.text_frame(msg.data)
                         continue
 
                     if msg.type == aiohttp.WSMsgType.CLOSED:
@@ -139,6 +164,29 @@ class WSClient:
         if self._state != State.STOPPED:
             self.retry()
 
+    def text_frame(self, frame: str) -> None:
+        """Decode text frame and signal session handler."""
+        received = perf_counter()
+        if self.recorder:
+            self.recorder.record(frame)
+        if self.frame_handler:
+            self.frame_handler(frame, received)
+            return
+        if self.frame_filter is not None and not self.frame_filter(
+            frame, not self._data and not self._priority
+        ):
+            return
+        data = orjson.loads(frame)
+        decoded = perf_counter()
+        if self.metrics is not None:
+            self.metrics.frame_decoded(data.get("r", ""), received, decoded)
+        if self.priority is not None and self.priority(data):
+            self._priority.append((data, received, decoded))
+        else:
+            self._data.append((data, received, decoded))
+        self.create_background_task(self.session_handler_callback(Signal.DATA))
+        LOGGER.debug(frame)
+
     def stop(self) -> None:
         """Close websocket connection."""
         self.set_state(State.STOPPED)
@@ -0,0 +1,67 @@
+"""Suppress writes of values resources already have."""
+
+from __future__ import annotations
+
+from typing import Any, Final
+
+# Resource sections written to by PUT /{resource}/{id}/{section}
+WRITE_SECTIONS: Final = frozenset(("action", "config", "state"))
+
+# Keys changing how a write is applied rather than what is written
+MODIFIERS: Final = frozenset(("transitiontime",))
+
+# Keys triggering an action rather than setting a value
+COMMANDS: Final = frozenset(("alert",))
+
+# Sections holding the last command sent rather than the current state
+COMMAND_SECTIONS: Final = frozenset(("action",))
+
+# Colour keys and the colour mode in which they hold the current colour
+COLOR_MODES: Final = {"ct": "ct", "hue": "hs", "sat": "hs", "xy": "xy"}
+
+_MISSING: Final = object()
+
+
+def write_target(path: str) -> tuple[str, str, str | None] | None:
+    """Return resource group, ID and section written to by a PUT to path.
+
+    Section is None for writes to the resource itself, e.g. its name.
+    None if path does not write to resource data, e.g. a scene recall.
+    """
+    match path.strip("/").split("/"):
+        case [resource, id]:
+            return resource, id, None
+        case [resource, id, section] if section in WRITE_SECTIONS:
+            return resource, id, section
+    return None
+
+
+def differs(current: dict[str, Any], key: str, value: Any) -> bool:
+    """Whether value differs from the value of key in current."""
+    if isinstance(value, tuple):
+        value = list(value)
+    return bool(current.get(key, _MISSING) != value)
+
+
+def other_color_mode(current: dict[str, Any], key: str) -> bool:
+    """Whether key is a colour not shown in the current colour mode."""
+    return (mode := COLOR_MODES.get(key)) is not None and current.get(
+        "colormode"
+    ) != mode
+
+
+def changed_values(current: dict[str, Any], data: dict[str, Any]) -> dict[str, Any]:
+    """Return data without values current already has, empty if nothing differs.
+
+    Modifiers are kept along with other values but are not a change by themselves,
+    commands and colours of another colour mode are always kept.
+    """
+    changes = {
+        key: value
+        for key, value in data.items()
+        if key in MODIFIERS
+        or key in COMMANDS
+        or other_color_mode(current, key)
+        or differs(current, key, value)
+    }
+    return {} if MODIFIERS.issuperset(changes) else changes
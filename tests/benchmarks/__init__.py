@@ -0,0 +1,179 @@
+"""Benchmarks of pydeCONZ hot paths.
+
+Run all benchmarks and compare with the stored baseline:
+python -m tests.benchmarks --compare tests/benchmarks/baseline.json
+
+Store new baseline:
+python -m tests.benchmarks --output tests/benchmarks/baseline.json
+
+Replay websocket traffic recorded with pydeconz.recorder.WSRecorder:
+python -m tests.benchmarks --select replay --trace production.rec
+"""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+import gc
+import platform
+import time
+import tracemalloc
+from typing import Any, Final
+
+DEFAULT_SIZES: Final = (10, 100, 1000, 10000)
+REGRESSION_THRESHOLD: Final = 0.25
+
+BenchmarkType = Callable[[int], Awaitable["Measurement"]]
+
+BENCHMARKS: dict[str, BenchmarkType] = {}
+
+
+@dataclass
+class Measurement:
+    """Duration of a number of operations.
+
+    Allocated is the peak of bytes allocated on top of memory in use
+    before the operations, if measured.
+    """
+
+    seconds: float
+    operations: int
+    allocated: int = 0
+
+
+@dataclass
+class Result:
+    """Best measurement of a benchmark at a size."""
+
+    name: str
+    size: int
+    seconds: float
+    operations: int
+    allocated: int = 0
+
+    @property
+    def key(self) -> str:
+        """Identify result across runs."""
+        return f"{self.name}[{self.size}]"
+
+    @property
+    def operations_per_second(self) -> float:
+        """Throughput of benchmark."""
+        return self.operations / self.seconds if self.seconds else float("inf")
+
+
+@dataclass
+class Comparison:
+    """Result compared to its baseline."""
+
+    key: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        """Current duration relative to baseline duration."""
+        return self.current / self.baseline if self.baseline else 1.0
+
+
+def benchmark(name: str) -> Callable[[BenchmarkType], BenchmarkType]:
+    """Register benchmark."""
+
+    def register(func: BenchmarkType) -> BenchmarkType:
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def measure(func: Callable[[], Any], operations: int) -> Measurement:
+    """Time func with garbage collection disabled."""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+    return Measurement(seconds, operations)
+
+
+def measure_allocations(func: Callable[[], Any], operations: int) -> Measurement:
+    """Time func and trace the peak of memory it allocates.
+
+    Memory released before returning still counts towards the peak,
+    so per operation garbage shows up even without leaks.
+    """
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    return Measurement(seconds, operations, peak - before)
+
+
+async def measure_async(
+    func: Callable[[], Awaitable[Any]], operations: int
+) -> Measurement:
+    """Time awaiting func."""
+    gc.collect()
+    start = time.perf_counter()
+    await func()
+    return Measurement(time.perf_counter() - start, operations)
+
+
+async def run_benchmarks(
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+    repeat: int = 3,
+    selection: str = "",
+) -> list[Result]:
+    """Run benchmarks matching selection, keep best of repeat runs per size."""
+    from . import hot_paths  # noqa: F401, PLC0415
+
+    results = []
+    for name, func in BENCHMARKS.items():
+        if selection not in name:
+            continue
+        for size in sizes:
+            best = min(
+                [await func(size) for _ in range(repeat)], key=lambda m: m.seconds
+            )
+            results.append(
+                Result(name, size, best.seconds, best.operations, best.allocated)
+            )
+    return results
+
+
+def to_json(results: list[Result]) -> dict[str, Any]:
+    """Machine readable representation of results."""
+    return {
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "results": {result.key: asdict(result) for result in results},
+    }
+
+
+def compare(
+    results: list[Result],
+    baseline: dict[str, Any],
+    threshold: float = REGRESSION_THRESHOLD,
+) -> tuple[list[Comparison], list[Comparison]]:
+    """Compare results to baseline.
+
+    Return all comparisons and those slower than baseline by more than threshold.
+    """
+    comparisons = [
+        Comparison(result.key, reference["seconds"], result.seconds)
+        for result in results
+        if (reference := baseline["results"].get(result.key))
+    ]
+    return comparisons, [c for c in comparisons if c.ratio > 1 + threshold]
@@ -0,0 +1,64 @@
+"""Run pydeCONZ benchmarks from the command line."""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import sys
+
+from . import (
+    DEFAULT_SIZES,
+    REGRESSION_THRESHOLD,
+    benchmark,
+    compare,
+    run_benchmarks,
+    to_json,
+)
+from .hot_paths import replay_trace
+
+
+def main() -> int:
+    """Run benchmarks, return non-zero exit code on regression."""
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmarks")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="devices"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--select", default="", help="run matching benchmarks")
+    parser.add_argument("--output", type=Path, help="store results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument(
+        "--trace", type=Path, nargs="+", default=[], help="replay recordings"
+    )
+    args = parser.parse_args()
+
+    for path in args.trace:
+        benchmark(f"replay_{path.stem}")(replay_trace(path))
+
+    results = asyncio.run(run_benchmarks(tuple(args.sizes), args.repeat, args.select))
+
+    for result in results:
+        sys.stdout.write(
+            f"{result.key:<50} {result.seconds * 1000:>10.3f} ms"
+            f" {result.operations_per_second:>14.0f} ops/s"
+            f"{f' {result.allocated:>10} B' if result.allocated else ''}\n"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(to_json(results), indent=2) + "\n")
+
+    if not args.compare:
+        return 0
+
+    comparisons, regressions = compare(
+        results, json.loads(args.compare.read_text()), args.threshold
+    )
+    for comparison in comparisons:
+        sys.stdout.write(f"{comparison.key:<50} {comparison.ratio:>6.2f}x\n")
+    for regression in regressions:
+        sys.stdout.write(f"Regression: {regression.key} {regression.ratio:.2f}x\n")
+    return 1 if regressions else 0
+
+
+sys.exit(main())
@@ -0,0 +1,520 @@
+"""Benchmarks of the core hot paths."""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import gc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any
+from unittest.mock import Mock
+
+import aiohttp
+import orjson
+
+from pydeconz import DeconzSession
+from pydeconz.dispatch import DispatchMode
+from pydeconz.emulator import EMULATOR_API_KEY, DeconzEmulator, generate_state
+from pydeconz.gateway import RefreshMode
+from pydeconz.models.event import EventType
+from pydeconz.models.light.light import Light
+from pydeconz.models.sensor.thermostat import Thermostat, ThermostatMode
+from pydeconz.recorder import WSRecorder, replay
+from pydeconz.websocket import WSClient
+
+from . import (
+    BenchmarkType,
+    Measurement,
+    benchmark,
+    measure,
+    measure_allocations,
+    measure_async,
+)
+
+EVENTS = 10000
+PROCESSED_ITEMS = 1000
+EMULATOR_LATENCY = 0.005
+PRIORITY_EVENTS = 10
+TICK = 0.001
+
+
+@asynccontextmanager
+async def offline_session(devices: int, **kwargs: Any) -> AsyncIterator[DeconzSession]:
+    """Session whose requests are answered from a synthetic state document.
+
+    Requests only decode the pre-encoded document, no network is involved.
+    kwargs are passed to the session.
+    """
+    body = orjson.dumps(generate_state(devices), option=orjson.OPT_NON_STR_KEYS)
+
+    async def request(*args: Any, **kwargs: Any) -> dict[str, Any]:
+        return orjson.loads(body)
+
+    async with aiohttp.ClientSession() as session:
+        gateway = DeconzSession(session, "127.0.0.1", 80, EMULATOR_API_KEY, **kwargs)
+        gateway.request = request  # type: ignore[method-assign]
+        gateway.request_with_retry = request  # type: ignore[method-assign]
+        yield gateway
+
+
+@benchmark("refresh_state_populate")
+async def refresh_state_populate(size: int) -> Measurement:
+    """Decode full state document and populate all handlers."""
+    async with offline_session(size) as gateway:
+        return await measure_async(gateway.refresh_state, size)
+
+
+def _refresh_state_emulator(mode: RefreshMode) -> BenchmarkType:
+    """Benchmark refresh_state end-to-end against the emulator in mode."""
+
+    async def refresh_state_emulator(size: int) -> Measurement:
+        emulator = DeconzEmulator(generate_state(size), latency=EMULATOR_LATENCY)
+        await emulator.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                gateway = DeconzSession(
+                    session, emulator.host, emulator.port, EMULATOR_API_KEY
+                )
+                return await measure_async(lambda: gateway.refresh_state(mode), size)
+        finally:
+            await emulator.stop()
+
+    return refresh_state_emulator
+
+
+for _mode in RefreshMode:
+    benchmark(f"refresh_state_emulator_{_mode}")(_refresh_state_emulator(_mode))
+
+
+@benchmark("event_handler")
+async def event_handler(size: int) -> Measurement:
+    """Route changed events from websocket through EventHandler.handler."""
+    async with offline_session(size) as gateway:
+        await gateway.refresh_state()
+        emulator = DeconzEmulator(generate_state(size))
+        events = [emulator.create_event(EventType.CHANGED) for _ in range(EVENTS)]
+
+        def handle_events() -> None:
+            handler = gateway.events.handler
+            for event in events:
+                handler(event)
+
+        return measure(handle_events, EVENTS)
+
+
+@benchmark("process_item_subscribers")
+async def process_item_subscribers(size: int) -> Measurement:
+    """Process item changes with size subscribers on the handler."""
+    async with offline_session(0) as gateway:
+        handler = gateway.lights.lights
+        handler.process_item("1", {"type": "Extended color light", "state": {}})
+        for index in range(size):
+            handler.subscribe(
+                lambda event, id: None, id_filter="1" if index % 2 else None
+            )
+        updates = [{"state": {"bri": index % 255}} for index in range(PROCESSED_ITEMS)]
+
+        def process_items() -> None:
+            process_item = handler.process_item
+            for update in updates:
+                process_item("1", update)
+
+        return measure(process_items, PROCESSED_ITEMS)
+
+
+@benchmark("fanout_allocations")
+async def fanout_allocations(size: int) -> Measurement:
+    """Trace memory allocated processing changes with size subscribers.
+
+    Handler and item subscribers are split between the item ID and all items.
+    Metrics are off so only the fan-out paths are traced.
+    """
+    async with offline_session(0, collect_metrics=False) as gateway:
+        handler = gateway.lights.lights
+        handler.process_item("1", {"type": "Extended color light", "state": {}})
+        item = handler["1"]
+        for index in range(size):
+            handler.subscribe(
+                lambda event, id: None, id_filter="1" if index % 2 else None
+            )
+            item.subscribe(lambda: None)
+        updates = [{"state": {"bri": index % 255}} for index in range(PROCESSED_ITEMS)]
+        handler.process_item("1", updates[0])
+
+        def process_items() -> None:
+            process_item = handler.process_item
+            for update in updates:
+                process_item("1", update)
+
+        return measure_allocations(process_items, PROCESSED_ITEMS)
+
+
+@benchmark("grouped_handler_access")
+async def grouped_handler_access(size: int) -> Measurement:
+    """Get each sensor by ID and iterate over all sensors."""
+    async with offline_session(size) as gateway:
+        await gateway.refresh_state()
+        sensors = gateway.sensors
+        ids = list(sensors.keys())
+
+        def access() -> None:
+            for id in ids:
+                sensors.get(id)
+            for _ in sensors.items():
+                pass
+            for _ in sensors.values():
+                pass
+
+        return measure(access, 3 * len(ids))
+
+
+@benchmark("property_read")
+async def property_read(size: int) -> Measurement:
+    """Read common properties of all lights and thermostats."""
+    async with offline_session(size) as gateway:
+        await gateway.refresh_state()
+        lights: list[Light] = list(gateway.lights.lights.values())
+        thermostats: list[Thermostat] = list(gateway.sensors.thermostat.values())
+
+        def read_properties() -> None:
+            for light in lights:
+                _ = (
+                    light.brightness,
+                    light.color_mode,
+                    light.color_temp,
+                    light.effect,
+                    light.hue,
+                    light.on,
+                    light.reachable,
+                    light.saturation,
+                    light.xy,
+                )
+            for thermostat in thermostats:
+                _ = (
+                    thermostat.heating_setpoint,
+                    thermostat.locked,
+                    thermostat.mode,
+                    thermostat.offset,
+                    thermostat.preset,
+                    thermostat.scaled_temperature,
+                    thermostat.temperature,
+                    thermostat.valve,
+                )
+
+        return measure(read_properties, 9 * len(lights) + 8 * len(thermostats))
+
+
+@benchmark("set_state_request_building")
+async def set_state_request_building(size: int) -> Measurement:
+    """Build light state and thermostat config requests."""
+    async with offline_session(0) as gateway:
+        lights = gateway.lights.lights
+        thermostats = gateway.sensors.thermostat
+
+        async def set_states() -> None:
+            for index in range(size):
+                await lights.set_state(
+                    str(index),
+                    brightness=index % 255,
+                    on=True,
+                    transition_time=10,
+                    xy=(0.3, 0.3),
+                )
+                await thermostats.set_config(
+                    str(index),
+                    heating_setpoint=2000,
+                    locked=False,
+                    mode=ThermostatMode.HEAT,
+                )
+
+        return await measure_async(set_states, 2 * size)
+
+
+def replay_trace(path: Path) -> BenchmarkType:
+    """Benchmark replaying a recorded trace as fast as possible.
+
+    The session is populated with size synthetic devices before replaying.
+    """
+
+    async def replay_recording(size: int) -> Measurement:
+        async with offline_session(size) as gateway:
+            await gateway.refresh_state()
+            report = await replay(gateway, path)
+            return Measurement(report.duration, report.events)
+
+    return replay_recording
+
+
+@benchmark("replay_recording")
+async def replay_recording(size: int) -> Measurement:
+    """Record generated events and replay them as fast as possible."""
+    emulator = DeconzEmulator(generate_state(size))
+    with TemporaryDirectory() as directory:
+        path = Path(directory) / "events.rec"
+        with WSRecorder(path) as recorder:
+            for _ in range(EVENTS):
+                recorder.record(orjson.dumps(emulator.create_event()))
+        return await replay_trace(path)(size)
+
+
+def _dispatch(mode: DispatchMode) -> BenchmarkType:
+    """Benchmark decoding and routing websocket frames in dispatch mode.
+
+    Every light has a subscriber, measured until all of them have been called.
+    """
+
+    async def dispatch(size: int) -> Measurement:
+        async with offline_session(size, dispatch_mode=mode) as gateway:
+            await gateway.refresh_state()
+            emulator = DeconzEmulator(generate_state(size))
+            frames = [
+                orjson.dumps(emulator.create_event(EventType.CHANGED))
+                for _ in range(EVENTS)
+            ]
+            called = 0
+
+            def subscriber(event: EventType, id: str) -> None:
+                nonlocal called
+                called += 1
+
+            gateway.subscribe(subscriber)
+
+            async def dispatch_frames() -> None:
+                if (dispatcher := gateway.dispatcher) is None:
+                    handler = gateway.events.handler
+                    for frame in frames:
+                        handler(orjson.loads(frame))
+                    return
+                dispatcher.start()
+                for frame in frames:
+                    dispatcher.submit(frame, perf_counter())
+                dispatcher.stop()
+                while dispatcher.processed < EVENTS:
+                    await asyncio.sleep(0.001)
+                await asyncio.sleep(0)
+
+            measurement = await measure_async(dispatch_frames, EVENTS)
+            assert called
+            return measurement
+
+    return dispatch
+
+
+for _dispatch_mode in DispatchMode:
+    benchmark(f"dispatch_{_dispatch_mode}")(_dispatch(_dispatch_mode))
+
+
+def _dispatch_stall(mode: DispatchMode) -> BenchmarkType:
+    """Benchmark how long a burst of websocket frames blocks the event loop.
+
+    Duration is the worst lateness of a ticker on the loop while the burst
+    is received by the websocket client, decoded and routed in dispatch mode.
+    """
+
+    async def dispatch_stall(size: int) -> Measurement:
+        async with offline_session(size, dispatch_mode=mode) as gateway:
+            await gateway.refresh_state()
+            emulator = DeconzEmulator(generate_state(size))
+            frames = [
+                orjson.dumps(emulator.create_event(EventType.CHANGED)).decode()
+                for _ in range(EVENTS)
+            ]
+            gateway.subscribe(subscriber := Mock())
+            dispatcher = gateway.dispatcher
+            websocket = gateway.websocket = WSClient(
+                gateway.session,
+                gateway.host,
+                gateway.port,
+                gateway.session_handler,
+                frame_handler=dispatcher.submit if dispatcher else None,
+                frame_filter=gateway.events.accepts,
+            )
+            if dispatcher is not None:
+                dispatcher.start()
+
+            lateness = 0.0
+
+            async def tick() -> None:
+                nonlocal lateness
+                while True:
+                    due = perf_counter() + TICK
+                    await asyncio.sleep(TICK)
+                    lateness = max(lateness, perf_counter() - due)
+
+            ticker = asyncio.create_task(tick())
+            await asyncio.sleep(TICK)
+            for frame in frames:
+                websocket.text_frame(frame)
+            while websocket._background_tasks or (
+                dispatcher is not None and dispatcher.processed < EVENTS
+            ):
+                await asyncio.sleep(TICK)
+            await asyncio.sleep(TICK)
+            ticker.cancel()
+            if dispatcher is not None:
+                dispatcher.stop()
+            assert subscriber.called
+            return Measurement(lateness, 1)
+
+    return dispatch_stall
+
+
+for _dispatch_mode in DispatchMode:
+    benchmark(f"dispatch_stall_{_dispatch_mode}")(_dispatch_stall(_dispatch_mode))
+
+
+def _priority_lane(enabled: bool) -> BenchmarkType:
+    """Benchmark fire alarm latency during a storm of bulk websocket frames.
+
+    Duration is the worst latency from a fire frame being received
+    to its subscriber being called, with the priority lane enabled or not.
+    """
+
+    async def priority_lane(size: int) -> Measurement:
+        async with offline_session(size, collect_metrics=False) as gateway:
+            await gateway.refresh_state()
+            fire = gateway.sensors.fire
+            fire.process_item("fire", {"type": "ZHAFire", "state": {"fire": False}})
+            emulator = DeconzEmulator(generate_state(size))
+            frames = [
+                orjson.dumps(event).decode()
+                for _ in range(EVENTS)
+                if not gateway.is_priority(
+                    event := emulator.create_event(EventType.CHANGED)
+                )
+            ]
+            spacing = len(frames) // PRIORITY_EVENTS
+            for index in range(PRIORITY_EVENTS):
+                frames.insert(
+                    index * spacing + spacing // 2,
+                    orjson.dumps(
+                        {
+                            "t": "event",
+                            "e": "changed",
+                            "r": "sensors",
+                            "id": "fire",
+                            "state": {"fire": index % 2 == 0},
+                        }
+                    ).decode(),
+                )
+
+            websocket = gateway.websocket = WSClient(
+                gateway.session,
+                gateway.host,
+                gateway.port,
+                gateway.session_handler,
+                priority=gateway.is_priority if enabled else None,
+            )
+            sent: list[float] = []
+            latencies: list[float] = []
+            fire.subscribe(
+                lambda event, id: latencies.append(
+                    perf_counter() - sent[len(latencies)]
+                ),
+                id_filter="fire",
+            )
+
+            for frame in frames:
+                if '"fire"' in frame:
+                    sent.append(perf_counter())
+                websocket.text_frame(frame)
+            while websocket._background_tasks:
+                await asyncio.sleep(0)
+
+            assert len(latencies) == PRIORITY_EVENTS
+            return Measurement(max(latencies), 1)
+
+    return priority_lane
+
+
+benchmark("priority_lane_on")(_priority_lane(True))
+benchmark("priority_lane_off")(_priority_lane(False))
+
+
+def _websocket_frames(filtered: bool) -> BenchmarkType:
+    """Benchmark receiving websocket frames with or without the frame filter.
+
+    A fifth of the changed events only carry "attr" data nobody listens to.
+    """
+
+    async def websocket_frames(size: int) -> Measurement:
+        async with offline_session(size, collect_metrics=False) as gateway:
+            await gateway.refresh_state()
+            emulator = DeconzEmulator(generate_state(size))
+            frames = [
+                orjson.dumps(emulator.create_event(EventType.CHANGED)).decode()
+                for _ in range(EVENTS)
+            ]
+            websocket = gateway.websocket = WSClient(
+                gateway.session,
+                gateway.host,
+                gateway.port,
+                gateway.session_handler,
+                frame_filter=gateway.events.accepts if filtered else None,
+            )
+
+            async def receive_frames() -> None:
+                for frame in frames:
+                    websocket.text_frame(frame)
+                while websocket._background_tasks:
+                    await asyncio.sleep(0)
+
+            return await measure_async(receive_frames, EVENTS)
+
+    return websocket_frames
+
+
+benchmark("websocket_frames_filtered")(_websocket_frames(True))
+benchmark("websocket_frames_unfiltered")(_websocket_frames(False))
+
+
+def _button_latency(fast: bool) -> BenchmarkType:
+    """Benchmark frame to callback latency of switch button events.
+
+    Duration is the total latency from decoding a frame to the subscriber
+    being called, through subscribe_button or a regular subscription.
+    """
+
+    async def button_latency(size: int) -> Measurement:
+        async with offline_session(size) as gateway:
+            await gateway.refresh_state()
+            switch = gateway.sensors.switch
+            switch.process_item(
+                "button", {"type": "ZHASwitch", "state": {"buttonevent": 1002}}
+            )
+            frames = [
+                orjson.dumps(
+                    {
+                        "t": "event",
+                        "e": "changed",
+                        "r": "sensors",
+                        "id": "button",
+                        "state": {"buttonevent": (1002, 2002)[index % 2]},
+                    }
+                )
+                for index in range(EVENTS)
+            ]
+            start = latency = 0.0
+
+            def subscriber(*args: Any) -> None:
+                nonlocal latency
+                latency += perf_counter() - start
+
+            if fast:
+                switch.subscribe_button(subscriber, "button")
+            else:
+                switch.subscribe(subscriber, id_filter="button")
+
+            gc.collect()
+            handler = gateway.events.handler
+            for frame in frames:
+                start = perf_counter()
+                handler(orjson.loads(frame))
+            return Measurement(latency, EVENTS)
+
+    return button_latency
+
+
+benchmark("button_latency_fast")(_button_latency(True))
+benchmark("button_latency_generic")(_button_latency(False))
@@ -114,10 +114,10 @@ def mock_websocket_event(deconz_session, mock_wsclient):
             }
         else:
             assert id
-            assert data
+            assert data or event == EventType.DELETED
             event_data |= {
                 "id": id,
-                **data,
+                **(data or {}),
             }
             if resource in (ResourceGroup.LIGHT, ResourceGroup.SENSOR):
                 assert unique_id
@@ -1,5 +1,6 @@
 """Test pydeCONZ switch."""
 
+from pydeconz.models import ResourceGroup
 from pydeconz.models.sensor.switch import (
     SwitchDeviceMode,
     SwitchMode,
@@ -293,3 +294,67 @@ async def test_sensor_switch_ubisys_j1(deconz_sensor):
     assert sensor.software_version == "20190129-DE-FB0"
     assert sensor.type == "ZHASwitch"
     assert sensor.unique_id == "00:1f:ee:00:00:00:00:09-02-0102"
+
+
+async def test_button_subscription(deconz_refresh_state, mock_websocket_event):
+    """Verify button subscribers are called ahead of other subscribers."""
+    session = await deconz_refresh_state(
+        sensors={"1": DATA, "2": {"type": "ZHAPresence", "state": {}}}
+    )
+    switch = session.sensors.switch
+    calls = []
+    unsub_button = switch.subscribe_button(
+        lambda id, button_event: calls.append((id, button_event)), "1", 2002
+    )
+    unsub_any = switch.subscribe_button(
+        lambda id, button_event: calls.append((id, "any")), "1"
+    )
+    unsub_other = switch.subscribe_button(
+        lambda id, button_event: calls.append((id, "2")), "2"
+    )
+    session.sensors["1"].register_callback(lambda: calls.append(("1", "item")))
+
+    assert session.is_priority({"r": "sensors", "id": "1"})
+    assert not session.is_priority({"r": "lights", "id": "1"})
+
+    async def button(id, button_event):
+        await mock_websocket_event(
+            ResourceGroup.SENSOR,
+            id=id,
+            data={"state": {"buttonevent": button_event}},
+            unique_id=DATA["uniqueid"],
+        )
+
+    await button("1", 2002)
+    assert calls == [("1", 2002), ("1", "any"), ("1", "item")]
+
+    calls.clear()
+    await button("1", 1002)
+    await button("2", 1002)
+    await mock_websocket_event(
+        ResourceGroup.SENSOR,
+        id="1",
+        data={"config": {"battery": 80}},
+        unique_id=DATA["uniqueid"],
+    )
+    assert calls == [("1", "any"), ("1", "item"), ("1", "item")]
+
+    # Callbacks are guarded by the watchdog when it is enabled
+
+    session.callback_watchdog.enable()
+    calls.clear()
+    await button("1", 2002)
+    assert calls == [("1", 2002), ("1", "any"), ("1", "item")]
+    session.callback_watchdog.disable()
+
+    calls.clear()
+    unsub_button()
+    unsub_button()
+    unsub_any()
+    await button("1", 2002)
+    assert calls == [("1", "item")]
+    assert not switch.has_button_subscribers("1")
+    assert switch.has_button_subscribers("2")
+
+    unsub_other()
+    assert session.events._raw_subscribers == {}
@@ -9,6 +9,7 @@ import pytest
 
 from pydeconz.interfaces.api_handlers import ID_FILTER_ALL
 from pydeconz.interfaces.events import EventType
+from pydeconz.models.api import Deadband
 
 
 async def test_api_items(mock_aioresponse, deconz_refresh_state):
@@ -132,3 +133,80 @@ async def test_unsupported_resource_type(deconz_refresh_state):
     assert len(session.groups.keys()) == 1
     assert len(session.lights.keys()) == 1  # Legacy support
     assert len(session.sensors.keys()) == 0
+
+
+async def test_deadband_subscription(deconz_refresh_state):
+    """Verify deadband subscribers are only called on significant changes."""
+    session = await deconz_refresh_state(
+        sensors={
+            "1": {
+                "type": "ZHAPower",
+                "state": {"power": 100, "current": 1, "voltage": 230},
+                "config": {"on": True},
+            }
+        }
+    )
+    handler = session.sensors.power
+    sensor = handler["1"]
+
+    absolute = Mock()
+    sensor.subscribe(absolute, Deadband("state.power", absolute=10))
+    relative = Mock()
+    unsubscribe = sensor.subscribe(
+        relative, Deadband("state.power", relative=0.5), Deadband("state.voltage")
+    )
+    any_change = Mock()
+    sensor.subscribe(any_change, Deadband("config.on"))
+
+    for power, absolute_calls, relative_calls in (
+        (105, 0, 0),  # Within both bands
+        (111, 1, 0),  # Outside absolute band of 100
+        (115, 1, 0),  # Within absolute band of 111
+        (160, 2, 1),  # Outside relative band of 100
+        (200, 3, 1),  # Within relative band of 160
+    ):
+        handler.process_item("1", {"state": {"power": power}})
+        assert absolute.call_count == absolute_calls
+        assert relative.call_count == relative_calls
+
+    handler.process_item("1", {"state": {"voltage": 231}})
+    assert relative.call_count == 2
+    handler.process_item("1", {"state": {"voltage": 231, "power": None}})
+    assert relative.call_count == 3
+    assert absolute.call_count == 4
+
+    handler.process_item("1", {"config": {"on": True}})
+    any_change.assert_not_called()
+    handler.process_item("1", {"config": {"on": False}})
+    any_change.assert_called_once()
+
+    unsubscribe()
+    assert len(sensor._subscribers) == 2
+
+
+async def test_deadband_zero_baseline(deconz_refresh_state):
+    """Verify deadbands from a last value of zero."""
+    session = await deconz_refresh_state(
+        sensors={"1": {"type": "ZHAPower", "state": {"power": 0, "current": 0}}}
+    )
+    handler = session.sensors.power
+    sensor = handler["1"]
+
+    relative = Mock()
+    sensor.subscribe(relative, Deadband("state.power", relative=0.5))
+    both = Mock()
+    sensor.subscribe(both, Deadband("state.current", absolute=10, relative=0.5))
+
+    for _ in range(3):
+        handler.process_item("1", {"state": {"power": 0, "current": 0}})
+    relative.assert_not_called()
+    both.assert_not_called()
+
+    for power, current, relative_calls, both_calls in (
+        (1, 5, 1, 0),  # Any change from zero, within absolute band of 0
+        (0, 10, 2, 1),  # Outside relative band of 1, outside absolute band of 0
+        (0, 14, 2, 1),  # Unchanged, within relative band of 10
+    ):
+        handler.process_item("1", {"state": {"power": power, "current": current}})
+        assert relative.call_count == relative_calls
+        assert both.call_count == both_calls
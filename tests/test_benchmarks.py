@@ -0,0 +1,49 @@
+"""Test pydeCONZ benchmark suite.
+
+pytest --cov-report term-missing --cov=tests.benchmarks tests/test_benchmarks.py
+"""
+
+from tests.benchmarks import BENCHMARKS, Result, compare, run_benchmarks, to_json
+
+
+async def test_run_benchmarks():
+    """Verify all benchmarks run and produce results."""
+    results = await run_benchmarks(sizes=(10,), repeat=1)
+
+    assert {result.name for result in results} == set(BENCHMARKS)
+    assert all(result.operations > 0 for result in results)
+    assert all(result.operations_per_second > 0 for result in results)
+
+    assert await run_benchmarks(sizes=(10,), repeat=1, selection="unknown") == []
+
+
+def test_compare():
+    """Verify regressions are detected against baseline."""
+    results = [
+        Result("fast", 10, 1.0, 10),
+        Result("slow", 10, 2.0, 10),
+        Result("new", 10, 1.0, 10),
+        Result("zero", 10, 0.0, 10),
+    ]
+    baseline = to_json([Result("fast", 10, 1.1, 10), Result("slow", 10, 1.0, 10)])
+    baseline["results"]["zero[10]"] = {"seconds": 0.0}
+
+    comparisons, regressions = compare(results, baseline)
+
+    assert [comparison.key for comparison in comparisons] == [
+        "fast[10]",
+        "slow[10]",
+        "zero[10]",
+    ]
+    assert [regression.key for regression in regressions] == ["slow[10]"]
+    assert regressions[0].ratio == 2.0
+    assert comparisons[2].ratio == 1.0
+    assert results[3].operations_per_second == float("inf")
+
+
+async def test_fanout_allocations():
+    """Verify fan-out garbage does not grow with the number of subscribers."""
+    few, many = await run_benchmarks(
+        sizes=(10, 1000), repeat=1, selection="fanout_allocations"
+    )
+    assert 0 < many.allocated <= few.allocated + 64
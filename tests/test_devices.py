@@ -0,0 +1,117 @@
+"""Test pydeCONZ physical device registry.
+
+pytest --cov-report term-missing --cov=pydeconz.devices tests/test_devices.py
+"""
+
+import pytest
+
+from pydeconz.devices import mac_address
+from pydeconz.models import ResourceGroup
+from pydeconz.models.event import EventType
+
+MOTION_MAC = "00:17:88:01:00:00:00:01"
+LIGHTS = {
+    "1": {"type": "Extended color light", "uniqueid": "00:17:88:01:00:00:00:02-0b"},
+    "2": {"type": "Extended color light"},
+}
+SENSORS = {
+    "1": {"type": "ZHAPresence", "uniqueid": f"{MOTION_MAC}-02-0406"},
+    "2": {"type": "ZHALightLevel", "uniqueid": f"{MOTION_MAC}-02-0400"},
+    "3": {"type": "ZHATemperature", "uniqueid": f"{MOTION_MAC}-02-0402"},
+    "4": {"type": "Daylight", "uniqueid": "00:21:2e:ff:ff:00:73:9f-01"},
+}
+
+
+@pytest.mark.parametrize(
+    ("unique_id", "expected"),
+    [
+        ("00:17:88:01:00:00:00:07-02-0406", "00:17:88:01:00:00:00:07"),
+        ("00:17:88:01:00:00:00:07", "00:17:88:01:00:00:00:07"),
+        ("invalid-01", ""),
+        (None, ""),
+    ],
+)
+def test_mac_address(unique_id, expected):
+    """Verify MAC address is parsed from unique ID."""
+    assert mac_address(unique_id) == expected
+
+
+async def test_device_registry(deconz_refresh_state, mock_websocket_event):
+    """Verify devices are maintained on add, re-pair and delete."""
+    session = await deconz_refresh_state(lights=LIGHTS, sensors=SENSORS)
+    devices = session.devices
+
+    assert len(devices) == 3
+    assert MOTION_MAC in devices
+    motion = devices[MOTION_MAC]
+    assert motion.sensors == {
+        "1": session.sensors["1"],
+        "2": session.sensors["2"],
+        "3": session.sensors["3"],
+    }
+    assert motion.lights == {}
+    assert len(motion.resources) == 3
+    assert devices.device_of(ResourceGroup.SENSOR, "2") is motion
+    assert devices.device_of(ResourceGroup.LIGHT, "1").lights == {
+        "1": session.lights["1"]
+    }
+    assert devices.device_of(ResourceGroup.LIGHT, "2") is None
+    assert devices.get("00:00:00:00:00:00:00:00") is None
+    assert list(devices) == [device.mac for device in devices.values()]
+
+    # Resource re-paired with a new unique ID, as seen by a refresh
+
+    session.sensors.process_raw(
+        {"3": SENSORS["3"] | {"uniqueid": "00:17:88:01:00:00:00:03-02-0402"}}
+    )
+    assert set(motion.sensors) == {"1", "2"}
+    assert devices.device_of(ResourceGroup.SENSOR, "3").mac == (
+        "00:17:88:01:00:00:00:03"
+    )
+
+    # Other changes do not touch the registry
+
+    await mock_websocket_event(
+        ResourceGroup.SENSOR,
+        id="1",
+        data={"state": {"presence": True}},
+        unique_id=SENSORS["1"]["uniqueid"],
+    )
+    assert devices.device_of(ResourceGroup.SENSOR, "1") is motion
+
+    # Added resource joins existing device
+
+    await mock_websocket_event(
+        ResourceGroup.LIGHT,
+        event=EventType.ADDED,
+        id="3",
+        data={
+            "light": {
+                "type": "Extended color light",
+                "uniqueid": f"{MOTION_MAC}-0b",
+            }
+        },
+        unique_id=f"{MOTION_MAC}-0b",
+    )
+    assert motion.lights == {"3": session.lights["3"]}
+
+    # Deleting all resources drops device
+
+    for resource, id, unique_id in (
+        (ResourceGroup.LIGHT, "3", f"{MOTION_MAC}-0b"),
+        (ResourceGroup.SENSOR, "1", SENSORS["1"]["uniqueid"]),
+        (ResourceGroup.SENSOR, "2", SENSORS["2"]["uniqueid"]),
+    ):
+        await mock_websocket_event(
+            resource, event=EventType.DELETED, id=id, unique_id=unique_id
+        )
+    assert "3" not in session.lights
+    assert "1" not in session.sensors
+    assert MOTION_MAC not in devices
+    assert devices.device_of(ResourceGroup.SENSOR, "1") is None
+
+    # Unique ID without MAC address leaves device
+
+    session.sensors.temperature.process_item("3", {"uniqueid": ""})
+    assert devices.device_of(ResourceGroup.SENSOR, "3") is None
+    assert len(devices) == 2
@@ -0,0 +1,211 @@
+"""Test pydeCONZ threaded dispatch.
+
+pytest --cov-report term-missing --cov=pydeconz.dispatch tests/test_dispatch.py
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+import aiohttp
+import orjson
+import pytest
+
+from pydeconz import DeconzSession
+from pydeconz.dispatch import DispatchMode
+from pydeconz.emulator import EMULATOR_API_KEY, DeconzEmulator, generate_state
+from pydeconz.metrics import (
+    CallbackWatchdog,
+    EventMetrics,
+    LatencyStage,
+    callback_name,
+)
+from pydeconz.models.event import EventType
+from pydeconz.websocket import State
+
+
+@pytest.fixture
+async def emulator():
+    """Return a running emulator."""
+    emulator = DeconzEmulator(generate_state(40))
+    await emulator.start()
+    yield emulator
+    await emulator.stop()
+
+
+@pytest.fixture
+async def session(emulator):
+    """Return a deCONZ session dispatching events on a worker thread."""
+    async with aiohttp.ClientSession() as session:
+        gateway = DeconzSession(
+            session,
+            emulator.host,
+            emulator.port,
+            EMULATOR_API_KEY,
+            dispatch_mode=DispatchMode.THREAD,
+        )
+        yield gateway
+        gateway.close()
+
+
+async def wait_for(condition, timeout: float = 5) -> None:
+    """Wait until condition is true."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_thread_mode_requires_loop():
+    """Verify threaded dispatch needs an event loop to deliver callbacks on."""
+    with pytest.raises(RuntimeError):
+        DeconzSession(Mock(), "host", 80, "apikey", dispatch_mode=DispatchMode.THREAD)
+
+
+async def test_threaded_dispatch(emulator, session):
+    """Verify events are routed on the worker and delivered on the loop."""
+    await session.refresh_state()
+    dispatcher = session.dispatcher
+    loop_thread = threading.get_ident()
+
+    threads: dict[str, set[int]] = {"loop": set(), "inline": set(), "item": set()}
+    session.subscribe(lambda event, id: threads["loop"].add(threading.get_ident()))
+    session.lights.subscribe(
+        lambda event, id: threads["inline"].add(threading.get_ident()), inline=True
+    )
+    session.lights["1"].subscribe(lambda: threads["item"].add(threading.get_ident()))
+    session.events.subscribe(event_subscription := Mock())
+
+    session.start()
+    await wait_for(lambda: session.websocket.state == State.RUNNING)
+    await wait_for(lambda: len(emulator._websockets) == 1)
+
+    await session.lights.lights.set_state("1", brightness=20)
+    await wait_for(lambda: session.lights["1"].brightness == 20)
+    await wait_for(lambda: threads["loop"] and event_subscription.called)
+
+    assert threads["loop"] == {loop_thread}
+    assert threads["item"] == {loop_thread}
+    assert threads["inline"]
+    assert loop_thread not in threads["inline"]
+    assert event_subscription.call_args[0][0].type == EventType.CHANGED
+
+    # Generated traffic interleaved with refreshes holding the write lock
+
+    event_subscription.reset_mock()
+    emulator.start_traffic(rate=2000, count=200)
+    await session.refresh_state()
+    await emulator.wait_traffic()
+    await wait_for(lambda: event_subscription.call_count == 200)
+    assert dispatcher.processed >= 201
+    assert len(session.snapshot().lights) == len(session.lights.lights.values())
+
+    # Malformed frames are logged and skipped
+
+    dispatcher.submit(b"not json", 0)
+    dispatcher.submit(orjson.dumps(emulator.create_event()), 0)
+    await wait_for(lambda: event_subscription.call_count == 201)
+
+    session.close()
+    session.close()
+    assert not dispatcher.in_worker()
+
+
+async def test_threaded_frame_filter(session):
+    """Verify frames nobody listens to are dropped on the worker."""
+    await session.refresh_state()
+    session.lights["1"].register_callback(item_callback := Mock())
+    dispatcher = session.dispatcher
+    dispatcher.start()
+    frame = {"t": "event", "e": "changed", "r": "lights", "id": "1"}
+    dispatcher.submit(orjson.dumps(frame | {"attr": {}}).decode(), 0)
+    dispatcher.submit(orjson.dumps(frame | {"state": {"bri": 1}}).decode(), 0)
+    dispatcher.stop()
+
+    await wait_for(lambda: dispatcher.processed == 2)
+    await wait_for(lambda: item_callback.called)
+    assert item_callback.call_count == 1
+
+
+async def test_threaded_confirmed_write(emulator, session):
+    """Verify writes are confirmed by events routed on the worker."""
+    await session.refresh_state()
+    session.start()
+    await wait_for(lambda: session.websocket.state == State.RUNNING)
+    await wait_for(lambda: len(emulator._websockets) == 1)
+
+    brightness = 1 if session.lights["1"].brightness != 1 else 2
+    confirmation = await session.confirmed(
+        session.lights.lights.set_state("1", brightness=brightness)
+    )
+    async with asyncio.timeout(5):
+        assert await confirmation > 0
+    assert session.lights["1"].brightness == brightness
+
+
+async def test_threaded_priority(session):
+    """Verify priority events of a batch are routed ahead of bulk traffic."""
+    await session.refresh_state()
+    session.sensors.fire.process_item(
+        "fire", {"type": "ZHAFire", "state": {"fire": False}}
+    )
+    session.events.subscribe(event_subscription := Mock())
+    dispatcher = session.dispatcher
+    frame = {"t": "event", "e": "changed", "r": "lights", "id": "1"}
+    for brightness in range(10):
+        dispatcher.submit(orjson.dumps(frame | {"state": {"bri": brightness}}), 0)
+    dispatcher.submit(
+        orjson.dumps(
+            {"t": "event", "e": "changed", "r": "sensors", "id": "fire"}
+            | {"state": {"fire": True}}
+        ),
+        0,
+    )
+    dispatcher.start()
+    dispatcher.stop()
+
+    await wait_for(lambda: event_subscription.call_count == 11)
+    assert event_subscription.call_args_list[0][0][0].id == "fire"
+    assert session.sensors["fire"].fire
+    assert session.lights["1"].brightness == 9
+
+
+async def test_threaded_callbacks(session, caplog):
+    """Verify callbacks queued by the worker are called on the loop."""
+    dispatcher = session.dispatcher
+    dispatcher.call_soon(loop_callback := Mock(), 1)
+    await wait_for(lambda: loop_callback.called)
+    loop_callback.assert_called_once_with(1)
+
+    dispatcher._call([(Mock(side_effect=ValueError), ()), (loop_callback, (2,))])
+    loop_callback.assert_called_with(2)
+    assert "Error calling" in caplog.text
+
+
+def test_metrics_per_thread():
+    """Verify event timestamps and callback nesting are kept per thread."""
+    metrics = EventMetrics()
+    watchdog = CallbackWatchdog()
+    metrics.begin("lights", 1.0)
+    active: list[bool] = []
+
+    def worker() -> None:
+        active.append(metrics.active)
+        metrics.observe("lights", LatencyStage.QUEUE, 0.1)
+        watchdog.call(lambda: time.sleep(0.02), (), "lights", "2")
+
+    def run_worker() -> None:
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    watchdog.call(run_worker, (), "lights", "1")
+    assert active == [False]
+    assert metrics.active
+    assert metrics.received == 1.0
+    assert metrics.histogram("lights", LatencyStage.QUEUE).count == 1
+
+    # Time spent in the worker is not nested in the callback waiting for it
+
+    statistics = watchdog.callbacks[callback_name(run_worker)]
+    assert statistics.total >= 0.02
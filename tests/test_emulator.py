@@ -0,0 +1,205 @@
+"""Test pydeCONZ against the gateway emulator.
+
+pytest --cov-report term-missing --cov=pydeconz.emulator tests/test_emulator.py
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import aiohttp
+import pytest
+
+from pydeconz import BridgeBusy, DeconzSession, ResourceNotFound, Unauthorized
+from pydeconz.emulator import EMULATOR_API_KEY, DeconzEmulator, generate_state
+from pydeconz.gateway import RefreshMode
+from pydeconz.models import ResourceGroup
+from pydeconz.models.event import EventType
+from pydeconz.websocket import State
+
+
+@pytest.fixture
+async def emulator():
+    """Return a running emulator."""
+    emulator = DeconzEmulator(generate_state(40))
+    await emulator.start()
+    yield emulator
+    await emulator.stop()
+
+
+@pytest.fixture
+async def session(emulator):
+    """Return a deCONZ session connected to the emulator."""
+    async with aiohttp.ClientSession() as session:
+        yield DeconzSession(session, emulator.host, emulator.port, EMULATOR_API_KEY)
+
+
+async def wait_for(condition, timeout: float = 5) -> None:
+    """Wait until condition is true."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_generate_state():
+    """Verify synthetic state has the requested amount of devices."""
+    state = generate_state(100)
+    assert len(state["lights"]) + len(state["sensors"]) == 100
+    assert len(state["groups"]) == (len(state["lights"]) + 9) // 10
+    assert generate_state(100) == state
+
+    sensor_types = {sensor["type"] for sensor in state["sensors"].values()}
+    assert {"ZHAPresence", "ZHASwitch", "ZHAPower", "ZHAFire"} <= sensor_types
+
+    # Resources of one physical device share MAC address
+    presence = state["sensors"]["1"]
+    light_level = state["sensors"]["2"]
+    assert presence["type"] == "ZHAPresence"
+    assert presence["uniqueid"][:23] == light_level["uniqueid"][:23]
+
+
+@pytest.mark.parametrize("mode", list(RefreshMode))
+async def test_refresh_state(emulator, session, mode):
+    """Verify all refresh modes populate the session."""
+    await session.refresh_state(mode)
+
+    assert session.config.bridge_id == "00212E012345"
+    assert len(session.lights.values()) == len(emulator.state["lights"])
+    assert len(session.sensors.values()) == len(emulator.state["sensors"])
+    assert len(session.groups.values()) == len(emulator.state["groups"])
+    assert len(session.scenes.values()) == 2 * len(emulator.state["groups"])
+    assert "1" in session.alarm_systems
+
+
+async def test_rest_api(emulator, session):
+    """Verify REST requests modify emulator state."""
+    await session.refresh_state()
+
+    assert await session.get_api_key() == EMULATOR_API_KEY
+    assert await session.request("get", "/lights/1") == emulator.state["lights"]["1"]
+
+    await session.lights.lights.set_state("1", brightness=10, on=True)
+    assert emulator.state["lights"]["1"]["state"]["bri"] == 10
+
+    await session.groups.set_state("1", on=True)
+    assert emulator.state["groups"]["1"]["state"]["any_on"] is True
+
+    await session.groups.set_attributes("1", name="Kitchen")
+    assert emulator.state["groups"]["1"]["name"] == "Kitchen"
+
+    await session.sensors.thermostat.set_config("10", heating_setpoint=1800)
+    assert emulator.state["sensors"]["10"]["config"]["heatsetpoint"] == 1800
+
+    await session.scenes.create_scene("1", "New scene")
+    assert emulator.state["groups"]["1"]["scenes"][-1]["name"] == "New scene"
+    await session.scenes.recall("1", "3")
+    await session.scenes.store("1", "3")
+    await session.scenes.set_attributes("1", "3", name="Renamed")
+    assert emulator.state["groups"]["1"]["scenes"][-1]["name"] == "Renamed"
+    await session.request("delete", "/groups/1/scenes/3")
+    assert [scene["id"] for scene in emulator.state["groups"]["1"]["scenes"]] == [
+        "1",
+        "2",
+    ]
+
+    await session.alarm_systems.create_alarm_system("second")
+    assert "2" in emulator.state["alarmsystems"]
+
+    await session.config.set_config(name="Gateway")
+    assert emulator.state["config"]["name"] == "Gateway"
+
+    await session.request("delete", "/sensors/1")
+    assert "1" not in emulator.state["sensors"]
+
+    for method, path in (
+        ("get", "/lights/1000"),
+        ("put", "/lights/1000/state"),
+        ("put", "/groups/1/scenes/9/recall"),
+        ("post", "/unknown"),
+        ("delete", "/lights/1000"),
+        ("delete", "/groups/1/scenes/9"),
+    ):
+        with pytest.raises(ResourceNotFound):
+            await session.request(method, path, json={})
+
+    with pytest.raises(ResourceNotFound):
+        await session.request("patch", "/lights/1")
+
+    session.api_key = "invalid"
+    with pytest.raises(Unauthorized):
+        await session.refresh_state()
+
+    assert emulator.requests > 10
+
+
+async def test_error_injection(emulator, session):
+    """Verify bridge busy and latency injection."""
+    emulator.inject_busy(2)
+    with pytest.raises(BridgeBusy):
+        await session.request("get", "/config")
+
+    with patch("pydeconz.gateway.sleep", new_callable=AsyncMock):
+        assert await session.request_with_retry("get", "/config")
+
+    emulator.busy_probability = 1
+    with pytest.raises(BridgeBusy):
+        await session.request("get", "/config")
+    emulator.busy_probability = 0
+
+    emulator.latency = 0.05
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await session.request("get", "/config")
+    assert loop.time() - start >= 0.05
+
+
+async def test_websocket(emulator, session):
+    """Verify websocket events flow through the real WSClient."""
+    await session.refresh_state()
+    session.connection_status_callback = Mock()
+    session.subscribe(subscription := Mock())
+    session.events.subscribe(event_subscription := Mock())
+
+    session.start()
+    await wait_for(lambda: session.websocket.state == State.RUNNING)
+    await wait_for(lambda: len(emulator._websockets) == 1)
+    session.connection_status_callback.assert_called_with(True)
+
+    # REST changes are signalled over websocket
+
+    await session.lights.lights.set_state("1", brightness=20)
+    await wait_for(lambda: session.lights["1"].brightness == 20)
+    subscription.assert_called_with(EventType.CHANGED, "1")
+
+    await session.sensors.thermostat.set_config("10", locked=True)
+    await session.groups.set_state("1", on=False)
+    await session.groups.set_attributes("1", name="Hall")
+    await session.scenes.set_attributes("1", "1", name="Evening")
+    await session.request("delete", "/lights/2")
+    await wait_for(lambda: event_subscription.call_count == 5)
+    await asyncio.sleep(0.01)
+    assert event_subscription.call_count == 5
+    assert session.groups["1"].name == "Hall"
+
+    # Generated traffic
+
+    event_subscription.reset_mock()
+    emulator.start_traffic(rate=2000, count=200)
+    await emulator.wait_traffic()
+    await wait_for(lambda: event_subscription.call_count == 200)
+
+    event_types = {call.args[0].type for call in event_subscription.call_args_list}
+    assert EventType.CHANGED in event_types
+
+    # Each event type can be generated
+
+    for event_type in EventType:
+        event = emulator.create_event(event_type)
+        assert event["e"] == event_type
+    assert emulator.create_event(EventType.ADDED)["r"] == ResourceGroup.SENSOR
+
+    emulator.start_traffic(rate=100)
+    await emulator.stop_traffic()
+    await emulator.stop_traffic()
+    await emulator.wait_traffic()
+
+    session.close()
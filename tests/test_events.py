@@ -5,9 +5,17 @@ pytest --cov-report term-missing --cov=pydeconz.interfaces.events tests/test_eve
 
 from unittest.mock import Mock
 
+import orjson
 import pytest
 
-from pydeconz.interfaces.events import EventHandler
+from pydeconz.interfaces.events import (
+    ID_NEEDLE,
+    EventHandler,
+    FrameFilter,
+    header_value,
+    without_attribute,
+)
+from pydeconz.metrics import CallbackWatchdog
 from pydeconz.models import ResourceGroup
 from pydeconz.models.event import Event, EventType
 
@@ -33,7 +41,9 @@ EVENT_HANDLER_DATA = [
 )
 async def test_event_handler(event_filter, resource_filter, expected):
     """Verify event handler behaves according to configured filters."""
-    event_handler = EventHandler(gateway=Mock())
+    event_handler = EventHandler(
+        gateway=Mock(callback_watchdog=CallbackWatchdog(), dispatcher=None)
+    )
     assert event_handler
 
     filters = {}
@@ -157,3 +167,106 @@ async def test_event_scene_called():
     assert event.data == data
     assert event.changed_data == {}
     assert event.added_data == {}
+
+
+@pytest.mark.parametrize(
+    ("frame", "expected"),
+    [
+        ('{"e":"changed","id":"12","r":"sensors"}', "12"),
+        ('{"e": "changed", "id": "12", "r": "sensors"}', "12"),
+        ('{"attr":{"id":"12"},"e":"changed","id":"12"}', None),
+        ('{"e":"changed","id":12,"r":"sensors"}', None),
+        ('{"e":"changed","id":"1\\"2"}', None),
+        ('{"e":"changed","id":"12', None),
+        ('{"e":"changed","id":', None),
+        ('{"e":"changed"}', None),
+    ],
+)
+def test_header_value(frame, expected):
+    """Verify header values are only read from unambiguous frames."""
+    assert header_value(frame, ID_NEEDLE) == expected
+
+
+def test_frame_filter():
+    """Verify frames are only accepted if a subscription may be interested."""
+    frame_filter = FrameFilter(
+        [
+            (
+                Mock(),
+                (EventType.ADDED, EventType.CHANGED),
+                (ResourceGroup.LIGHT,),
+                {"1"}.__contains__,
+            ),
+            (Mock(), (EventType.CHANGED,), (ResourceGroup.LIGHT,), {"2"}.__contains__),
+            (Mock(), None, (ResourceGroup.GROUP,), None),
+        ]
+    )
+
+    def frame(event, resource, id="1", **data):
+        return orjson.dumps({"e": event, "id": id, "r": resource, **data}).decode()
+
+    state = {"state": {"on": True}}
+    assert frame_filter.accepts(frame("added", "lights", id="3"))
+    assert frame_filter.accepts(frame("changed", "lights", **state))
+    assert frame_filter.accepts(frame("changed", "lights", id="2", name="x"))
+    assert frame_filter.accepts(frame("changed", "groups", attr={}))
+    assert frame_filter.accepts('{"t":"event"}')
+
+    # No subscription for event type or resource group
+    assert not frame_filter.accepts(frame("deleted", "lights"))
+    assert not frame_filter.accepts(frame("changed", "sensors", **state))
+
+    # Changes without state, config or name data
+    assert not frame_filter.accepts(frame("changed", "lights", attr={"id": "1"}))
+
+    # Attribute data as sent by deCONZ carries its own ID and name
+    attr = {
+        "id": "1",
+        "lastannounced": None,
+        "lastseen": "2024-01-01T00:00Z",
+        "manufacturername": "Philips",
+        "modelid": "LCT001",
+        "name": "Hue color lamp",
+        "swversion": "1.2.3",
+        "type": "Extended color light",
+        "uniqueid": "00:17:88:01:00:00:00:01-0b",
+    }
+    assert not frame_filter.accepts(frame("changed", "lights", attr=attr))
+    assert frame_filter.accepts(frame("changed", "lights", attr=attr, **state))
+    assert frame_filter.accepts(frame("changed", "lights", attr=attr, name="x"))
+
+    # Unknown IDs are only dropped when known IDs are up to date
+    assert not frame_filter.accepts(frame("changed", "lights", id="3", **state))
+    assert frame_filter.accepts(frame("changed", "lights", id="3", **state), False)
+    assert not frame_filter.accepts(
+        frame("changed", "lights", id="3", attr=attr | {"id": "3"}, **state)
+    )
+
+
+@pytest.mark.parametrize(
+    ("frame", "expected"),
+    [
+        ('{"e":"changed","id":"1"}', '{"e":"changed","id":"1"}'),
+        ('{"attr":{"id":"1","name":"x"},"id":"1"}', '{,"id":"1"}'),
+        ('{"attr":{"a":{"b":1},"name":"x"}}', '{,"name":"x"}}'),
+        ('{"attr":{"name":"x"', '{"attr":{"name":"x"'),
+    ],
+)
+def test_without_attribute(frame, expected):
+    """Verify attribute data is cut out, keeping more of the frame when unsure."""
+    assert without_attribute(frame) == expected
+
+
+async def test_event_handler_frame_filter():
+    """Verify frame filter follows subscriptions."""
+    event_handler = EventHandler(
+        gateway=Mock(callback_watchdog=CallbackWatchdog(), dispatcher=None)
+    )
+    frame = '{"e":"changed","id":"1","r":"sensors","attr":{}}'
+    assert not event_handler.accepts(frame)
+
+    unsubscribe = event_handler.subscribe(Mock(), resource_filter=ResourceGroup.SENSOR)
+    assert event_handler.accepts(frame)
+
+    unsubscribe()
+    assert not event_handler.accepts(frame)
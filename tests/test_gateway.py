@@ -3,17 +3,26 @@
 pytest --cov-report term-missing --cov=pydeconz.gateway tests/test_gateway.py
 """
 
-from asyncio import gather
+from asyncio import gather, get_running_loop, sleep
 from unittest.mock import AsyncMock, Mock, patch
 
 import aiohttp
+import orjson
 import pytest
 
-from pydeconz import ERRORS, BridgeBusy, RequestError, ResponseError, pydeconzException
+from pydeconz import (
+    ERRORS,
+    BridgeBusy,
+    DeconzSession,
+    RequestError,
+    ResponseError,
+    pydeconzException,
+)
+from pydeconz.gateway import RefreshMode
 from pydeconz.models import ResourceGroup
 from pydeconz.models.alarm_system import AlarmSystemArmState
 from pydeconz.models.event import EventType
-from pydeconz.websocket import Signal, State
+from pydeconz.websocket import Signal, State, WSClient
 
 
 @pytest.fixture
@@ -170,6 +179,146 @@ async def test_refresh_state(deconz_refresh_state):
     assert session.sensors["s1"].deconz_id == "/sensors/s1"
 
 
+async def test_refresh_state_stream(mock_aioresponse, deconz_session):
+    """Test refresh_state in stream mode creates devices as expected."""
+    deconz_session.subscribe(session_subscription := Mock())
+    mock_aioresponse.get(
+        "http://host:80/api/apikey",
+        payload={
+            "alarmsystems": {"0": {}},
+            "config": {"bridgeid": "012345", "websocketport": 443},
+            "groups": {
+                "g1": {
+                    "id": "gid",
+                    "scenes": [{"id": "sc1", "name": "scene1"}],
+                    "lights": [],
+                }
+            },
+            "lights": {"l1": {"type": "light"}},
+            "rules": {"1": {}},
+            "sensors": {"s1": {"type": "ZHAPresence"}},
+        },
+    )
+
+    await deconz_session.refresh_state(RefreshMode.STREAM)
+
+    assert session_subscription.call_count == 4
+    assert deconz_session.config.bridge_id == "012345"
+    assert deconz_session.config.websocket_port == 443
+    assert "0" in deconz_session.alarm_systems
+    assert "g1" in deconz_session.groups
+    assert "l1" in deconz_session.lights
+    assert "g1_sc1" in deconz_session.scenes
+    assert "s1" in deconz_session.sensors
+
+
+async def test_refresh_state_stream_errors(mock_aioresponse, deconz_session):
+    """Test refresh_state in stream mode raises on errors."""
+    mock_aioresponse.get(
+        "http://host:80/api/apikey",
+        payload=[{"error": {"type": 1, "address": "/", "description": ""}}],
+    )
+    with pytest.raises(ERRORS[1]):
+        await deconz_session.refresh_state(RefreshMode.STREAM)
+
+    mock_aioresponse.get("http://host:80/api/apikey", content_type="http/text")
+    with pytest.raises(ResponseError):
+        await deconz_session.refresh_state(RefreshMode.STREAM)
+
+    with (
+        patch.object(
+            deconz_session.session,
+            "request",
+            side_effect=aiohttp.client_exceptions.ClientError,
+        ),
+        pytest.raises(RequestError),
+    ):
+        await deconz_session.refresh_state(RefreshMode.STREAM)
+
+
+async def test_refresh_state_parallel(mock_aioresponse, deconz_session):
+    """Test refresh_state in parallel mode creates devices as expected."""
+    deconz_session.subscribe(session_subscription := Mock())
+    for path, payload in (
+        ("alarmsystems", {"0": {}}),
+        ("config", {"bridgeid": "012345"}),
+        (
+            "groups",
+            {"g1": {"id": "gid", "scenes": [{"id": "sc1", "name": "s"}], "lights": []}},
+        ),
+        ("lights", {"l1": {"type": "light"}}),
+        ("sensors", {"s1": {"type": "ZHAPresence"}}),
+    ):
+        mock_aioresponse.get(f"http://host:80/api/apikey/{path}", payload=payload)
+
+    await deconz_session.refresh_state(RefreshMode.PARALLEL)
+
+    assert session_subscription.call_count == 4
+    assert deconz_session.config.bridge_id == "012345"
+    assert "0" in deconz_session.alarm_systems
+    assert "g1" in deconz_session.groups
+    assert "l1" in deconz_session.lights
+    assert "g1_sc1" in deconz_session.scenes
+    assert "s1" in deconz_session.sensors
+
+
+async def test_refresh_state_parallel_concurrency():
+    """Verify parallel refresh keeps at most max_concurrent_requests in flight."""
+    session = DeconzSession(Mock(), "host", 80, "apikey", max_concurrent_requests=2)
+    in_flight = peak = 0
+
+    async def request(method, path, json=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await sleep(0.001)
+        in_flight -= 1
+        return {}
+
+    with patch.object(session, "request", new=request):
+        await session.refresh_state(RefreshMode.PARALLEL)
+    assert peak == 2
+
+
+async def test_refresh_state_parallel_fallback(mock_aioresponse, deconz_session):
+    """Test refresh_state in parallel mode falls back to a single request."""
+    not_found = [{"error": {"type": 3, "address": "/", "description": ""}}]
+    mock_aioresponse.get("http://host:80/api/apikey/alarmsystems", payload=not_found)
+    for path in ("config", "groups", "lights", "sensors"):
+        mock_aioresponse.get(f"http://host:80/api/apikey/{path}", payload={})
+    mock_aioresponse.get(
+        "http://host:80/api/apikey",
+        payload={
+            "config": {"bridgeid": "012345"},
+            "groups": {},
+            "lights": {"l1": {"type": "light"}},
+            "sensors": {},
+        },
+    )
+
+    await deconz_session.refresh_state(RefreshMode.PARALLEL)
+
+    assert deconz_session.config.bridge_id == "012345"
+    assert "l1" in deconz_session.lights
+
+    # Other errors are raised
+
+    unauthorized = [{"error": {"type": 1, "address": "/", "description": ""}}]
+    for path in ("alarmsystems", "config", "groups", "lights", "sensors"):
+        mock_aioresponse.get(f"http://host:80/api/apikey/{path}", payload=unauthorized)
+    with pytest.raises(ERRORS[1]):
+        await deconz_session.refresh_state(RefreshMode.PARALLEL)
+
+    # The error of the first failing request is raised
+
+    mock_aioresponse.get("http://host:80/api/apikey/alarmsystems", payload=not_found)
+    mock_aioresponse.get("http://host:80/api/apikey/config", payload=unauthorized)
+    for path in ("groups", "lights", "sensors"):
+        mock_aioresponse.get(f"http://host:80/api/apikey/{path}", payload={})
+    with pytest.raises(ERRORS[1]):
+        await deconz_session.refresh_state(RefreshMode.PARALLEL)
+
+
 async def test_request(mock_aioresponse, deconz_session):
     """Test request method and all its exceptions."""
     mock_aioresponse.get(
@@ -226,6 +375,41 @@ async def test_request(mock_aioresponse, deconz_session):
     await deconz_session.session.close()
 
 
+async def test_request_decode(mock_aioresponse, deconz_session):
+    """Test response decoding, large payloads are decoded in an executor."""
+    deconz_session.json_executor_threshold = 20
+
+    mock_aioresponse.get(
+        "http://host:80/api/apikey/small",
+        content_type="application/json",
+        payload={"k": "v"},
+    )
+    mock_aioresponse.get(
+        "http://host:80/api/apikey/large",
+        content_type="application/json",
+        payload={"key": "value" * 10},
+    )
+
+    with patch(
+        "pydeconz.gateway.get_running_loop", wraps=get_running_loop
+    ) as mock_loop:
+        assert await deconz_session.request("get", "/small") == {"k": "v"}
+        mock_loop.assert_not_called()
+
+        assert await deconz_session.request("get", "/large") == {"key": "value" * 10}
+        mock_loop.assert_called_once()
+
+    # Invalid JSON
+
+    mock_aioresponse.get(
+        "http://host:80/api/apikey/invalid",
+        content_type="application/json",
+        body="{invalid",
+    )
+    with pytest.raises(ResponseError):
+        await deconz_session.request("get", "/invalid")
+
+
 async def test_session_handler_on_uninitialized_websocket(deconz_session):
     """Test session_handler is not called when self.websocket is None."""
     # Event handler not called when self.websocket is None
@@ -527,3 +711,74 @@ async def test_reset_retry_with_a_second_request(gateway_sleep, deconz_refresh_s
     assert request_mock.call_count == 3
     assert not session._sleep_tasks
     assert collected_responses == [{}, {"response": "ok"}]
+
+
+async def test_priority_events(deconz_refresh_state):
+    """Verify safety-critical events are handled ahead of bulk traffic."""
+    session = await deconz_refresh_state(
+        alarm_systems={"0": {}},
+        lights={"1": {"type": "Extended color light", "state": {}}},
+        sensors={
+            "1": {"type": "ZHAFire", "state": {"fire": False}},
+            "2": {"type": "ZHAPower", "state": {"power": 0}},
+        },
+    )
+    assert session.is_priority({"r": "alarmsystems", "id": "0"})
+    assert session.is_priority({"r": "sensors", "id": "1"})
+    assert not session.is_priority({"r": "sensors", "id": "2"})
+    assert not session.is_priority({"r": "sensors", "id": "3"})
+    assert not session.is_priority({"r": "lights", "id": "1"})
+
+    session.websocket = WSClient(
+        Mock(), "host", 443, session.session_handler, priority=session.is_priority
+    )
+    handled = []
+    session.subscribe(lambda event, id: handled.append(id))
+
+    def frame(id, state):
+        return orjson.dumps(
+            {"t": "event", "e": "changed", "r": "sensors", "id": id, "state": state}
+        ).decode()
+
+    for power in range(1, 4):
+        session.websocket.text_frame(frame("2", {"power": power}))
+    session.websocket.text_frame(frame("1", {"fire": True}))
+    while session.websocket._background_tasks:
+        await sleep(0)
+
+    assert handled == ["1", "2", "2", "2"]
+    assert session.sensors["2"].power == 3
+
+
+async def test_frame_filter(deconz_refresh_state):
+    """Verify frames nobody listens to are dropped before being decoded."""
+    session = await deconz_refresh_state(
+        lights={"1": {"type": "Extended color light", "state": {"on": False}}},
+    )
+    session.websocket = WSClient(
+        Mock(),
+        "host",
+        443,
+        session.session_handler,
+        frame_filter=session.events.accepts,
+    )
+    session.lights["1"].register_callback(item_callback := Mock())
+
+    def frame(id, **data):
+        return orjson.dumps(
+            {"t": "event", "e": "changed", "r": "lights", "id": id, **data}
+        ).decode()
+
+    with patch.object(session.events, "handler") as handler:
+        session.websocket.text_frame(frame("1", attr={"lastseen": "2026-01-01T00:00Z"}))
+        session.websocket.text_frame(frame("2", state={"on": True}))
+        session.websocket.text_frame(frame("1", state={"on": True}, attr={}))
+        session.websocket.text_frame(frame("2", state={"on": True}))
+        while session.websocket._background_tasks:
+            await sleep(0)
+    assert [call.args[0]["id"] for call in handler.call_args_list] == ["1", "2"]
+
+    # Changes without state, config or name data are ignored once decoded as well
+
+    session.events.handler({"e": "changed", "r": "lights", "id": "1", "attr": {}})
+    item_callback.assert_not_called()
@@ -0,0 +1,122 @@
+"""Test pydeCONZ secondary indexes.
+
+pytest --cov-report term-missing --cov=pydeconz.interfaces.indexes tests/test_indexes.py
+"""
+
+from pydeconz.interfaces.indexes import IndexKey, ResourceIndex
+from pydeconz.models import ResourceGroup
+from pydeconz.models.event import EventType
+
+LIGHTS = {
+    "1": {
+        "type": "Extended color light",
+        "name": "Kitchen ceiling",
+        "manufacturername": "Philips",
+        "modelid": "LCT015",
+        "state": {"reachable": True},
+        "uniqueid": "00:17:88:01:00:00:00:01-0b",
+    },
+    "2": {
+        "type": "Extended color light",
+        "name": "Kitchen table",
+        "manufacturername": "IKEA of Sweden",
+        "modelid": "TRADFRI bulb",
+        "state": {"reachable": False},
+        "uniqueid": "00:17:88:01:00:00:00:02-01",
+    },
+    "3": {
+        "type": "Window covering device",
+        "name": "Blinds",
+        "manufacturername": "IKEA of Sweden",
+        "modelid": "FYRTUR",
+        "state": {"reachable": True},
+        "uniqueid": "00:17:88:01:00:00:00:03-01",
+    },
+}
+SENSORS = {
+    "1": {
+        "type": "ZHAPresence",
+        "name": "Presence",
+        "config": {"reachable": True},
+        "state": {"lowbattery": True},
+        "uniqueid": "00:17:88:01:00:00:00:04-02-0406",
+    },
+    "2": {
+        "type": "ZHALightLevel",
+        "name": "Light level",
+        "config": {"reachable": True},
+        "state": {"lowbattery": False},
+        "uniqueid": "00:17:88:01:00:00:00:04-02-0400",
+    },
+}
+
+
+def test_resource_index():
+    """Verify index tracks value changes."""
+    index = ResourceIndex()
+    index.update("1", {"type": "a", "name": "x", "uniqueid": 1, "state": {"xy": []}})
+    index.update("2", {"type": "a", "name": ["unhashable"]})
+    assert index.lookup(IndexKey.TYPE, "a") == {"1", "2"}
+    assert index.lookup(IndexKey.MAC, 1) == set()
+
+    index.update("1", {"type": "b", "name": "y"}, {"type"})
+    assert index.query({"type": "b", "name": "x"}) == {"1"}
+    index.update("1", {"type": "b", "name": "y"}, {"state", "xy"})
+    assert index.lookup(IndexKey.NAME, "x") == {"1"}
+    index.update("1", {"type": "b"}, {"name"})
+    assert index.lookup(IndexKey.NAME, "x") == set()
+
+    assert index.query({}) == {"1", "2"}
+    assert index.query({"type": "a", "name": "x"}) == set()
+
+    index.remove("1")
+    index.remove("1")
+    assert index.query({"type": "b"}) == set()
+
+
+async def test_query(deconz_refresh_state, mock_websocket_event):
+    """Verify queries over handlers are kept up to date."""
+    session = await deconz_refresh_state(lights=LIGHTS, sensors=SENSORS)
+
+    def ids(items):
+        return sorted(item.resource_id for item in items)
+
+    assert ids(session.lights.query(reachable=False)) == ["2"]
+    assert ids(session.lights.query(manufacturer="IKEA of Sweden")) == ["2", "3"]
+    assert ids(session.lights.query(manufacturer="IKEA of Sweden", reachable=True)) == [
+        "3"
+    ]
+    assert ids(session.lights.query(name=lambda name: "Kitchen" in name)) == [
+        "1",
+        "2",
+    ]
+    assert ids(session.lights.lights.query(model_id="LCT015")) == ["1"]
+    assert ids(session.lights.query(type="Window covering device")) == ["3"]
+    assert ids(session.sensors.query(mac="00:17:88:01:00:00:00:04")) == ["1", "2"]
+    assert ids(session.sensors.query(low_battery=True)) == ["1"]
+    assert len(session.lights.query()) == 3
+
+    await mock_websocket_event(
+        ResourceGroup.LIGHT,
+        id="2",
+        data={"state": {"reachable": True}},
+        unique_id=LIGHTS["2"]["uniqueid"],
+    )
+    await mock_websocket_event(
+        ResourceGroup.SENSOR,
+        id="2",
+        data={"state": {"lowbattery": True}},
+        unique_id=SENSORS["2"]["uniqueid"],
+    )
+    await mock_websocket_event(
+        ResourceGroup.LIGHT,
+        event=EventType.ADDED,
+        id="4",
+        data={"light": LIGHTS["2"] | {"state": {"reachable": False}}},
+        unique_id=LIGHTS["2"]["uniqueid"],
+    )
+    assert ids(session.lights.query(reachable=False)) == ["4"]
+    assert ids(session.sensors.query(low_battery=True)) == ["1", "2"]
+
+    session.lights.lights.remove_item("4")
+    assert session.lights.query(reachable=False) == []
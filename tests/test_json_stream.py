@@ -0,0 +1,81 @@
+"""Test pydeCONZ JSON stream parser.
+
+pytest --cov-report term-missing --cov=pydeconz.json_stream tests/test_json_stream.py
+"""
+
+import orjson
+import pytest
+
+from pydeconz.errors import ResponseError
+from pydeconz.json_stream import JSONStreamParser
+
+DOCUMENT = {
+    "config": {"name": "deCONZ", "whitelist": {"key": {"name": "a,b}"}}},
+    "groups": {},
+    "lights": {
+        "1": {"name": 'quote " and \\ backslash', "state": {"on": True}},
+        "2": {"name": "[list]", "lights": ["1", "2"]},
+    },
+    "rules": {"1": {"name": "not streamed"}},
+    "schedules": [1, 2, 3],
+    "sensors": {"1": {"config": {"on": True}, "state": {"lastupdated": None}}},
+    "version": 1,
+}
+
+EXPECTED_ITEMS = [
+    ("config", "name", "deCONZ"),
+    ("config", "whitelist", {"key": {"name": "a,b}"}}),
+    ("lights", "1", DOCUMENT["lights"]["1"]),
+    ("lights", "2", DOCUMENT["lights"]["2"]),
+    ("sensors", "1", DOCUMENT["sensors"]["1"]),
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 4096])
+@pytest.mark.parametrize("indent", [False, True])
+def test_stream_parser(chunk_size, indent):
+    """Verify members are returned regardless of chunk boundaries."""
+    option = orjson.OPT_INDENT_2 if indent else 0
+    data = b" \n" + orjson.dumps(DOCUMENT, option=option)
+    parser = JSONStreamParser({"config", "groups", "lights", "sensors"})
+
+    items = []
+    for index in range(0, len(data), chunk_size):
+        items += parser.feed(data[index : index + chunk_size])
+
+    assert items == EXPECTED_ITEMS
+    assert parser.close() is None
+
+
+def test_stream_parser_buffers_one_item():
+    """Verify consumed bytes are released."""
+    parser = JSONStreamParser({"lights"})
+
+    assert parser.feed(b'{"lights": {"1": {"name": "a"}, "2": {"na') == [
+        ("lights", "1", {"name": "a"})
+    ]
+    assert len(parser._buffer) < 20
+    assert parser.feed(b'me": "b"}}}') == [("lights", "2", {"name": "b"})]
+    assert parser.close() is None
+
+
+def test_stream_parser_error_document():
+    """Verify a non object root is returned on close."""
+    parser = JSONStreamParser({"lights"})
+
+    assert parser.feed(b"  ") == []
+    assert parser.feed(b'[{"error": ') == []
+    assert parser.feed(b'{"type": 1}}]') == []
+    assert parser.close() == [{"error": {"type": 1}}]
+
+
+def test_stream_parser_incomplete_document():
+    """Verify incomplete or invalid documents raise."""
+    parser = JSONStreamParser({"lights"})
+    parser.feed(b'{"lights": {"1": {}')
+    with pytest.raises(ResponseError):
+        parser.close()
+
+    parser = JSONStreamParser({"lights"})
+    with pytest.raises(ResponseError):
+        parser.feed(b'{"lights": {"1": {invalid}}}')
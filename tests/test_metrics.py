@@ -0,0 +1,374 @@
+"""Test pydeCONZ latency metrics.
+
+pytest --cov-report term-missing --cov=pydeconz.metrics tests/test_metrics.py
+"""
+
+import asyncio
+from collections.abc import Iterator
+from functools import partial
+import logging
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import aiohttp
+import pytest
+
+from pydeconz import BridgeBusy, DeconzSession, RequestError, Unauthorized
+from pydeconz.dispatch import ThreadedDispatcher
+from pydeconz.emulator import EMULATOR_API_KEY, DeconzEmulator, generate_state
+from pydeconz.interfaces.subscriptions import wrap_async
+from pydeconz.metrics import (
+    CallbackStatistics,
+    CallbackWatchdog,
+    EventMetrics,
+    Histogram,
+    LatencyStage,
+    RequestMetrics,
+    RequestSpan,
+    SlowCallback,
+    callback_name,
+    endpoint_template,
+)
+from pydeconz.models import ResourceGroup
+from pydeconz.models.api import Deadband, DeadbandCallback
+from pydeconz.models.event import EventType
+
+from .test_emulator import wait_for
+
+
+@pytest.fixture
+async def deconz_session() -> Iterator[DeconzSession]:
+    """Return deCONZ gateway session collecting metrics."""
+    session = aiohttp.ClientSession()
+    controller = DeconzSession(session, "host", 80, "apikey", collect_metrics=True)
+    yield controller
+    await session.close()
+
+
+def test_histogram():
+    """Verify values are counted in fixed buckets."""
+    histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+    assert histogram.mean is None
+    assert histogram.quantile(0.5) is None
+
+    for value in (0.0005, 0.001, 0.005, 0.05, 0.5):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.max == 0.5
+    assert histogram.mean == pytest.approx(0.5565 / 5)
+    assert histogram.quantile(0.4) == 0.001
+    assert histogram.quantile(0.6) == 0.01
+    assert histogram.quantile(0.99) == 0.5
+    assert histogram.as_dict() == {
+        "count": 5,
+        "total": pytest.approx(0.5565),
+        "max": 0.5,
+        "buckets": {"0.001": 2, "0.01": 1, "0.1": 1, "+Inf": 1},
+    }
+
+
+def test_event_metrics_outside_event():
+    """Verify updates and callbacks are not timed outside of events."""
+    metrics = EventMetrics()
+    item = Mock(resource_group=ResourceGroup.LIGHT)
+    callback = Mock()
+
+    metrics.update(item, {"state": {}})
+    metrics.call(ResourceGroup.LIGHT, callback, 1)
+    item.update.assert_called_with({"state": {}})
+    callback.assert_called_with(1)
+    assert metrics.histograms == {}
+
+    metrics.end(ResourceGroup.LIGHT)
+    assert metrics.histograms == {}
+
+
+async def test_event_stages(deconz_refresh_state, mock_websocket_event):
+    """Verify each stage of processing an event is measured."""
+    session = await deconz_refresh_state(
+        lights={"1": {"type": "Extended color light", "state": {"bri": 1}}}
+    )
+    session.lights.subscribe(Mock())
+    session.lights["1"].subscribe(Mock())
+
+    await mock_websocket_event(
+        ResourceGroup.LIGHT, id="1", data={"state": {"bri": 2}}, unique_id="1"
+    )
+
+    metrics = session.event_metrics
+    for stage in (
+        LatencyStage.PARSE,
+        LatencyStage.ROUTE,
+        LatencyStage.UPDATE,
+        LatencyStage.TOTAL,
+    ):
+        assert metrics.histogram(ResourceGroup.LIGHT, stage).count == 1
+    assert metrics.histogram(ResourceGroup.LIGHT, LatencyStage.CALLBACK).count == 2
+    assert metrics.histogram(ResourceGroup.LIGHT, LatencyStage.DECODE) is None
+    assert metrics.received is None
+    assert metrics.parsed is None
+
+    assert set(metrics.as_dict()[ResourceGroup.LIGHT]) == {
+        "parse",
+        "route",
+        "update",
+        "callback",
+        "total",
+    }
+    metrics.reset()
+    assert metrics.as_dict() == {}
+
+
+async def test_metrics_disabled(deconz_session, mock_websocket_event):
+    """Verify events are processed without metrics."""
+    deconz_session.event_metrics = None
+    deconz_session.lights.process_item("1", {"type": "Extended color light"})
+    deconz_session.lights.subscribe(subscriber := Mock())
+    deconz_session.lights["1"].subscribe(item_subscriber := Mock())
+
+    await mock_websocket_event(
+        ResourceGroup.LIGHT, id="1", data={"state": {"bri": 2}}, unique_id="1"
+    )
+
+    subscriber.assert_called_with(EventType.CHANGED, "1")
+    item_subscriber.assert_called_once()
+    gateway = DeconzSession(Mock(), "", 0)
+    assert gateway.event_metrics is None
+    assert gateway.request_metrics is None
+
+
+async def test_websocket_stages():
+    """Verify websocket stages are measured with the real websocket client."""
+    emulator = DeconzEmulator(generate_state(20))
+    await emulator.start()
+
+    async with aiohttp.ClientSession() as session:
+        gateway = DeconzSession(
+            session,
+            emulator.host,
+            emulator.port,
+            EMULATOR_API_KEY,
+            collect_metrics=True,
+        )
+        await gateway.refresh_state()
+        gateway.start()
+        await wait_for(lambda: len(emulator._websockets) == 1)
+
+        await gateway.lights.lights.set_state("1", brightness=20)
+        await wait_for(lambda: gateway.lights["1"].brightness == 20)
+
+        metrics = gateway.event_metrics
+        for stage in LatencyStage:
+            if stage != LatencyStage.CALLBACK:
+                assert metrics.histogram(ResourceGroup.LIGHT, stage).count >= 1
+
+        total = metrics.histogram(ResourceGroup.LIGHT, LatencyStage.TOTAL)
+        decode = metrics.histogram(ResourceGroup.LIGHT, LatencyStage.DECODE)
+        assert total.max >= decode.max
+        gateway.close()
+
+    await emulator.stop()
+
+
+@pytest.mark.parametrize(
+    ("path", "template"),
+    [
+        ("", ""),
+        ("/config", "/config"),
+        ("/lights/1/state", "/lights/{id}/state"),
+        ("/groups/12/action", "/groups/{id}/action"),
+        ("/groups/1/scenes/2/recall", "/groups/{id}/scenes/{id}/recall"),
+        ("/alarmsystems/1/device/00:11:22-01", "/alarmsystems/{id}/device/{id}"),
+    ],
+)
+def test_endpoint_template(path, template):
+    """Verify resource IDs are replaced in paths."""
+    assert endpoint_template(path) == template
+
+
+async def test_request_metrics(deconz_session, mock_aioresponse):
+    """Verify requests are aggregated per endpoint."""
+    metrics = deconz_session.request_metrics
+    mock_aioresponse.put("http://host:80/api/apikey/lights/1/state", payload={})
+    mock_aioresponse.put("http://host:80/api/apikey/lights/2/state", payload={})
+    await deconz_session.request("put", "/lights/1/state", json={"on": True})
+    await deconz_session.request("put", "/lights/2/state", json={"on": False})
+
+    endpoint = metrics.endpoint("put", "/lights/3/state")
+    assert endpoint.count == 2
+    assert endpoint.latency.count == 2
+    assert endpoint.request_bytes == len(b'{"on":true}') + len(b'{"on":false}')
+    assert endpoint.response_bytes == 4
+    assert endpoint.errors == {}
+
+    # Errors, retries and timeouts
+
+    busy = [{"error": {"type": 901, "address": "/", "description": "busy"}}]
+    for _ in range(3):
+        mock_aioresponse.get("http://host:80/api/apikey/config", payload=busy)
+    with (
+        patch("pydeconz.gateway.sleep", new_callable=AsyncMock),
+        pytest.raises(BridgeBusy),
+    ):
+        await deconz_session.request_with_retry("get", "/config")
+
+    unauthorized = [{"error": {"type": 1, "address": "/", "description": "no"}}]
+    mock_aioresponse.get("http://host:80/api/apikey/sensors", payload=unauthorized)
+    with pytest.raises(Unauthorized):
+        await deconz_session.request("get", "/sensors")
+
+    mock_aioresponse.get(
+        "http://host:80/api/apikey/groups", exception=aiohttp.ServerTimeoutError()
+    )
+    with pytest.raises(RequestError):
+        await deconz_session.request("get", "/groups")
+
+    mock_aioresponse.get("http://host:80/api/apikey/lights", exception=TimeoutError())
+    with pytest.raises(TimeoutError):
+        await deconz_session.request("get", "/lights")
+
+    config = metrics.endpoint("get", "/config")
+    assert config.count == 3
+    assert config.retries == 2
+    assert config.errors == {"BridgeBusy": 3}
+    assert metrics.endpoint("get", "/sensors").errors == {"Unauthorized": 1}
+    assert metrics.endpoint("get", "/groups").timeouts == 1
+    assert metrics.endpoint("get", "/groups").errors == {"RequestError": 1}
+    assert metrics.endpoint("get", "/lights").timeouts == 1
+
+    data = metrics.as_dict()
+    assert data["PUT /lights/{id}/state"]["count"] == 2
+    assert data["GET /config"]["retries"] == 2
+    metrics.reset()
+    assert metrics.as_dict() == {}
+
+
+async def test_request_hooks(deconz_session, mock_aioresponse):
+    """Verify request hooks receive spans that can be annotated."""
+    spans = []
+
+    def on_start(span: RequestSpan) -> None:
+        span.attributes["automation"] = "flood"
+
+    unsubscribe = deconz_session.trace_requests(on_start, spans.append)
+    deconz_session.trace_requests(on_end=Mock())
+    deconz_session.request_metrics = None
+
+    mock_aioresponse.put("http://host:80/api/apikey/groups/1/action", payload={})
+    await deconz_session.request("put", "/groups/1/action", json={"on": True})
+
+    span = spans[0]
+    assert span.endpoint == "PUT /groups/{id}/action"
+    assert span.path == "/groups/1/action"
+    assert span.attributes == {"automation": "flood"}
+    assert span.duration > 0
+    assert span.error is None
+    assert span.start_time > 0
+
+    unsubscribe()
+    deconz_session._request_hooks.clear()
+    mock_aioresponse.put("http://host:80/api/apikey/groups/1/action", payload={})
+    await deconz_session.request("put", "/groups/1/action", json={"on": True})
+    assert len(spans) == 1
+
+
+def test_request_metrics_without_duration():
+    """Verify spans without duration are counted without latency."""
+    metrics = RequestMetrics()
+    metrics.record(RequestSpan("get", "/config", "/config"))
+    assert metrics.endpoint("get", "/config").count == 1
+    assert metrics.endpoint("get", "/config").latency.count == 0
+
+
+def slow_callback(*args) -> None:
+    """Block the event loop."""
+    time.sleep(0.02)
+
+
+def test_callback_name():
+    """Verify qualified names of callbacks."""
+    watchdog = CallbackWatchdog()
+    assert callback_name(slow_callback) == "tests.test_metrics.slow_callback"
+    assert callback_name(partial(partial(slow_callback, 1), 2)) == (
+        "tests.test_metrics.slow_callback"
+    )
+    assert callback_name(watchdog.enable) == (
+        "pydeconz.metrics.CallbackWatchdog.enable"
+    )
+    assert callback_name(mock := Mock()) == repr(mock)
+
+
+async def test_callback_name_wrappers():
+    """Verify wrapped subscribers are named after the original callback."""
+
+    async def async_callback() -> None:
+        """Coroutine function subscriber."""
+
+    subscriber, _ = wrap_async(async_callback, key=str, concurrency=1)
+    assert callback_name(subscriber) == (
+        "tests.test_metrics.test_callback_name_wrappers.<locals>.async_callback"
+    )
+    deadband = DeadbandCallback(Mock(raw={}), slow_callback, (Deadband("state.bri"),))
+    assert callback_name(deadband) == "tests.test_metrics.slow_callback"
+    dispatcher = ThreadedDispatcher(Mock(), asyncio.get_running_loop())
+    assert callback_name(dispatcher.on_loop(partial(deadband))) == (
+        "tests.test_metrics.slow_callback"
+    )
+
+
+async def test_callback_watchdog(deconz_refresh_state, mock_websocket_event, caplog):
+    """Verify slow callbacks are reported with name and resource id."""
+    session = await deconz_refresh_state(
+        lights={"1": {"type": "Extended color light", "state": {"bri": 1}}}
+    )
+    watchdog = session.callback_watchdog
+    assert not watchdog.enabled
+    watchdog.enable(threshold=0.01, report=(report := Mock()))
+
+    session.lights.subscribe(slow_callback)
+    session.lights["1"].subscribe(partial(slow_callback))
+    session.events.subscribe(fast := Mock())
+
+    await mock_websocket_event(
+        ResourceGroup.LIGHT, id="1", data={"state": {"bri": 2}}, unique_id="1"
+    )
+
+    # Handlers calling the slow callbacks are not reported as slow
+    assert report.call_count == 2
+    for call in report.call_args_list:
+        slow = call.args[0]
+        assert isinstance(slow, SlowCallback)
+        assert slow.name == "tests.test_metrics.slow_callback"
+        assert slow.resource == ResourceGroup.LIGHT
+        assert slow.id == "1"
+        assert slow.duration >= 0.02
+
+    fast.assert_called_once()
+    statistics = watchdog.callbacks["tests.test_metrics.slow_callback"]
+    assert statistics.count == statistics.slow == 2
+    assert statistics.max >= 0.02
+    assert statistics.mean >= 0.02
+    assert watchdog.offenders(limit=1) == [statistics]
+    assert any(name.endswith(".process_event") for name in watchdog.callbacks)
+    assert (
+        session.event_metrics.histogram(ResourceGroup.LIGHT, LatencyStage.CALLBACK).max
+        >= 0.02
+    )
+
+    # Outside of events, offenders are logged when no report is provided
+
+    watchdog.enable(threshold=0.01)
+    with caplog.at_level(logging.WARNING):
+        session.lights.process_item("1", {"state": {"bri": 3}})
+    assert "tests.test_metrics.slow_callback for lights 1 took" in caplog.text
+    assert statistics.count == 4
+
+    watchdog.disable()
+    session.lights.process_item("1", {"state": {"bri": 4}})
+    assert statistics.count == 4
+
+    watchdog.reset()
+    assert watchdog.offenders() == []
+    assert CallbackStatistics("name").mean is None
@@ -0,0 +1,144 @@
+"""Test pydeCONZ session pool.
+
+pytest --cov-report term-missing --cov=pydeconz.pool tests/test_pool.py
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from pydeconz.models.event import EventType
+from pydeconz.pool import DeconzSessionPool
+
+
+def gateway_data(bridge_id: str, lights: dict | None = None) -> dict:
+    """Full state document of a gateway."""
+    return {
+        "alarmsystems": {},
+        "config": {"bridgeid": bridge_id, "websocketport": 443},
+        "groups": {},
+        "lights": lights or {},
+        "sensors": {},
+    }
+
+
+@pytest.fixture
+async def pool():
+    """Return session pool, closed at the end of each test."""
+    async with DeconzSessionPool(max_concurrency=1) as pool:
+        yield pool
+
+
+async def test_pool(mock_aioresponse, pool):
+    """Verify gateways are refreshed and events are tagged with bridge ID."""
+    gateway1 = pool.add_gateway("host1", 80, "apikey")
+    gateway2 = pool.add_gateway("host2", 80, "apikey")
+    assert pool.add_gateway("host1", 80, "apikey") is gateway1
+    assert gateway1.session is gateway2.session is pool.session
+    assert pool.session.connector.limit_per_host == 8
+
+    pool.subscribe(pool_subscription := Mock())
+
+    mock_aioresponse.get(
+        "http://host1:80/api/apikey",
+        payload=gateway_data("AAAAAAAAAAAA", {"1": {"type": "light"}}),
+    )
+    mock_aioresponse.get(
+        "http://host2:80/api/apikey",
+        payload=gateway_data("BBBBBBBBBBBB", {"1": {"type": "light"}}),
+    )
+
+    with patch("pydeconz.gateway.WSClient") as mock_wsclient:
+        await pool.start()
+    assert mock_wsclient.call_count == 2
+
+    assert pool_subscription.call_count == 2
+    pool_subscription.assert_any_call("AAAAAAAAAAAA", EventType.ADDED, "1")
+    pool_subscription.assert_any_call("BBBBBBBBBBBB", EventType.ADDED, "1")
+
+    gateway_metrics = pool.gateway_metrics()
+    assert gateway_metrics["host1:80"].bridge_id == "AAAAAAAAAAAA"
+    assert gateway_metrics["host1:80"].refresh_count == 1
+    assert gateway_metrics["host1:80"].last_refresh_duration is not None
+    assert gateway_metrics["host1:80"].mean_refresh_duration is not None
+
+    metrics = pool.metrics()
+    assert metrics.gateways == 2
+    assert metrics.connected == 0
+    assert metrics.refresh_count == 2
+    assert metrics.refresh_failures == 0
+    assert metrics.mean_refresh_duration is not None
+
+    pool.remove_gateway("host2", 80)
+    assert [*pool.gateways] == ["host1:80"]
+    pool.remove_gateway("host2", 80)
+
+
+async def test_pool_refresh_failure(mock_aioresponse, pool):
+    """Verify a failing gateway does not stop other gateways from refreshing."""
+    pool.add_gateway("host1", 80, "apikey")
+    pool.add_gateway("host2", 80, "apikey")
+
+    mock_aioresponse.get(
+        "http://host1:80/api/apikey",
+        payload=[{"error": {"type": 1, "address": "/", "description": ""}}],
+    )
+    mock_aioresponse.get(
+        "http://host2:80/api/apikey", payload=gateway_data("BBBBBBBBBBBB")
+    )
+
+    await pool.refresh()
+
+    gateway_metrics = pool.gateway_metrics()
+    assert gateway_metrics["host1:80"].refresh_failures == 1
+    assert gateway_metrics["host1:80"].mean_refresh_duration is None
+    assert gateway_metrics["host2:80"].refresh_count == 1
+
+    metrics = pool.metrics()
+    assert metrics.refresh_count == 1
+    assert metrics.refresh_failures == 1
+
+
+async def test_pool_start_again(mock_aioresponse, pool):
+    """Verify starting again only retries gateways that failed to refresh."""
+    pool.add_gateway("host1", 80, "apikey")
+    pool.add_gateway("host2", 80, "apikey")
+
+    mock_aioresponse.get(
+        "http://host1:80/api/apikey", payload=gateway_data("AAAAAAAAAAAA")
+    )
+    mock_aioresponse.get(
+        "http://host2:80/api/apikey",
+        payload=[{"error": {"type": 1, "address": "/", "description": ""}}],
+    )
+    mock_aioresponse.get(
+        "http://host2:80/api/apikey", payload=gateway_data("BBBBBBBBBBBB")
+    )
+
+    with patch("pydeconz.gateway.WSClient") as mock_wsclient:
+        await pool.start()
+        assert mock_wsclient.call_count == 1
+        await pool.start()
+        assert mock_wsclient.call_count == 2
+        await pool.start()
+        assert mock_wsclient.call_count == 2
+
+    gateway_metrics = pool.gateway_metrics()
+    assert gateway_metrics["host1:80"].refresh_count == 1
+    assert gateway_metrics["host2:80"].refresh_failures == 1
+    assert gateway_metrics["host2:80"].refresh_count == 1
+
+
+async def test_pool_connection_status(pool):
+    """Verify connection state is tracked and tagged with bridge ID."""
+    pool.connection_status_callback = Mock()
+    gateway = pool.add_gateway("host1", 80, "apikey")
+    unsubscribe = pool.subscribe(pool_subscription := Mock())
+
+    gateway.connection_status_callback(True)
+    assert pool.metrics().connected == 1
+    pool.connection_status_callback.assert_called_once_with("", True)
+
+    unsubscribe()
+    gateway.lights.process_item("1", {"type": "light"})
+    pool_subscription.assert_not_called()
@@ -0,0 +1,180 @@
+"""Test pydeCONZ predicate subscriptions.
+
+pytest --cov-report term-missing --cov=pydeconz.interfaces.predicates tests/test_predicates.py
+"""
+
+from unittest.mock import Mock, call
+
+import pytest
+
+from pydeconz.interfaces.predicates import (
+    Operator,
+    Predicate,
+    PredicateIndex,
+    PredicateSubscription,
+    where,
+)
+from pydeconz.models import ResourceGroup
+from pydeconz.models.event import EventType
+
+SENSORS = {
+    "1": {
+        "type": "ZHATemperature",
+        "state": {"temperature": 2100},
+        "config": {"battery": 90},
+        "uniqueid": "00:00:00:00:00:00:00:01-01-0402",
+    },
+    "2": {
+        "type": "ZHATemperature",
+        "state": {"temperature": 2200},
+        "uniqueid": "00:00:00:00:00:00:00:02-01-0402",
+    },
+    "3": {
+        "type": "ZHASwitch",
+        "state": {"buttonevent": 1000},
+        "uniqueid": "00:00:00:00:00:00:00:03-01-1000",
+    },
+}
+
+
+@pytest.mark.parametrize(
+    ("condition", "raw", "expected"),
+    [
+        (where("state.bri", "==", 1), {"state": {"bri": 1}}, True),
+        (where("state.bri", "!=", 1), {"state": {"bri": 1}}, False),
+        (where("state.bri", ">", 1), {"state": {"bri": 2}}, True),
+        (where("state.bri", ">=", 2), {"state": {"bri": 2}}, True),
+        (where("state.bri", "<", 2), {"state": {"bri": 2}}, False),
+        (where("state.bri", "<=", 2), {"state": {"bri": 2}}, True),
+        (where("state.bri", "in", [1, 2]), {"state": {"bri": 2}}, True),
+        (where("state.bri", "==", 1), {"state": {}}, False),
+        (where("state.bri", "==", 1), {"state": None}, False),
+        (where("state.bri", ">", 1), {"state": {"bri": None}}, False),
+    ],
+)
+def test_condition(condition, raw, expected):
+    """Verify conditions compare attribute at path."""
+    assert condition.matches(raw) is expected
+
+
+def test_condition_keys():
+    """Verify which conditions can be bucketed on attribute value."""
+    assert where("state.bri", "==", 1).keys == (1,)
+    assert set(where("state.bri", Operator.IN, {1, 2}).keys) == {1, 2}
+    assert where("state.bri", ">", 1).keys == ()
+    assert where("state.xy", "==", [0.1, 0.2]).keys == ()
+
+
+def test_predicate_index():
+    """Verify only candidate subscriptions are evaluated."""
+    index = PredicateIndex()
+    by_value = PredicateSubscription(
+        Mock(), Predicate((where("state.buttonevent", "in", {1002, 2002}),))
+    )
+    by_id = PredicateSubscription(Mock(), Predicate(ids=frozenset({"1"})))
+    other = PredicateSubscription(
+        Mock(), Predicate((where("state.temperature", ">", 2500),))
+    )
+    remove = [index.subscribe(s) for s in (by_value, by_id, other)]
+    assert len(index) == 3
+
+    assert index.candidates("2", {"state": {"buttonevent": 1002}}) == [
+        other,
+        by_value,
+    ]
+    assert index.candidates("2", {"state": {"buttonevent": 3002}}) == [other]
+    assert index.candidates("1", {"state": {"buttonevent": [1]}}) == [other, by_id]
+
+    for unsubscribe in remove:
+        unsubscribe()
+    assert len(index) == 0
+    assert index.candidates("1", {"state": {"buttonevent": 1002}}) == []
+
+
+async def test_predicate_subscriptions(deconz_refresh_state, mock_websocket_event):
+    """Verify predicate subscribers are only called for matching changes."""
+    session = await deconz_refresh_state(sensors=SENSORS)
+
+    warm = Mock()
+    session.sensors.subscribe(
+        warm,
+        predicate=Predicate(
+            (where("state.temperature", ">", 2500),),
+            ids=frozenset({"1", "3"}),
+            types=frozenset({"ZHATemperature"}),
+        ),
+    )
+    pressed = Mock()
+    unsubscribe = session.subscribe(
+        pressed,
+        predicate=Predicate((where("state.buttonevent", "in", {1002, 2002}),)),
+    )
+    single = Mock()
+    session.sensors.temperature.subscribe(
+        single, id_filter="2", predicate=Predicate(ids=frozenset({"1", "2"}))
+    )
+
+    async def changed(id: str, data: dict) -> None:
+        await mock_websocket_event(
+            ResourceGroup.SENSOR, id=id, data=data, unique_id=SENSORS[id]["uniqueid"]
+        )
+
+    await changed("1", {"state": {"temperature": 2400}})
+    await changed("2", {"state": {"temperature": 2600}})
+    await changed("3", {"state": {"buttonevent": 1001}})
+    warm.assert_not_called()
+    pressed.assert_not_called()
+    single.assert_called_once_with(EventType.CHANGED, "2")
+
+    await changed("1", {"state": {"temperature": 2600}})
+    await changed("3", {"state": {"buttonevent": 2002}})
+    warm.assert_called_once_with(EventType.CHANGED, "1")
+    pressed.assert_called_once_with(EventType.CHANGED, "3")
+
+    # Changes not touching condition attributes are ignored
+
+    await changed("1", {"config": {"battery": 80}})
+    await changed("3", {"config": {"battery": 80}})
+    assert warm.call_count == 1
+    assert pressed.call_count == 1
+
+    unsubscribe()
+    await changed("3", {"state": {"buttonevent": 1002}})
+    assert pressed.call_count == 1
+
+    # Added resources match without touching condition attributes
+
+    added = Mock()
+    session.sensors.subscribe(
+        added,
+        event_filter=EventType.ADDED,
+        predicate=Predicate((where("state.temperature", ">", 2500),)),
+    )
+    await mock_websocket_event(
+        ResourceGroup.SENSOR,
+        event=EventType.ADDED,
+        id="4",
+        data={
+            "sensor": {
+                "type": "ZHATemperature",
+                "state": {"temperature": 3000},
+                "uniqueid": "00:00:00:00:00:00:00:04-01-0402",
+            }
+        },
+        unique_id="00:00:00:00:00:00:00:04-01-0402",
+    )
+    assert warm.call_args_list == [call(EventType.CHANGED, "1")]
+    added.assert_called_once_with(EventType.ADDED, "4")
+
+    await changed("1", {"state": {"temperature": 2700}})
+    added.assert_called_once()
+
+
+async def test_grouped_predicate_skips_handlers(deconz_refresh_state):
+    """Verify grouped handler only subscribes handlers managing predicate types."""
+    session = await deconz_refresh_state(sensors=SENSORS)
+    session.sensors.subscribe(
+        Mock(), predicate=Predicate(types=frozenset({"ZHATemperature"}))
+    )
+    assert [len(h._predicates) for h in session.sensors._handlers].count(1) == 1
+    assert len(session.sensors.temperature._predicates) == 1
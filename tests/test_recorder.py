@@ -0,0 +1,133 @@
+"""Test pydeCONZ websocket recorder and replayer.
+
+pytest --cov-report term-missing --cov=pydeconz.recorder tests/test_recorder.py
+"""
+
+from unittest.mock import Mock
+
+import aiohttp
+import orjson
+import pytest
+
+from pydeconz import DeconzSession
+from pydeconz.emulator import EMULATOR_API_KEY, DeconzEmulator, generate_state
+from pydeconz.recorder import (
+    MAGIC,
+    RECORD_HEADER,
+    RecordingError,
+    ReplayReport,
+    StageStatistics,
+    WSRecorder,
+    read_recording,
+    replay,
+)
+
+from .test_emulator import wait_for
+
+
+async def test_record_and_replay(tmp_path):
+    """Verify websocket frames are recorded and replayed to subscribers."""
+    path = tmp_path / "trace.rec"
+    emulator = DeconzEmulator(generate_state(40))
+    await emulator.start()
+
+    async with aiohttp.ClientSession() as session:
+        gateway = DeconzSession(session, emulator.host, emulator.port, EMULATOR_API_KEY)
+        await gateway.refresh_state()
+
+        with WSRecorder(path) as recorder:
+            gateway.start(recorder=recorder)
+            await wait_for(lambda: len(emulator._websockets) == 1)
+            emulator.start_traffic(rate=2000, count=50)
+            await emulator.wait_traffic()
+            await wait_for(lambda: recorder.frames == 50)
+            gateway.close()
+
+    await emulator.stop()
+
+    records = list(read_recording(path))
+    assert len(records) == 50
+    assert all(orjson.loads(frame)["t"] == "event" for _, frame in records)
+    timestamps = [timestamp for timestamp, _ in records]
+    assert timestamps == sorted(timestamps)
+
+    # Replay as fast as possible into a fresh session
+
+    async with aiohttp.ClientSession() as session:
+        gateway = DeconzSession(session, "127.0.0.1", 80, EMULATOR_API_KEY)
+        gateway.events.subscribe(subscriber := Mock())
+
+        report = await replay(gateway, path)
+        assert report.events == subscriber.call_count == 50
+        assert report.decode.count == report.dispatch.count == 50
+        assert report.decode.mean > 0
+        assert report.dispatch.max >= report.dispatch.mean
+        assert report.events_per_second > 0
+        assert report.lag.count == 0
+
+        # Replay in real time at high speed
+
+        report = await replay(gateway, path, realtime=True, speed=10)
+        assert report.events == 50
+        assert report.lag.count == 50
+
+
+async def test_recording_appends(tmp_path):
+    """Verify recordings are appended to and header is written once."""
+    path = tmp_path / "trace.rec"
+    with WSRecorder(path) as recorder:
+        recorder.record('{"e": "changed"}', timestamp=1)
+    with WSRecorder(path) as recorder:
+        recorder.record(b'{"e": "added"}', timestamp=2)
+
+    assert path.read_bytes().count(MAGIC) == 1
+    assert list(read_recording(path)) == [
+        (1, b'{"e": "changed"}'),
+        (2, b'{"e": "added"}'),
+    ]
+
+    report = await replay(Mock(), path)
+    assert report.events == 2
+
+
+def test_invalid_recording(tmp_path):
+    """Verify empty, foreign and truncated recordings."""
+    path = tmp_path / "trace.rec"
+    path.write_bytes(b"")
+    assert list(read_recording(path)) == []
+
+    path.write_bytes(MAGIC)
+    assert list(read_recording(path)) == []
+
+    path.write_bytes(b"not a recording")
+    with pytest.raises(RecordingError):
+        list(read_recording(path))
+
+    path.write_bytes(MAGIC + RECORD_HEADER.pack(1, 10) + b"{}")
+    with pytest.raises(RecordingError):
+        list(read_recording(path))
+
+    path.write_bytes(MAGIC + b"\x01")
+    with pytest.raises(RecordingError):
+        list(read_recording(path))
+
+    assert StageStatistics().mean is None
+    assert ReplayReport().events_per_second == 0.0
+
+
+async def test_recording_buffered(tmp_path):
+    """Verify frames are buffered and written off the event loop."""
+    path = tmp_path / "trace.rec"
+    with WSRecorder(path) as recorder:
+        recorder.record('{"e": "changed"}', timestamp=1)
+        assert path.read_bytes() == b""
+        recorder.flush()
+        assert list(read_recording(path)) == [(1, b'{"e": "changed"}')]
+
+        # Buffer is handed to the writer thread once flush size is reached
+
+        recorder.flush_size = 1
+        recorder.record('{"e": "added"}', timestamp=2)
+        assert not recorder._buffer
+        recorder.flush()
+        assert len(list(read_recording(path))) == 2
@@ -3,6 +3,11 @@
 pytest --cov-report term-missing --cov=pydeconz.scene tests/test_scenes.py
 """
 
+from unittest.mock import Mock
+
+from pydeconz.models import ResourceGroup
+from pydeconz.models.event import EventType
+
 
 async def test_handler_scene(mock_aioresponse, deconz_called_with, deconz_session):
     """Verify that groups works."""
@@ -135,3 +140,72 @@ async def test_scene(deconz_refresh_state):
     assert scene2.deconz_id == "/groups/0/scenes/2"
     assert scene2.id == "2"
     assert scene2.name == "New scene"
+
+
+async def test_scene_reconciliation(deconz_refresh_state, mock_websocket_event):
+    """Verify scenes are only processed when the group scene list changes."""
+    deconz_session = await deconz_refresh_state(
+        groups={
+            "0": {
+                "action": {},
+                "lights": [],
+                "scenes": [
+                    {"id": "1", "name": "warmlight"},
+                    {"id": "2", "name": "coldlight"},
+                ],
+                "state": {"all_on": False, "any_on": False},
+                "type": "LightGroup",
+            }
+        }
+    )
+    deconz_session.scenes.subscribe(scene_subscription := Mock())
+
+    # Group state change does not touch scenes
+
+    await mock_websocket_event(
+        resource=ResourceGroup.GROUP,
+        id="0",
+        data={"state": {"any_on": True}},
+    )
+    scene_subscription.assert_not_called()
+
+    # Only the altered scene is signalled
+
+    deconz_session.groups.process_item(
+        "0",
+        {
+            "scenes": [
+                {"id": "1", "name": "warmlight"},
+                {"id": "2", "name": "daylight"},
+            ]
+        },
+    )
+    assert deconz_session.groups["0"].changed_keys == {"scenes"}
+    scene_subscription.assert_called_once_with(EventType.CHANGED, "0_2")
+    assert deconz_session.scenes["0_2"].name == "daylight"
+
+    # Scenes are added and removed individually
+
+    scene_subscription.reset_mock()
+    deconz_session.groups.process_item(
+        "0", {"scenes": [{"id": "2", "name": "daylight"}, {"id": "3", "name": "new"}]}
+    )
+    assert scene_subscription.call_count == 2
+    scene_subscription.assert_any_call(EventType.ADDED, "0_3")
+    scene_subscription.assert_any_call(EventType.DELETED, "0_1")
+    assert [*deconz_session.scenes.keys()] == ["0_2", "0_3"]
+
+    # Removing an unknown item is a no-op
+
+    scene_subscription.reset_mock()
+    deconz_session.scenes.remove_item("0_1")
+    scene_subscription.assert_not_called()
+
+    # Deleting the group removes its scenes
+
+    await mock_websocket_event(
+        resource=ResourceGroup.GROUP, event=EventType.DELETED, id="0"
+    )
+    assert "0" not in deconz_session.groups
+    assert not deconz_session.scenes.keys()
+    assert scene_subscription.call_count == 2
@@ -0,0 +1,97 @@
+"""Test pydeCONZ snapshots.
+
+pytest --cov-report term-missing --cov=pydeconz.snapshot tests/test_snapshot.py
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from pydeconz import DeconzSession
+from pydeconz.errors import pydeconzException
+from pydeconz.snapshot import freeze
+
+LIGHTS = {
+    "1": {"type": "Extended color light", "state": {"bri": 1, "xy": [0.1, 0.2]}},
+    "2": {"type": "Extended color light", "state": {"bri": 2}},
+}
+SENSORS = {"1": {"type": "ZHATemperature", "state": {"temperature": 2100}}}
+GROUPS = {
+    "1": {
+        "action": {},
+        "lights": ["1", "2"],
+        "scenes": [{"id": "1", "name": "Scene"}],
+        "state": {},
+    }
+}
+
+
+def test_freeze():
+    """Verify decoded JSON is copied into read-only containers."""
+    raw = {"state": {"xy": [0.1, 0.2]}, "lights": ["1"]}
+    frozen = freeze(raw)
+    assert frozen == {"state": {"xy": (0.1, 0.2)}, "lights": ("1",)}
+    with pytest.raises(TypeError):
+        frozen["state"]["xy"] = None
+    raw["state"]["xy"] = None
+    assert frozen["state"]["xy"] == (0.1, 0.2)
+
+
+async def test_snapshot(deconz_refresh_state):
+    """Verify snapshots are consistent and share unchanged items."""
+    session = await deconz_refresh_state(
+        config={"bridgeid": "012345FFFF6789AB"},
+        groups=GROUPS,
+        lights=LIGHTS,
+        sensors=SENSORS,
+    )
+
+    first = session.snapshot()
+    assert first.version == 1
+    assert first.config.bridge_id == "0123456789AB"
+    assert first.lights["1"].brightness == 1
+    assert first.lights["1"] is not session.lights["1"]
+    assert first.sensors["1"].scaled_temperature == 21
+    assert first.groups["1"].lights == ("1", "2")
+    assert first.scenes["1_1"].name == "Scene"
+    assert first.alarm_systems == {}
+
+    with pytest.raises(TypeError):
+        first.lights["1"].raw["state"]["bri"] = 10
+    with pytest.raises(TypeError):
+        first.lights["3"] = None
+    with pytest.raises(pydeconzException):
+        await first.config.set_config(name="name")
+
+    session.lights.process_item("1", {"state": {"bri": 10}})
+    session.lights.lights.remove_item("2")
+
+    second = session.snapshot()
+    assert second.version == 2
+    assert second.lights["1"].brightness == 10
+    assert "2" not in second.lights
+    assert first.lights["1"].brightness == 1
+    assert "2" in first.lights
+    assert second.sensors is first.sensors
+    assert second.groups is first.groups
+
+    session.sensors.process_item("1", {"state": {"temperature": 2200}})
+    third = session.snapshot()
+    assert third.lights is second.lights
+    assert third.sensors["1"].scaled_temperature == 22
+
+
+async def test_snapshot_from_other_thread(deconz_refresh_state):
+    """Verify snapshots requested from other threads are built on the loop."""
+    session = await deconz_refresh_state(lights=LIGHTS)
+
+    snapshot = await asyncio.to_thread(session.snapshot)
+    assert snapshot.lights["2"].brightness == 2
+
+
+def test_snapshot_without_loop():
+    """Verify snapshots of a session created outside of an event loop."""
+    session = DeconzSession(Mock(), "host", 80)
+    session.lights.process_item("1", LIGHTS["1"])
+    assert session.snapshot().lights["1"].brightness == 1
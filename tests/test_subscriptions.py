@@ -0,0 +1,194 @@
+"""Test pydeCONZ subscriber adapters.
+
+pytest --cov-report term-missing --cov=pydeconz.interfaces.subscriptions tests/test_subscriptions.py
+"""
+
+import asyncio
+import logging
+from unittest.mock import AsyncMock, Mock, patch
+
+from pydeconz.interfaces.subscriptions import (
+    DROP_WARNING_INTERVAL,
+    AsyncSubscriber,
+    wrap_async,
+)
+from pydeconz.models import ResourceGroup
+from pydeconz.models.event import EventType
+
+
+def first_argument(key, *args):
+    """Order by first argument."""
+    return key
+
+
+async def test_async_subscriber_order_and_concurrency():
+    """Verify bounded concurrency and ordering per key."""
+    running = set()
+    max_running = 0
+    calls = []
+
+    async def callback(key, value):
+        nonlocal max_running
+        assert key not in running
+        running.add(key)
+        max_running = max(max_running, len(running))
+        await asyncio.sleep(0.001 * value)
+        calls.append((key, value))
+        running.discard(key)
+
+    subscriber = AsyncSubscriber(callback, first_argument, concurrency=2)
+    for key, value in (("a", 3), ("a", 1), ("b", 1), ("c", 1), ("a", 2), ("b", 2)):
+        subscriber(key, value)
+    assert subscriber.queued == 6
+
+    await subscriber.join()
+
+    assert max_running == 2
+    assert [value for key, value in calls if key == "a"] == [3, 1, 2]
+    assert [value for key, value in calls if key == "b"] == [1, 2]
+    assert len(calls) == 6
+    assert subscriber.queued == 0
+    assert subscriber._pending == {}
+
+
+async def test_async_subscriber_bounded_queue(caplog):
+    """Verify invocations are dropped when queue is full and errors are logged."""
+    callback = AsyncMock(side_effect=[ValueError, None])
+    subscriber = AsyncSubscriber(callback, first_argument, max_queued=2)
+
+    with patch("pydeconz.interfaces.subscriptions.time.monotonic") as monotonic:
+        monotonic.return_value = 1000
+        subscriber("a")
+        subscriber("b")
+        subscriber("c")
+        subscriber("d")
+        monotonic.return_value += DROP_WARNING_INTERVAL
+        subscriber("e")
+    assert subscriber.dropped == 3
+    warnings = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert len(warnings) == 2
+    assert warnings[0].startswith("Dropped 1 invocations of")
+    assert warnings[1].startswith("Dropped 2 invocations of")
+
+    with caplog.at_level(logging.ERROR):
+        await subscriber.join()
+    assert "Error in subscriber" in caplog.text
+    assert callback.await_count == 2
+
+
+async def test_async_subscriber_close():
+    """Verify close cancels work and ignores new invocations."""
+    started = asyncio.Event()
+
+    async def callback(key):
+        started.set()
+        await asyncio.sleep(10)
+
+    subscriber = AsyncSubscriber(callback, first_argument)
+    subscriber("a")
+    subscriber("a")
+    await started.wait()
+
+    subscriber.close()
+    subscriber("b")
+    await subscriber.join()
+    assert subscriber.queued == 0
+    assert not subscriber._ready
+
+
+def test_wrap_sync_callback():
+    """Verify synchronous callbacks are not wrapped."""
+    callback = Mock()
+    assert wrap_async(callback, first_argument, 1) == (callback, None)
+
+
+async def test_async_handler_subscribers(deconz_session):
+    """Verify handlers accept coroutine functions."""
+    handler_callback = AsyncMock()
+    grouped_callback = AsyncMock()
+    session_callback = AsyncMock()
+    event_callback = AsyncMock()
+
+    unsubscribe_handler = deconz_session.lights.lights.subscribe(
+        handler_callback, concurrency=2
+    )
+    unsubscribe_grouped = deconz_session.lights.subscribe(grouped_callback)
+    unsubscribe_session = deconz_session.subscribe(session_callback)
+    unsubscribe_events = deconz_session.events.subscribe(
+        event_callback, resource_filter=ResourceGroup.LIGHT
+    )
+
+    deconz_session.lights.process_item("1", {"type": "Extended color light"})
+    deconz_session.lights.process_item("1", {"state": {"on": True}})
+    deconz_session.events.handler(
+        {"t": "event", "e": "changed", "r": "lights", "id": "1", "state": {}}
+    )
+
+    for unsubscribe, callback in (
+        (unsubscribe_handler, handler_callback),
+        (unsubscribe_grouped, grouped_callback),
+        (unsubscribe_session, session_callback),
+    ):
+        await asyncio.sleep(0.01)
+        assert [call.args for call in callback.await_args_list] == [
+            (EventType.ADDED, "1"),
+            (EventType.CHANGED, "1"),
+            (EventType.CHANGED, "1"),
+        ]
+        unsubscribe()
+
+    event_callback.assert_awaited_once()
+    unsubscribe_events()
+
+    deconz_session.lights.process_item("1", {"state": {"on": False}})
+    await asyncio.sleep(0.01)
+    assert handler_callback.await_count == 3
+    assert event_callback.await_count == 1
+
+
+async def test_async_handler_subscriber_changed_keys(deconz_session):
+    """Verify coroutine subscribers see changed keys as signalled."""
+    lights = deconz_session.lights
+    lights.process_item("1", {"type": "Extended color light"})
+    seen = []
+
+    async def callback(event, id):
+        seen.append(lights[id].changed_keys)
+
+    lights.subscribe(callback)
+    lights.process_item("1", {"state": {"on": True}})
+    lights.process_item("1", {"name": "Kitchen"})
+    await asyncio.sleep(0.01)
+    assert seen == [{"state"}, {"name"}]
+    assert lights["1"].changed_keys == {"name"}
+
+
+async def test_async_handler_subscriber_max_queued(deconz_session):
+    """Verify handler subscribers drop invocations beyond max queued."""
+    lights = deconz_session.lights
+    lights.process_item("1", {"type": "Extended color light"})
+    callback = AsyncMock()
+
+    lights.subscribe(callback, max_queued=1)
+    deconz_session.subscribe(callback, max_queued=2)
+    lights.process_item("1", {"state": {"on": True}})
+    lights.process_item("1", {"name": "Kitchen"})
+    lights.process_item("1", {"name": "Hall"})
+    await asyncio.sleep(0.01)
+    assert callback.await_count == 3
+
+
+async def test_async_session_subscriber_changed_keys(deconz_session):
+    """Verify session coroutine subscribers see changed keys as signalled."""
+    lights = deconz_session.lights
+    lights.process_item("1", {"type": "Extended color light"})
+    seen = []
+
+    async def callback(event, id):
+        seen.append(lights[id].changed_keys)
+
+    deconz_session.subscribe(callback)
+    lights.process_item("1", {"state": {"on": True}})
+    lights.process_item("1", {"name": "Kitchen"})
+    await asyncio.sleep(0.01)
+    assert seen == [{"state"}, {"name"}]
@@ -0,0 +1,114 @@
+"""Test pydeCONZ attribute views.
+
+pytest --cov-report term-missing --cov=pydeconz.interfaces.views tests/test_views.py
+"""
+
+import pytest
+
+from pydeconz.interfaces.views import AttributeView, SinceView, parse_time
+from pydeconz.models import ResourceGroup
+
+SENSORS = {
+    str(id): {
+        "type": "ZHATemperature",
+        "config": {"battery": battery, "reachable": True},
+        "state": {"lastupdated": f"2026-01-0{id}T00:00:00.000", "temperature": 2000},
+        "uniqueid": f"00:00:00:00:00:00:00:0{id}-01-0402",
+    }
+    for id, battery in ((1, 50), (2, 10), (3, 90), (4, 30))
+}
+SENSORS["5"] = {
+    "type": "ZHAPresence",
+    "config": {"reachable": True},
+    "state": {"lastupdated": "none", "presence": False},
+    "uniqueid": "00:00:00:00:00:00:00:05-01-0406",
+}
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("1970-01-01T00:00:10+00:00", 10),
+        ("1970-01-01T00:00:10", 10),
+        ("1970-01-01T00:00:10.500", 10.5),
+        ("none", None),
+        (None, None),
+    ],
+)
+def test_parse_time(value, expected):
+    """Verify deCONZ timestamps are converted to POSIX time."""
+    assert parse_time(value) == expected
+
+
+async def test_attribute_view(deconz_refresh_state, mock_websocket_event):
+    """Verify views are maintained as resources change."""
+    session = await deconz_refresh_state(sensors=SENSORS)
+
+    def ids(items):
+        return [item.resource_id for item in items]
+
+    battery = AttributeView("config.battery")
+    unregister = session.sensors.register_view(battery)
+    updated = AttributeView("state.lastupdated", convert=parse_time)
+    session.sensors.register_view(updated)
+
+    assert len(battery) == 4
+    assert ids(battery.smallest(2)) == ["2", "4"]
+    assert ids(battery.largest(2)) == ["3", "1"]
+    assert battery.largest(0) == []
+    assert ids(battery.below(30)) == ["2"]
+    assert ids(battery.below(30, inclusive=True)) == ["2", "4"]
+    assert ids(battery.above(50)) == ["3"]
+    assert ids(battery.above(50, inclusive=True)) == ["1", "3"]
+    assert ids(updated.below(parse_time("2026-01-03T00:00:00.000"))) == ["1", "2"]
+
+    async def changed(id, data):
+        await mock_websocket_event(
+            ResourceGroup.SENSOR, id=id, data=data, unique_id=SENSORS[id]["uniqueid"]
+        )
+
+    await changed("3", {"config": {"battery": 5}})
+    await changed("1", {"state": {"temperature": 2100}})
+    await changed("4", {"state": {"lastupdated": "2026-01-05T00:00:00.000"}})
+    assert ids(battery.smallest(2)) == ["3", "2"]
+    assert ids(updated.smallest(4)) == ["1", "2", "3", "4"]
+
+    # Values that can not be ordered against others are left out
+
+    await changed("5", {"config": {"battery": "low"}})
+    assert len(battery) == 4
+
+    session.sensors.temperature.remove_item("2")
+    assert ids(battery.smallest(2)) == ["3", "4"]
+
+    unregister()
+    await changed("1", {"config": {"battery": 1}})
+    assert ids(battery.smallest(1)) == ["3"]
+
+
+async def test_since_view(deconz_refresh_state, mock_websocket_event):
+    """Verify resources are ordered on how long they have had a value."""
+    session = await deconz_refresh_state(sensors=SENSORS)
+    now = 1000.0
+    unreachable = SinceView("config.reachable", False, clock=lambda: now)
+    session.sensors.register_view(unreachable)
+    assert len(unreachable) == 0
+
+    async def reachable(id, value):
+        await mock_websocket_event(
+            ResourceGroup.SENSOR,
+            id=id,
+            data={"config": {"reachable": value}},
+            unique_id=SENSORS[id]["uniqueid"],
+        )
+
+    await reachable("1", False)
+    now = 2000.0
+    await reachable("2", False)
+    await reachable("1", False)
+    now = 5000.0
+    assert [item.resource_id for item in unreachable.longer_than(3600)] == ["1"]
+    assert [item.resource_id for item in unreachable.longer_than(60)] == ["1", "2"]
+
+    await reachable("1", True)
+    assert [item.resource_id for item in unreachable.longer_than(60)] == ["2"]
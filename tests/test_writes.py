@@ -0,0 +1,223 @@
+"""Test pydeCONZ write suppression.
+
+pytest --cov-report term-missing --cov=pydeconz.writes tests/test_writes.py
+"""
+
+import asyncio
+
+import pytest
+
+from pydeconz.metrics import RequestMetrics
+from pydeconz.models import ResourceGroup
+from pydeconz.models.light.light import LightAlert
+from pydeconz.models.sensor.thermostat import ThermostatMode
+from pydeconz.writes import changed_values, write_target
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("/lights/1/state", ("lights", "1", "state")),
+        ("/groups/1/action", ("groups", "1", "action")),
+        ("/sensors/1/config", ("sensors", "1", "config")),
+        ("/lights/1", ("lights", "1", None)),
+        ("/groups/1/scenes/2/recall", None),
+        ("/alarmsystems/1/arm_away", None),
+        ("/config", None),
+    ],
+)
+def test_write_target(path, expected):
+    """Verify the resource data written to is derived from path."""
+    assert write_target(path) == expected
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        ({"on": True, "bri": 100}, {}),
+        ({"on": True, "bri": 200}, {"bri": 200}),
+        ({"on": True, "transitiontime": 10}, {}),
+        (
+            {"bri": 200, "transitiontime": 10},
+            {"bri": 200, "transitiontime": 10},
+        ),
+        ({"xy": (0.1, 0.2)}, {}),
+        ({"xy": (0.1, 0.3)}, {"xy": (0.1, 0.3)}),
+        ({"ct": 300}, {"ct": 300}),
+        ({"hue": 1000, "sat": 100}, {"hue": 1000, "sat": 100}),
+        ({"alert": "select"}, {"alert": "select"}),
+        ({"alert": "none"}, {"alert": "none"}),
+    ],
+)
+def test_changed_values(data, expected):
+    """Verify values already set are stripped and modifiers are kept.
+
+    Colours of another colour mode are stale and commands are always sent.
+    """
+    current = {
+        "alert": "none",
+        "on": True,
+        "bri": 100,
+        "colormode": "xy",
+        "ct": 300,
+        "hue": 1000,
+        "sat": 100,
+        "xy": [0.1, 0.2],
+    }
+    assert changed_values(current, data) == expected
+
+
+async def test_suppress_unchanged_writes(
+    mock_aioresponse, deconz_refresh_state, deconz_called_with
+):
+    """Verify writes only send values resources do not already have."""
+    session = await deconz_refresh_state(
+        groups={
+            "1": {"action": {"on": False}, "lights": [], "name": "Group", "scenes": []}
+        },
+        lights={
+            "1": {
+                "type": "Extended color light",
+                "name": "Ceiling",
+                "state": {"alert": "select", "on": True, "bri": 100},
+            }
+        },
+        sensors={
+            "1": {
+                "type": "ZHAThermostat",
+                "config": {"heatsetpoint": 2100, "mode": "heat"},
+                "state": {},
+            }
+        },
+    )
+    session.suppress_unchanged_writes = True
+    session.request_metrics = RequestMetrics()
+    mock_aioresponse.put("http://host:80/api/apikey/lights/1/state", repeat=True)
+    mock_aioresponse.put("http://host:80/api/apikey/groups/1/action", repeat=True)
+
+    assert await session.lights.lights.set_state("1", on=True, brightness=100) == {}
+    assert session.request_metrics.endpoint("put", "/lights/1/state").suppressed == 1
+    assert not mock_aioresponse.requests.get(("PUT", "lights/1/state"))
+
+    await session.lights.lights.set_state("1", on=True, brightness=150)
+    assert deconz_called_with("put", path="/lights/1/state", json={"bri": 150})
+
+    # Alerts are commands and sent even if the light reports the same alert
+
+    await session.lights.lights.set_state("1", on=True, alert=LightAlert.SHORT)
+    assert deconz_called_with("put", path="/lights/1/state", json={"alert": "select"})
+
+    # Group action is the last command sent rather than the current state
+
+    await session.groups.set_state("1", on=False)
+    assert deconz_called_with("put", path="/groups/1/action", json={"on": False})
+
+    # Thermostat config and group name
+
+    assert (
+        await session.sensors.thermostat.set_config(
+            "1", heating_setpoint=2100, mode=ThermostatMode.HEAT
+        )
+        == {}
+    )
+    assert await session.groups.set_attributes("1", name="Group") == {}
+
+    # Unknown resources and other requests are passed as is
+
+    assert session.changed_values("/lights/2/state", {"on": True}) == {"on": True}
+    assert session.changed_values("/groups/1/scenes/1/recall", {"a": 1}) == {"a": 1}
+    assert session.changed_values("/lights/1/colorcapabilities", {"a": 1}) == {"a": 1}
+    assert session.changed_values("/sensors/1/state", {"on": True}) == {"on": True}
+
+
+async def test_confirmed_writes(
+    mock_aioresponse, deconz_refresh_state, mock_websocket_event
+):
+    """Verify writes are confirmed once the websocket reports the values."""
+    session = await deconz_refresh_state(
+        groups={
+            "1": {
+                "action": {"on": True},
+                "lights": ["1"],
+                "name": "Group",
+                "scenes": [],
+                "state": {"all_on": False, "any_on": False},
+            }
+        },
+        lights={
+            "1": {
+                "type": "Extended color light",
+                "state": {"alert": "none", "on": False, "bri": 100},
+                "uniqueid": "00:17:88:01:00:00:00:01-0b",
+            }
+        },
+    )
+    mock_aioresponse.put("http://host:80/api/apikey/lights/1/state", repeat=True)
+    mock_aioresponse.put("http://host:80/api/apikey/groups/1/action", repeat=True)
+    mock_aioresponse.post("http://host:80/api/apikey/groups/1/scenes", repeat=True)
+    light = session.lights["1"]
+
+    async def changed(state):
+        await mock_websocket_event(
+            ResourceGroup.LIGHT,
+            id="1",
+            data={"state": state},
+            unique_id="00:17:88:01:00:00:00:01-0b",
+        )
+
+    confirmation = await session.confirmed(
+        session.lights.lights.set_state("1", on=True, brightness=200, alert="select")
+    )
+    await changed({"on": True})
+    assert not confirmation.done()
+    await changed({"bri": 200})
+    assert await confirmation >= 0
+    assert light._expectations == ()
+
+    # Values already set are confirmed right away
+
+    confirmation = await session.confirmed(
+        session.lights.lights.set_state("1", on=True)
+    )
+    assert await confirmation == 0
+
+    # Writes not targeting resource data or no writes at all
+
+    assert await session.confirmed(session.scenes.create_scene("1", "a")) is None
+
+    # Group action is the last command sent, events never report it,
+    # a stale action matching the write is not taken as confirmation
+
+    assert await session.confirmed(session.groups.set_state("1", on=True)) is None
+    assert session.groups["1"]._expectations == ()
+
+    # Several writes are confirmed when all of them are
+
+    async def two_writes():
+        await session.lights.lights.set_state("1", brightness=10)
+        await session.lights.lights.set_state("1", on=False)
+        return {}
+
+    confirmation = await session.confirmed(two_writes())
+    await changed({"bri": 10, "on": False})
+    assert await confirmation >= 0
+
+    # Timeout
+
+    confirmation = await session.confirmed(
+        session.lights.lights.set_state("1", brightness=50), timeout=0.01
+    )
+    with pytest.raises(TimeoutError):
+        await confirmation
+    assert light._expectations == ()
+
+    # Failed writes cancel their confirmation
+
+    async def failing_write():
+        await session.lights.lights.set_state("1", brightness=60)
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        await session.confirmed(failing_write())
+    await asyncio.sleep(0)
+    assert light._expectations == ()